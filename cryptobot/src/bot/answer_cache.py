@@ -0,0 +1,157 @@
+import threading
+import time
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Set
+
+import numpy as np
+
+from cryptobot.src.bot.llm import load_chat_section
+
+logger = logging.getLogger(__name__)
+
+"""
+AnswerCache 类设计说明：
+
+常见问题（"什么是内盘和外盘？""外盘二段是什么"）反复被问到，每次都要检索并调用 16k 模型。
+1. 以问题向量为键：检索时生成的查询向量直接复用，不额外请求 Embedding 接口
+2. 命中条件：与某条缓存问题的余弦相似度 >= threshold，且本次检索到的分块 ID 与当时完全一致
+   （知识库新增了更相关的内容时，检索结果变化，自然不会命中旧回答）
+3. 条目有 TTL，数量超过 max_entries 时按最近最少使用淘汰
+4. 注册为 KnowledgeBase 的变更监听器：某个来源被写入或删除时，引用了该来源的回答立即失效
+"""
+
+DEFAULT_CONFIG = {
+    "enabled": True,
+    "threshold": 0.95,
+    "ttl_seconds": 3600,
+    "max_entries": 256
+}
+
+
+@dataclass
+class CachedAnswer:
+    query: str
+    vector: np.ndarray
+    context_ids: tuple
+    sources: Set[str]
+    answer: str
+    created_at: float
+
+
+class AnswerCache:
+    def __init__(self, threshold: float = 0.95, ttl_seconds: float = 3600, max_entries: int = 256):
+        """
+        Args:
+            threshold: 问题向量的余弦相似度阈值
+            ttl_seconds: 回答的有效期
+            max_entries: 最多缓存多少条回答
+        """
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[int, CachedAnswer]" = OrderedDict()
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+    def get(self, vector: List[float], context_ids: List[str]) -> Optional[str]:
+        """查找相似问题且检索结果未变的回答，未命中返回 None"""
+        query_vector = _unit(vector)
+        context_ids = tuple(context_ids)
+        with self._lock:
+            self._expire()
+            best_key, best_score = None, self.threshold
+            for key, entry in self._entries.items():
+                if entry.context_ids != context_ids:
+                    continue
+                score = float(np.dot(entry.vector, query_vector))
+                if score >= best_score:
+                    best_key, best_score = key, score
+            if best_key is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            entry = self._entries[best_key]
+            logger.info(f"命中回答缓存（相似度 {best_score:.3f}）：{entry.query[:50]}")
+            return entry.answer
+
+    def put(self, query: str, vector: List[float], results: List[dict], answer: str) -> None:
+        """缓存回答，results 为生成回答时的检索结果"""
+        entry = CachedAnswer(
+            query=query,
+            vector=_unit(vector),
+            context_ids=tuple(r["id"] for r in results),
+            sources={r["source"] for r in results if r.get("source")},
+            answer=answer,
+            created_at=time.monotonic()
+        )
+        with self._lock:
+            self._entries[self._next_key] = entry
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, sources: Optional[Set[str]] = None) -> int:
+        """删除引用了这些来源的回答，sources 为 None 时全部清空，返回删除数量"""
+        with self._lock:
+            if sources is None:
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                stale = [key for key, entry in self._entries.items() if entry.sources & sources]
+                for key in stale:
+                    del self._entries[key]
+                removed = len(stale)
+        if removed:
+            logger.info(f"知识库内容变更，{removed} 条缓存回答失效")
+        return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0
+            }
+
+    def _expire(self) -> None:
+        deadline = time.monotonic() - self.ttl_seconds
+        # 按插入时间检查，命中时调整的顺序不影响过期判断
+        for key in [key for key, entry in self._entries.items() if entry.created_at < deadline]:
+            del self._entries[key]
+
+
+def _unit(vector: List[float]) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+_shared_cache: Optional[AnswerCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_answer_cache(kb, config_path: str = None) -> Optional[AnswerCache]:
+    """进程内共享的回答缓存（Streamlit 的多个会话共用），首次创建时注册知识库变更监听
+
+    配置见 cryptobot/config/chat.yaml 的 answer_cache 段，enabled 为 false 时返回 None。
+    """
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            config = load_chat_section("answer_cache", DEFAULT_CONFIG, config_path)
+            if not config["enabled"]:
+                return None
+            _shared_cache = AnswerCache(
+                threshold=config["threshold"],
+                ttl_seconds=config["ttl_seconds"],
+                max_entries=config["max_entries"]
+            )
+        kb.add_listener(_shared_cache.invalidate)
+        return _shared_cache
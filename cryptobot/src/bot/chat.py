@@ -1,37 +1,151 @@
 import os
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
-from langchain.schema import StrOutputParser
-from langchain.schema.runnable import RunnablePassthrough
+from cryptobot.src.bot.answer_cache import get_answer_cache
+from cryptobot.src.bot.context_builder import ContextBuilder
+from cryptobot.src.bot.llm import get_llm, load_chat_config, load_chat_section
+from cryptobot.src.kb.chunker import count_tokens
 from cryptobot.src.kb.knowledge_base import KnowledgeBase
 from dotenv import load_dotenv
-from typing import List, Dict
+from typing import TYPE_CHECKING, AsyncIterator, Iterator, List, Dict, Optional, Tuple
+import asyncio
 import logging
+import time
 
 load_dotenv()
 
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 logger = logging.getLogger(__name__)
 
+NO_RESULT_REPLY = "抱歉，我的知识库中没有找到相关信息。请问其他问题。"
+ERROR_REPLY = "抱歉，处理您的问题时出现了错误。请稍后再试。"
+
+# 检索方式（cryptobot/config/chat.yaml 的 retrieval 段）
+RETRIEVAL_CONFIG = {
+    "hybrid": True,
+    "rrf_k": 60
+}
+
 class CryptoChat:
     def __init__(self):
         self.kb = KnowledgeBase()
-        self.llm = ChatOpenAI(
-            model="gpt-3.5-turbo",
-            temperature=0.7
-        )
+        # 指定时固定使用该模型，否则按 prompt 长度选择
+        self.answer_llm = None
+        self.answer_cache = get_answer_cache(self.kb)
+        self.context_builder = ContextBuilder.from_config()
+        self.llm_config = load_chat_config()
+        self.retrieval = load_chat_section("retrieval", RETRIEVAL_CONFIG)
         
     def chat(self, query: str) -> str:
+        return "".join(self.stream_chat(query))
+    
+    def stream_chat(self, query: str) -> Iterator[str]:
+        """逐个 token 生成回答，首个 token 的延迟与总耗时分别记录"""
+        start = time.perf_counter()
         try:
-            # 增加搜索结果数量以获取更完整的上下文
-            search_results = self.kb.search(query, k=5)
+            reply, prompt, vector, results = self._prepare(query)
+            if reply is not None:
+                yield reply
+                return
+            retrieval_time = time.perf_counter() - start
             
-            if not search_results:
-                return "抱歉，我的知识库中没有找到相关信息。请问其他问题。"
+            first_token_time = None
+            tokens = []
+            for chunk in self._answer_llm(prompt).stream(prompt):
+                if not chunk.content:
+                    continue
+                if first_token_time is None:
+                    first_token_time = time.perf_counter() - start
+                    logger.info(f"首个 token 耗时 {first_token_time:.2f}s（检索 {retrieval_time:.2f}s）")
+                tokens.append(chunk.content)
+                yield chunk.content
+            self._remember(query, vector, results, "".join(tokens))
+            logger.info(f"回答完成，总耗时 {time.perf_counter() - start:.2f}s")
             
-            # 构建更精确的 prompt
-            context = "\n".join([r["content"][:1200] for r in search_results])
-            prompt = f"""你是一个专业的加密货币交易助手。请基于背景信息回答问题。
+        except Exception as e:
+            print(f"处理问题时出错: {str(e)}")
+            yield ERROR_REPLY
+    
+    async def astream_chat(self, query: str) -> AsyncIterator[str]:
+        """stream_chat 的异步版本，检索在线程中执行，不阻塞事件循环"""
+        start = time.perf_counter()
+        try:
+            reply, prompt, vector, results = await asyncio.to_thread(self._prepare, query)
+            if reply is not None:
+                yield reply
+                return
+            retrieval_time = time.perf_counter() - start
+            
+            first_token_time = None
+            tokens = []
+            async for chunk in self._answer_llm(prompt).astream(prompt):
+                if not chunk.content:
+                    continue
+                if first_token_time is None:
+                    first_token_time = time.perf_counter() - start
+                    logger.info(f"首个 token 耗时 {first_token_time:.2f}s（检索 {retrieval_time:.2f}s）")
+                tokens.append(chunk.content)
+                yield chunk.content
+            self._remember(query, vector, results, "".join(tokens))
+            logger.info(f"回答完成，总耗时 {time.perf_counter() - start:.2f}s")
+            
+        except Exception as e:
+            print(f"处理问题时出错: {str(e)}")
+            yield ERROR_REPLY
+    
+    def _answer_llm(self, prompt: str) -> "ChatOpenAI":
+        """回答使用的模型：prompt 放得下时用便宜的模型（见 cryptobot/config/chat.yaml）"""
+        if self.answer_llm is not None:
+            return self.answer_llm
+        if self.llm_config["model"]:
+            return get_llm(config=self.llm_config)
+        prompt_tokens = count_tokens(prompt)
+        model = self.context_builder.choose_model(prompt_tokens)
+        logger.info(f"prompt {prompt_tokens} tokens，使用模型 {model}")
+        return get_llm(model=model, config=self.llm_config)
+    
+    def _prepare(self, query: str) -> Tuple[Optional[str], Optional[str], Optional[List[float]], Optional[List[Dict]]]:
+        """检索背景信息并查询回答缓存
+        
+        Returns:
+            (直接返回的回答, prompt, 查询向量, 检索结果)；没有检索结果或命中缓存时只有第一项
+        """
+        # 知识库被重建或清空（指针切换）时改用新索引，回答缓存随之清空
+        self.kb.refresh()
+        # 查询向量同时用于检索和回答缓存
+        vector = self.kb.embed_query(query)
+        # 多取一些候选结果，由 ContextBuilder 按相关度和 token 预算筛选
+        k = self.context_builder.candidates
+        if self.retrieval["hybrid"]:
+            search_results = self.kb.hybrid_search(query, vector, k=k, rrf_k=self.retrieval["rrf_k"])
+        else:
+            search_results = self.kb.search_by_vector(vector, k=k)
+        
+        if not search_results:
+            return NO_RESULT_REPLY, None, None, None
+        
+        if self.answer_cache is not None:
+            cached = self.answer_cache.get(vector, [r["id"] for r in search_results])
+            if cached is not None:
+                return cached, None, None, None
+        
+        context = self.context_builder.build(search_results)
+        if not context.passages:
+            return NO_RESULT_REPLY, None, None, None
+        logger.info(f"背景信息 {len(context.passages)} 段，{context.tokens} tokens，"
+                    f"丢弃 {context.dropped} 条不相关或重复的结果")
+        
+        return None, self._build_prompt(query, context.text), vector, search_results
+    
+    def _remember(self, query: str, vector: List[float], search_results: List[Dict], answer: str) -> None:
+        if self.answer_cache is not None and answer:
+            self.answer_cache.put(query, vector, search_results, answer)
+    
+    def _build_prompt(self, query: str, context: str) -> str:
+        """用组装好的背景信息构建 prompt"""
+        # 构建更精确的 prompt
+        return f"""你是一个专业的加密货币交易助手。请基于背景信息回答问题。
 
 核心规则：
 1. 严格遵守原文定义，不得改写或简化
@@ -48,17 +162,6 @@ class CryptoChat:
 {context}
 
 用户问题：{query}"""
-            
-            self.llm = ChatOpenAI(
-                model="gpt-3.5-turbo-16k",
-                temperature=0.1
-            )
-            response = self.llm.invoke(prompt).content
-            return response
-            
-        except Exception as e:
-            print(f"处理问题时出错: {str(e)}")
-            return "抱歉，处理您的问题时出现了错误。请稍后再试。"
 
 def main():
     chat = CryptoChat()
@@ -75,8 +178,10 @@ def main():
         if query.lower() == 'q':
             break
             
-        response = chat.chat(query)
-        print(f"\n助手：{response}")
+        print("\n助手：", end="", flush=True)
+        for token in chat.stream_chat(query):
+            print(token, end="", flush=True)
+        print()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
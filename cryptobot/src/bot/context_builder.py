@@ -0,0 +1,192 @@
+import re
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from cryptobot.src.bot.llm import load_chat_section
+from cryptobot.src.kb.chunker import count_tokens
+
+logger = logging.getLogger(__name__)
+
+"""
+ContextBuilder 类设计说明：
+
+替代固定的 k=5 × 1200 字符截断，按 token 预算组装 prompt 的背景信息：
+1. 丢弃距离超过 max_distance 的检索结果（Chroma 返回的是距离，越小越相关）；
+   关键词命中了绝大部分查询词（coverage >= min_coverage）的结果保留，
+   专有名词的向量距离往往偏大，不能只看距离
+2. 去重：被已选段落完全包含的结果丢弃；同一来源相邻分块（分块时保留了重叠）
+   按重叠部分拼接成一段，避免重叠内容重复占用预算
+3. 按相关度（混合检索时为融合分数，否则为距离）从高到低装入，总 token 数不超过 max_tokens；放不下的段落按句子截断，
+   剩余预算太少时直接跳过，不再从定义中间截断
+4. 根据 prompt 加上回答预留的 token 数，选择能容纳的最便宜的模型
+   （默认 gpt-3.5-turbo，放不下时才用 gpt-3.5-turbo-16k）
+"""
+
+DEFAULT_CONFIG = {
+    "candidates": 8,
+    "max_tokens": 2500,
+    "max_distance": 0.5,
+    "min_coverage": 0.8,
+    "min_passage_tokens": 80,
+    "min_overlap_chars": 10,
+    "answer_tokens": 1024,
+    "models": [
+        {"name": "gpt-3.5-turbo", "context_tokens": 4096},
+        {"name": "gpt-3.5-turbo-16k", "context_tokens": 16384}
+    ]
+}
+
+_SENTENCE = re.compile(r".*?(?:[。！？；]|[.!?;](?=\s)|\n|$)", re.S)
+
+
+@dataclass
+class Passage:
+    content: str
+    score: float
+    source: Optional[str]
+    first_chunk: Optional[int]
+    last_chunk: Optional[int]
+    ids: List[str] = field(default_factory=list)
+    tokens: int = 0
+
+
+@dataclass
+class BuiltContext:
+    text: str
+    passages: List[Passage]
+    tokens: int
+    dropped: int
+
+
+class ContextBuilder:
+    def __init__(self, max_tokens: int = 2500, max_distance: Optional[float] = 0.5,
+                 min_coverage: Optional[float] = 0.8, min_passage_tokens: int = 80, min_overlap_chars: int = 10,
+                 answer_tokens: int = 1024, models: List[Dict] = None, candidates: int = 8):
+        """
+        Args:
+            max_tokens: 背景信息的 token 预算
+            max_distance: 检索距离上限，None 表示不过滤
+            min_coverage: 关键词覆盖率不低于此值的结果不受 max_distance 限制，None 表示不放宽
+            min_passage_tokens: 截断后的段落少于这么多 token 时不再放入
+            min_overlap_chars: 相邻分块至少重叠多少字符才拼接
+            answer_tokens: 为回答预留的 token 数，用于选择模型
+            models: [{"name", "context_tokens"}]，按价格从低到高排列
+            candidates: 检索的候选结果数
+        """
+        self.max_tokens = max_tokens
+        self.max_distance = max_distance
+        self.min_coverage = min_coverage
+        self.min_passage_tokens = min_passage_tokens
+        self.min_overlap_chars = min_overlap_chars
+        self.answer_tokens = answer_tokens
+        self.models = models or DEFAULT_CONFIG["models"]
+        self.candidates = candidates
+
+    @classmethod
+    def from_config(cls, config_path: str = None) -> "ContextBuilder":
+        """从 cryptobot/config/chat.yaml 的 context 段创建"""
+        return cls(**load_chat_section("context", DEFAULT_CONFIG, config_path))
+
+    def build(self, search_results: List[dict]) -> BuiltContext:
+        """把检索结果组装成背景信息"""
+        relevant = [r for r in search_results if self._is_relevant(r)]
+        passages = self._dedup(sorted(relevant, key=_relevance))
+
+        packed, used = [], 0
+        for passage in passages:
+            passage.tokens = count_tokens(passage.content)
+            remaining = self.max_tokens - used
+            if passage.tokens > remaining:
+                if remaining < self.min_passage_tokens:
+                    continue
+                passage.content = self._truncate(passage.content, remaining)
+                passage.tokens = count_tokens(passage.content)
+                if passage.tokens < self.min_passage_tokens:
+                    continue
+            packed.append(passage)
+            used += passage.tokens
+
+        dropped = len(search_results) - sum(len(p.ids) for p in packed)
+        return BuiltContext(
+            text="\n".join(p.content for p in packed),
+            passages=packed,
+            tokens=used,
+            dropped=dropped
+        )
+
+    def _is_relevant(self, result: dict) -> bool:
+        if self.max_distance is None or result["score"] <= self.max_distance:
+            return True
+        return self.min_coverage is not None and result.get("coverage", 0.0) >= self.min_coverage
+
+    def choose_model(self, prompt_tokens: int) -> str:
+        """选择能容纳 prompt 和回答的第一个（最便宜的）模型"""
+        needed = prompt_tokens + self.answer_tokens
+        for model in self.models:
+            if needed <= model["context_tokens"]:
+                return model["name"]
+        return self.models[-1]["name"]
+
+    def _dedup(self, results: List[dict]) -> List[Passage]:
+        passages: List[Passage] = []
+        for r in results:
+            metadata = r.get("metadata") or {}
+            content = r["content"].strip()
+            chunk_index = metadata.get("chunk_index")
+            merged = False
+            for passage in passages:
+                if content in passage.content:
+                    passage.ids.append(r["id"])
+                    merged = True
+                elif passage.content in content:
+                    passage.content = content
+                    passage.ids.append(r["id"])
+                    merged = True
+                elif (passage.source and passage.source == r.get("source")
+                      and chunk_index is not None and passage.first_chunk is not None):
+                    # 同一来源的相邻分块：按分块顺序拼接重叠部分
+                    joined = None
+                    if chunk_index == passage.last_chunk + 1:
+                        joined = self._join(passage.content, content)
+                    elif chunk_index == passage.first_chunk - 1:
+                        joined = self._join(content, passage.content)
+                    if joined is not None:
+                        passage.content = joined
+                        passage.first_chunk = min(passage.first_chunk, chunk_index)
+                        passage.last_chunk = max(passage.last_chunk, chunk_index)
+                        passage.ids.append(r["id"])
+                        merged = True
+                if merged:
+                    break
+            if not merged:
+                passages.append(Passage(content=content, score=r["score"], source=r.get("source"),
+                                        first_chunk=chunk_index, last_chunk=chunk_index, ids=[r["id"]]))
+        return passages
+
+    def _join(self, first: str, second: str) -> Optional[str]:
+        """first 的结尾与 second 的开头重叠时拼接，否则返回 None"""
+        for size in range(min(len(first), len(second)), self.min_overlap_chars - 1, -1):
+            if first.endswith(second[:size]):
+                return first + second[size:]
+        return None
+
+    def _truncate(self, text: str, budget: int) -> str:
+        """按句子截断到 budget 个 token 以内"""
+        kept, used = [], 0
+        for sentence in _SENTENCE.findall(text):
+            if not sentence:
+                continue
+            tokens = count_tokens(sentence)
+            if used + tokens > budget:
+                break
+            kept.append(sentence)
+            used += tokens
+        return "".join(kept).strip()
+
+
+def _relevance(result: dict) -> float:
+    """排序键：有融合分数时按融合分数，否则按距离"""
+    if "rrf" in result:
+        return -result["rrf"]
+    return result["score"]
@@ -0,0 +1,135 @@
+import copy
+import os
+import threading
+import logging
+from typing import TYPE_CHECKING, Dict, Tuple
+
+import httpx
+import yaml
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
+logger = logging.getLogger(__name__)
+
+"""
+LLM 客户端层设计说明：
+
+1. 模型、超时、重试、接口地址从 cryptobot/config/chat.yaml 读取，环境变量可覆盖：
+   - CRYPTOBOT_CHAT_CONFIG: 配置文件路径
+   - CRYPTOBOT_CHAT_MODEL: 固定使用的模型名（默认按 prompt 长度自动选择）
+   - OPENAI_BASE_URL: OpenAI 兼容接口地址（可指向本地 stub，便于离线测试）
+2. 所有 ChatOpenAI 实例共用一个 httpx.Client 连接池（keep-alive），
+   不再每次提问都新建客户端、重新握手
+3. 相同参数的 ChatOpenAI 只创建一次，Streamlit 的多个会话共享；创建过程加锁，线程安全
+4. 异步客户端不共享：httpx.AsyncClient 的连接绑定在创建它的事件循环上，
+   由 openai SDK 按默认方式创建
+"""
+
+DEFAULT_CONFIG_PATH = "cryptobot/config/chat.yaml"
+
+# 未指定模型时使用
+FALLBACK_MODEL = "gpt-3.5-turbo-16k"
+
+DEFAULT_CONFIG = {
+    "model": None,
+    "temperature": 0.1,
+    "timeout": 60,
+    "max_retries": 2,
+    "base_url": None,
+    "pool": {
+        "max_connections": 20,
+        "max_keepalive_connections": 10,
+        "keepalive_expiry": 60
+    }
+}
+
+_lock = threading.Lock()
+_http_client: httpx.Client = None
+_llms: Dict[Tuple, "ChatOpenAI"] = {}
+
+
+def load_chat_section(section: str, defaults: dict, config_path: str = None) -> dict:
+    """读取 chat.yaml 中的某一段，与默认值合并（只合并一层嵌套）"""
+    config = copy.deepcopy(defaults)
+    config_path = config_path or os.getenv("CRYPTOBOT_CHAT_CONFIG", DEFAULT_CONFIG_PATH)
+    if os.path.exists(config_path):
+        with open(config_path, 'r', encoding='utf-8') as f:
+            values = (yaml.safe_load(f) or {}).get(section) or {}
+        for key, value in values.items():
+            if isinstance(config.get(key), dict) and isinstance(value, dict):
+                config[key].update(value)
+            else:
+                config[key] = value
+    return config
+
+
+def load_chat_config(config_path: str = None) -> dict:
+    """加载聊天模型配置：默认值 <- 配置文件 llm 段 <- 环境变量"""
+    config = load_chat_section("llm", DEFAULT_CONFIG, config_path)
+
+    if os.getenv("CRYPTOBOT_CHAT_MODEL"):
+        config["model"] = os.getenv("CRYPTOBOT_CHAT_MODEL")
+    if os.getenv("OPENAI_BASE_URL"):
+        config["base_url"] = os.getenv("OPENAI_BASE_URL")
+    return config
+
+
+def get_http_client(pool: dict = None) -> httpx.Client:
+    """进程内共享的 keep-alive 连接池"""
+    global _http_client
+    with _lock:
+        if _http_client is None:
+            pool = pool or DEFAULT_CONFIG["pool"]
+            _http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=pool["max_connections"],
+                    max_keepalive_connections=pool["max_keepalive_connections"],
+                    keepalive_expiry=pool["keepalive_expiry"]
+                )
+            )
+        return _http_client
+
+
+def get_llm(model: str = None, temperature: float = None, config: dict = None) -> "ChatOpenAI":
+    """获取共享的 ChatOpenAI 实例，参数相同的只创建一次
+
+    Args:
+        model: 模型名，默认取配置，配置也为空时用 FALLBACK_MODEL
+        temperature: 温度，默认取配置
+        config: 已加载的配置，默认调用 load_chat_config
+    """
+    config = config or load_chat_config()
+    model = model or config["model"] or FALLBACK_MODEL
+    temperature = config["temperature"] if temperature is None else temperature
+    key = (model, temperature, config["base_url"], config["timeout"], config["max_retries"])
+
+    llm = _llms.get(key)
+    if llm is not None:
+        return llm
+
+    # langchain_openai 导入较慢，第一次创建客户端时才导入
+    from langchain_openai import ChatOpenAI
+    http_client = get_http_client(config["pool"])
+    with _lock:
+        if key not in _llms:
+            _llms[key] = ChatOpenAI(
+                model=model,
+                temperature=temperature,
+                base_url=config["base_url"],
+                timeout=config["timeout"],
+                max_retries=config["max_retries"],
+                http_client=http_client
+            )
+            logger.info(f"创建 LLM 客户端: {model}" + (f" ({config['base_url']})" if config["base_url"] else ""))
+        return _llms[key]
+
+
+def close_clients() -> None:
+    """关闭共享连接池并清空缓存的 LLM 实例"""
+    global _http_client
+    with _lock:
+        _llms.clear()
+        if _http_client is not None:
+            _http_client.close()
+            _http_client = None
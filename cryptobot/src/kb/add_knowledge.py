@@ -11,11 +11,55 @@ def load_config(config_path: str = None) -> dict:
     """加载配置文件"""
     default_config = {
         "pdf_dir": "cryptobot/data/pdfs",
+        "pdf_workers": 4,
+        "batch_size": 64,
         "urls": [
             "https://www.theblockbeats.info/news/56667",
             "https://www.odaily.news/post/5198722",
             "https://foresightnews.pro/article/detail/77220"
-        ]
+        ],
+        "embedding": {
+            "provider": "openai",
+            "model": None,
+            "batch_size": None,
+            "workers": 1,
+            "pool": "thread",
+            "device": "cpu"
+        },
+        "chunking": {
+            "chunk_size": 500,
+            "chunk_overlap": 50
+        },
+        "fetch": {
+            "concurrency": 8,
+            "extract_workers": 2,
+            "browsers": 2,
+            "max_pages_per_browser": 50,
+            "cache": {
+                "ttl_hours": 24,
+                "max_mb": 200
+            },
+            "rate_limits": {
+                "default": 1.0,
+                "theblockbeats.info": 1.0,
+                "odaily.news": 0.5,
+                "foresightnews.pro": 0.5
+            }
+        },
+        "chain": {
+            "rpc_url": "https://api.mainnet-beta.solana.com",
+            "batch_size": 20,
+            "concurrency": 4,
+            "large_trade_sol": 50,
+            "max_items": 64,
+            "max_delay": 5.0,
+            "checkpoint_every": 50
+        },
+        "crawler": {
+            "feeds": [],
+            "batch_size": 32,
+            "interval": 600
+        }
     }
     
     if config_path and os.path.exists(config_path):
@@ -31,8 +75,16 @@ def main():
     parser = argparse.ArgumentParser(description='加载知识到知识库')
     parser.add_argument('--config', type=str, help='配置文件路径')
     parser.add_argument('--pdf-dir', type=str, help='PDF文件目录')
+    parser.add_argument('--workers', type=int, help='PDF提取进程数')
     parser.add_argument('--urls', nargs='+', help='URL列表')
+    parser.add_argument('--embedding', choices=['openai', 'local'], help='Embedding 后端（更换后需 --rebuild）')
     parser.add_argument('--clear', action='store_true', help='是否先清空知识库')
+    parser.add_argument('--sync', action='store_true', help='增量同步PDF目录（跳过未变化文件，替换修改文件，移除已删除文件）')
+    parser.add_argument('--rebuild', action='store_true', help='在新目录中完整重建知识库，完成后原子切换（聊天不中断）')
+    parser.add_argument('--chain-slots', type=int, nargs=2, metavar=('START', 'END'),
+                        help='扫描链上区块区间 [START, END)，从检查点继续')
+    parser.add_argument('--crawl', action='store_true', help='从配置的 RSS/sitemap 发现并抓取新文章')
+    parser.add_argument('--watch', action='store_true', help='与 --crawl 一起使用，持续定期抓取')
     args = parser.parse_args()
     
     # 加载配置
@@ -41,9 +93,15 @@ def main():
     # 命令行参数优先级高于配置文件
     pdf_dir = args.pdf_dir or config.get('pdf_dir')
     urls = args.urls or config.get('urls', [])
+    pdf_workers = args.workers or config.get('pdf_workers', 1)
+    embedding = dict(config.get('embedding') or {})
+    if args.embedding and args.embedding != embedding.get('provider'):
+        # 换后端时模型也要换成该后端的默认模型
+        embedding.update(provider=args.embedding, model=None)
     
     # 显示将要处理的内容
     logger.info("\n=== 知识库加载任务 ===")
+    logger.info(f"Embedding: {embedding.get('provider', 'openai')}")
     if pdf_dir:
         logger.info(f"PDF目录: {pdf_dir}")
         if os.path.exists(pdf_dir):
@@ -68,19 +126,49 @@ def main():
     
     # 执行加载
     try:
-        manager = KnowledgeManager()
+        manager = KnowledgeManager(
+            chunking=config.get('chunking'),
+            pdf_workers=pdf_workers,
+            batch_size=config.get('batch_size', 64),
+            fetch=config.get('fetch'),
+            chain=config.get('chain'),
+            embedding=embedding
+        )
         if args.clear:
             from cryptobot.src.kb.clear_kb import clear_knowledge_base
             clear_knowledge_base()
             logger.info("已清空知识库")
         
-        results = manager.load_all(pdf_dir=pdf_dir, urls=urls)
+        if args.rebuild:
+            results = manager.rebuild(pdf_dir=pdf_dir, urls=urls)
+        else:
+            results = manager.load_all(pdf_dir=pdf_dir, urls=urls, sync=args.sync)
         
         # 显示结果
         logger.info("\n=== 加载完成 ===")
         logger.info(f"成功加载 {results['pdfs_loaded']} 个PDF文件")
         logger.info(f"成功加载 {results['urls_loaded']} 个URL")
         
+        if args.chain_slots:
+            chain_results = manager.scan_chain(*args.chain_slots)
+            logger.info(f"扫描 {chain_results['blocks']} 个区块，写入 {chain_results['events']} 条链上事件")
+        
+        if args.crawl:
+            from cryptobot.src.kb.loaders.web_loader import WebLoader
+            crawler = config.get('crawler') or {}
+            web_loader = WebLoader(manager, crawler.get('feeds') or [], batch_size=crawler.get('batch_size', 32))
+            web_loader.run(interval=crawler.get('interval', 600), rounds=None if args.watch else 1)
+        
+        stats = manager.kb.embeddings.stats()
+        logger.info(f"向量缓存: 命中 {stats['hits']} 次, 未命中 {stats['misses']} 次, "
+                    f"命中率 {stats['hit_rate']:.1%}, 共 {stats['entries']} 条")
+        
+        # 本次没有抓取网页时不创建抓取组件
+        if manager._url_loader is not None:
+            page_stats = manager.url_loader.page_cache.stats()
+            logger.info(f"页面缓存: 命中 {page_stats['hits']} 次, 重新验证 {page_stats['revalidated']} 次, "
+                        f"共 {page_stats['entries']} 个页面 ({page_stats['size_mb']:.1f} MB)")
+        
     except Exception as e:
         logger.error(f"加载过程出错: {str(e)}")
         logger.error(f"错误类型: {type(e)}")
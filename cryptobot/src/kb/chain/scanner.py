@@ -0,0 +1,241 @@
+import asyncio
+import inspect
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+"""
+BlockScanner 类设计说明：
+
+链上数据扫描引擎，按区块（Solana 为 slot）区间通过 JSON-RPC 拉取数据：
+1. 批量请求：一次 HTTP 请求携带 batch_size 个 getBlock 调用
+2. 流水线：concurrency 个区间同时在途，结果按区块顺序交给处理函数
+3. 背压：已抓取但未处理的区间数有上限，处理变慢时抓取自动暂停
+4. 断点续扫：每处理完 checkpoint_every 个区间，先调用 on_checkpoint 让调用方把缓冲的数据落盘，
+   再把下一个区块号和扫描范围写入检查点文件；只有扫描同一范围时才从检查点继续，其他范围从头扫描
+5. 被跳过的 slot（节点返回 -32007/-32009）不算错误，网络错误和限流按指数退避重试
+"""
+
+# Solana：slot 被跳过或不在长期存储中
+SKIPPED_SLOT_ERRORS = (-32007, -32009)
+
+Block = Tuple[int, Dict[str, Any]]
+
+
+class RPCError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(f"RPC 错误 {code}: {message}")
+        self.code = code
+
+
+def solana_block_params(slot: int) -> list:
+    """Solana getBlock 的默认参数：完整交易、不含奖励"""
+    return [slot, {
+        "encoding": "json",
+        "maxSupportedTransactionVersion": 0,
+        "transactionDetails": "full",
+        "rewards": False
+    }]
+
+
+class Checkpoint:
+    """JSON 检查点文件，记录扫描范围和下一个待扫描的区块号"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self, start: int, end: int) -> Optional[int]:
+        """返回 [start, end) 范围未完成时的续扫位置；范围不同或已扫完时返回 None"""
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("start") != start or state.get("end") != end:
+            return None
+        next_block = state.get("next_block")
+        if next_block is None or not start <= next_block < end:
+            return None
+        return next_block
+
+    def save(self, next_block: int, start: int, end: int) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"start": start, "end": end, "next_block": next_block,
+                       "updated_at": datetime.now().isoformat()}, f)
+        # 原子替换，中途退出不会留下损坏的检查点
+        os.replace(tmp_path, self.path)
+
+
+class JSONRPCClient:
+    def __init__(self, session: aiohttp.ClientSession, url: str, retries: int = 3, backoff: float = 0.5):
+        self.session = session
+        self.url = url
+        self.retries = retries
+        self.backoff = backoff
+        self.requests = 0
+
+    async def batch(self, method: str, params_list: List[list]) -> List[Any]:
+        """在一次 HTTP 请求中发送多个调用，按顺序返回结果（被跳过的区块为 None）"""
+        payload = [{"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+                   for i, params in enumerate(params_list)]
+        for attempt in range(self.retries + 1):
+            try:
+                self.requests += 1
+                async with self.session.post(self.url, json=payload) as response:
+                    if response.status == 429 or response.status >= 500:
+                        raise aiohttp.ClientResponseError(
+                            response.request_info, response.history, status=response.status
+                        )
+                    response.raise_for_status()
+                    replies = await response.json()
+                return _collect_results(replies, len(params_list))
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff * 2 ** attempt
+                logger.info(f"RPC 请求失败，{delay:.1f}s 后重试: {str(e)}")
+                await asyncio.sleep(delay)
+
+
+def _collect_results(replies, expected: int) -> List[Any]:
+    if isinstance(replies, dict):
+        # 整个批次被拒绝时节点返回单个错误对象
+        error = replies.get("error") or {}
+        raise RPCError(error.get("code", 0), error.get("message", str(replies)))
+    results: List[Any] = [None] * expected
+    for reply in replies:
+        error = reply.get("error")
+        if error:
+            if error.get("code") in SKIPPED_SLOT_ERRORS:
+                continue
+            raise RPCError(error.get("code", 0), error.get("message", ""))
+        results[reply["id"]] = reply.get("result")
+    return results
+
+
+class BlockScanner:
+    def __init__(self, rpc_url: str, method: str = "getBlock",
+                 params: Callable[[int], list] = solana_block_params,
+                 batch_size: int = 20, concurrency: int = 4, max_pending: int = 8,
+                 checkpoint_path: str = None, checkpoint_every: int = 1,
+                 timeout: float = 30, retries: int = 3):
+        """
+        Args:
+            rpc_url: JSON-RPC 节点地址
+            method: 拉取单个区块的方法名
+            params: 区块号 -> 调用参数
+            batch_size: 每个批量请求（即每个区间）包含的区块数
+            concurrency: 同时在途的批量请求数
+            max_pending: 已抓取但尚未处理的区间数上限（背压）
+            checkpoint_path: 检查点文件路径，为空则不续扫
+            checkpoint_every: 每处理多少个区间保存一次检查点（最后一个区间总会保存）
+            retries: 网络错误或限流时的重试次数
+        """
+        self.rpc_url = rpc_url
+        self.method = method
+        self.params = params
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.checkpoint = Checkpoint(checkpoint_path) if checkpoint_path else None
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.timeout = timeout
+        self.retries = retries
+
+    def run(self, start: int, end: int, on_blocks: Callable[[List[Block]], Any],
+            on_checkpoint: Callable[[], Any] = None) -> Dict[str, float]:
+        """扫描 [start, end) 区间，on_blocks 可以是普通函数或协程函数
+
+        on_checkpoint 在每次保存检查点之前调用：on_blocks 缓冲在内存中的数据需在这里落盘，
+        抛出异常时不保存检查点，续扫时会重新处理这些区块
+        """
+        return asyncio.run(self.scan(start, end, on_blocks, on_checkpoint))
+
+    async def scan(self, start: int, end: int, on_blocks: Callable[[List[Block]], Any],
+                   on_checkpoint: Callable[[], Any] = None) -> Dict[str, float]:
+        first = start
+        if self.checkpoint:
+            resume = self.checkpoint.load(start, end)
+            if resume is not None and resume > start:
+                logger.info(f"从检查点继续扫描: {resume}")
+                first = resume
+
+        ranges = [(s, min(s + self.batch_size, end)) for s in range(first, end, self.batch_size)]
+        stats = {"blocks": 0, "skipped": 0, "requests": 0, "elapsed": 0.0}
+        if not ranges:
+            return stats
+
+        begin = time.perf_counter()
+        pending = iter(ranges)
+        # 在途 + 已抓取未处理的区间总数上限，先占位再取区间，保证按顺序占位
+        window = asyncio.Semaphore(self.concurrency + self.max_pending)
+        results: asyncio.Queue = asyncio.Queue(maxsize=self.max_pending)
+
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            client = JSONRPCClient(session, self.rpc_url, retries=self.retries)
+
+            async def worker() -> None:
+                while True:
+                    await window.acquire()
+                    block_range = next(pending, None)
+                    if block_range is None:
+                        window.release()
+                        return
+                    try:
+                        blocks = await self._fetch_range(client, *block_range)
+                    except Exception as e:
+                        await results.put((block_range, e))
+                        return
+                    await results.put((block_range, blocks))
+
+            workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+            try:
+                buffered = {}
+                processed = 0
+                for block_range in ranges:
+                    # 结果可能乱序到达，缓存后按区块顺序处理
+                    while block_range not in buffered:
+                        done_range, blocks = await results.get()
+                        if isinstance(blocks, Exception):
+                            raise blocks
+                        buffered[done_range] = blocks
+                    blocks = buffered.pop(block_range)
+
+                    result = on_blocks(blocks)
+                    if inspect.isawaitable(result):
+                        await result
+                    window.release()
+
+                    stats["blocks"] += len(blocks)
+                    stats["skipped"] += (block_range[1] - block_range[0]) - len(blocks)
+                    processed += 1
+                    if self.checkpoint and (processed % self.checkpoint_every == 0 or block_range == ranges[-1]):
+                        if on_checkpoint:
+                            result = on_checkpoint()
+                            if inspect.isawaitable(result):
+                                await result
+                        self.checkpoint.save(block_range[1], start, end)
+            finally:
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+            stats["requests"] = client.requests
+
+        stats["elapsed"] = time.perf_counter() - begin
+        logger.info(f"扫描完成 [{start}, {end})：{stats['blocks']} 个区块，跳过 {stats['skipped']} 个，"
+                    f"{stats['requests']} 次请求，耗时 {stats['elapsed']:.2f}s")
+        return stats
+
+    async def _fetch_range(self, client: JSONRPCClient, start: int, end: int) -> List[Block]:
+        slots = list(range(start, end))
+        results = await client.batch(self.method, [self.params(slot) for slot in slots])
+        return [(slot, block) for slot, block in zip(slots, results) if block is not None]
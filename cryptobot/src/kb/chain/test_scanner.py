@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import tempfile
+from pathlib import Path
+import aiohttp
+import pytest
+from aiohttp import web
+from cryptobot.src.kb.chain.scanner import BlockScanner, Checkpoint
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+# 模拟的链上数据：slot -> 区块，能被 7 整除的 slot 视为被跳过
+RECORDED_BLOCKS = {
+    slot: {"blockHeight": slot - 100, "blockTime": 1700000000 + slot, "transactions": [{"slot": slot}]}
+    for slot in range(1000, 1100) if slot % 7
+}
+
+class MockRPC:
+    """回放预先记录的区块的本地 JSON-RPC 服务"""
+
+    def __init__(self, blocks, delay: float = 0.01):
+        self.blocks = blocks
+        self.delay = delay
+        self.batches = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.fail_at = None
+
+    async def handle(self, request):
+        calls = await request.json()
+        self.batches.append(len(calls))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        replies = []
+        for call in calls:
+            slot = call["params"][0]
+            if slot == self.fail_at:
+                return web.Response(status=503)
+            if slot in self.blocks:
+                replies.append({"jsonrpc": "2.0", "id": call["id"], "result": self.blocks[slot]})
+            else:
+                replies.append({"jsonrpc": "2.0", "id": call["id"],
+                                "error": {"code": -32007, "message": f"Slot {slot} was skipped"}})
+        return web.json_response(replies)
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/", self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}/"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+def test_scan_in_order():
+    """测试批量请求、并发流水线和按顺序交付"""
+    async def run():
+        rpc = MockRPC(RECORDED_BLOCKS)
+        url = await rpc.start()
+        received = []
+        try:
+            scanner = BlockScanner(url, batch_size=10, concurrency=4)
+            stats = await scanner.scan(1000, 1100, lambda blocks: received.extend(blocks))
+        finally:
+            await rpc.stop()
+        return rpc, received, stats
+
+    rpc, received, stats = asyncio.run(run())
+    logger.info(f"批量请求: {rpc.batches}，最大并发: {rpc.max_in_flight}")
+    assert [slot for slot, _ in received] == sorted(RECORDED_BLOCKS)
+    assert stats["blocks"] == len(RECORDED_BLOCKS)
+    assert stats["skipped"] == 100 - len(RECORDED_BLOCKS)
+    assert rpc.batches == [10] * 10
+    assert rpc.max_in_flight > 1
+
+def test_backpressure_and_resume(tmp_path):
+    """测试处理变慢时抓取暂停，以及出错后从检查点继续"""
+    checkpoint = str(tmp_path / "scanner.json")
+
+    async def run():
+        rpc = MockRPC(RECORDED_BLOCKS, delay=0)
+        url = await rpc.start()
+        try:
+            scanner = BlockScanner(url, batch_size=5, concurrency=2, max_pending=2,
+                                  checkpoint_path=checkpoint, retries=1)
+
+            # 处理很慢：记录每次处理时已发出的请求数，不应超过 已处理 + 在途 + 缓冲
+            handled = []
+            requested = []
+
+            async def slow(blocks):
+                await asyncio.sleep(0.02)
+                handled.append(blocks)
+                requested.append(len(rpc.batches))
+
+            # 第一次扫描在 slot 1050 处遇到持续的 503 而中断
+            rpc.fail_at = 1050
+            with pytest.raises(aiohttp.ClientResponseError) as error:
+                await scanner.scan(1000, 1100, slow)
+            assert error.value.status == 503
+            saved = Checkpoint(checkpoint).load(1000, 1100)
+
+            # 恢复后从检查点继续，不再重复已处理的区间
+            rpc.fail_at = None
+            resumed = []
+            await scanner.scan(1000, 1100, lambda blocks: resumed.extend(blocks))
+        finally:
+            await rpc.stop()
+        return handled, requested, saved, resumed
+
+    handled, requested, saved, resumed = asyncio.run(run())
+    assert all(count <= i + 1 + 2 + 2 for i, count in enumerate(requested))
+    done = [slot for blocks in handled for slot, _ in blocks]
+    assert done and max(done) < 1050
+    # 检查点停在最后一个处理完的区间之后
+    assert saved is not None and max(done) < saved <= 1050
+    assert [slot for slot, _ in resumed][0] >= 1050 - 5
+    assert sorted(done + [slot for slot, _ in resumed]) == sorted(RECORDED_BLOCKS)
+
+def test_checkpoint_range(tmp_path):
+    """检查点只对同一扫描范围有效，扫完后或换范围时从头扫描"""
+    checkpoint = str(tmp_path / "scanner.json")
+
+    async def run():
+        rpc = MockRPC(RECORDED_BLOCKS, delay=0)
+        url = await rpc.start()
+        try:
+            scanner = BlockScanner(url, batch_size=10, checkpoint_path=checkpoint)
+            await scanner.scan(1000, 1100, lambda blocks: None)
+            earlier = []
+            await scanner.scan(1000, 1050, lambda blocks: earlier.extend(blocks))
+            again = []
+            await scanner.scan(1000, 1050, lambda blocks: again.extend(blocks))
+        finally:
+            await rpc.stop()
+        return earlier, again
+
+    earlier, again = asyncio.run(run())
+    expected = [slot for slot in sorted(RECORDED_BLOCKS) if slot < 1050]
+    assert [slot for slot, _ in earlier] == expected
+    assert [slot for slot, _ in again] == expected
+    assert Checkpoint(checkpoint).load(1000, 1050) is None
+
+    state = Checkpoint(checkpoint)
+    state.save(1030, 1000, 1050)
+    assert state.load(1000, 1050) == 1030
+    assert state.load(1000, 1100) is None
+    assert state.load(1040, 1050) is None
+
+def test_flush_before_checkpoint(tmp_path):
+    """保存检查点之前先调用 on_checkpoint；它失败时检查点停在上一次成功落盘的位置"""
+    checkpoint = str(tmp_path / "scanner.json")
+    saved_at = []
+
+    async def run():
+        rpc = MockRPC(RECORDED_BLOCKS, delay=0)
+        url = await rpc.start()
+        try:
+            scanner = BlockScanner(url, batch_size=10, checkpoint_path=checkpoint, checkpoint_every=3)
+            pending = []
+
+            def on_blocks(blocks):
+                pending.extend(slot for slot, _ in blocks)
+
+            def on_checkpoint():
+                if pending[-1] >= 1060:
+                    raise RuntimeError("flush failed")
+                saved_at.append(pending[-1])
+                pending.clear()
+
+            with pytest.raises(RuntimeError):
+                await scanner.scan(1000, 1100, on_blocks, on_checkpoint)
+            first = Checkpoint(checkpoint).load(1000, 1100)
+
+            resumed = []
+            await scanner.scan(1000, 1100, lambda blocks: resumed.extend(blocks), lambda: saved_at.append("end"))
+        finally:
+            await rpc.stop()
+        return first, resumed
+
+    first, resumed = asyncio.run(run())
+    # 每 3 个区间（30 个 slot）落盘一次：1000-1029 成功，1030-1059 成功，1060-1089 失败
+    assert saved_at[:2] == [max(s for s in RECORDED_BLOCKS if s < 1030), max(s for s in RECORDED_BLOCKS if s < 1060)]
+    assert first == 1060
+    assert [slot for slot, _ in resumed] == [slot for slot in sorted(RECORDED_BLOCKS) if slot >= 1060]
+    # 续扫 4 个区间：第 3 个和最后一个各落盘一次
+    assert saved_at[2:] == ["end", "end"]
+    assert Checkpoint(checkpoint).load(1000, 1100) is None
+
+if __name__ == "__main__":
+    test_scan_in_order()
+    for test in (test_backpressure_and_resume, test_checkpoint_range, test_flush_before_checkpoint):
+        with tempfile.TemporaryDirectory() as tmp:
+            test(Path(tmp))
@@ -0,0 +1,116 @@
+import logging
+import tempfile
+from pathlib import Path
+from cryptobot.src.kb.chain.wallet import WalletIndexer, decode_block, WSOL_MINT
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+KOL = "0xSunWallet1111111111111111111111111111111"
+OTHER = "OtherWallet22222222222222222222222222222222"
+PEPE = "PepeMint333333333333333333333333333333333333"
+WIF = "WifMint4444444444444444444444444444444444444"
+
+def event(slot, wallet, mint, kind, tokens, sol=0.0):
+    return {"slot": slot, "block_time": 1700000000 + slot, "wallet": wallet, "mint": mint,
+            "kind": kind, "token_amount": tokens, "sol_amount": sol}
+
+def test_wallet_queries_across_segments(tmp_path):
+    """测试跨段查询：最近买卖、持仓、盈亏，并在重新打开后保持一致"""
+    index_dir = str(tmp_path)
+    indexer = WalletIndexer(index_dir, segment_rows=3)
+    indexer.add([
+        event(1, KOL, PEPE, "buy", 1000, 1.0),
+        event(2, OTHER, PEPE, "buy", 500, 0.4),
+        event(3, KOL, PEPE, "buy", 1000, 3.0),
+        event(4, KOL, WIF, "transfer_in", 50),
+        event(5, KOL, PEPE, "sell", 1000, 4.0),
+        event(6, OTHER, WIF, "buy", 10, 0.1),
+        event(7, KOL, WIF, "transfer_out", 20),
+    ])
+    # 前 6 行已写成两个段，最后 1 行仍在缓冲区
+    assert len(indexer.segments) == 2
+
+    def check(index):
+        swaps = index.recent_swaps(KOL, limit=2)
+        assert [(s["slot"], s["side"]) for s in swaps] == [(5, "sell"), (3, "buy")]
+        assert index.holdings(KOL) == {PEPE: 1000.0, WIF: 30.0}
+        pnl = index.pnl(KOL)
+        # 平均成本 2 SOL / 1000，卖出 1000 得 4 SOL，盈利 2 SOL
+        assert abs(pnl[PEPE]["realized"] - 2.0) < 1e-9
+        assert abs(pnl[PEPE]["cost_basis"] - 2.0) < 1e-9
+        assert abs(pnl["total"]["realized"] - 2.0) < 1e-9
+        assert index.holdings("unknown") == {}
+
+    check(indexer)
+    indexer.flush()
+    reopened = WalletIndexer(index_dir, segment_rows=3)
+    assert len(reopened.segments) == 3
+    check(reopened)
+
+def test_rescan_is_idempotent(tmp_path):
+    """重复扫描同一区间时已写入的 slot 整块跳过，持仓和盈亏不会翻倍"""
+    blocks = [
+        [event(1, KOL, PEPE, "buy", 1000, 1.0)],
+        [event(2, OTHER, PEPE, "buy", 500, 0.4), event(2, KOL, PEPE, "sell", 400, 0.8)],
+        [event(3, KOL, WIF, "transfer_in", 50)],
+    ]
+    indexer = WalletIndexer(str(tmp_path), segment_rows=2)
+    assert [indexer.add(block) for block in blocks] == [1, 2, 1]
+    # 缓冲区在 slot 边界写成段，不会拆开 slot 2
+    assert [len(segment.columns["slot"]) for segment in indexer.segments] == [3]
+    expected = (indexer.holdings(KOL), indexer.pnl(KOL)["total"]["realized"])
+
+    # 已写入段的 slot 和仍在缓冲区的 slot 都会跳过
+    assert [indexer.add(block) for block in blocks] == [0, 0, 0]
+    assert (indexer.holdings(KOL), indexer.pnl(KOL)["total"]["realized"]) == expected
+    indexer.flush()
+
+    reopened = WalletIndexer(str(tmp_path), segment_rows=2)
+    assert [reopened.add(block) for block in blocks] == [0, 0, 0]
+    assert reopened.add([event(4, KOL, WIF, "transfer_out", 20)]) == 1
+    assert reopened.holdings(KOL) == {PEPE: 600.0, WIF: 30.0}
+    assert reopened.pnl(KOL)["total"]["realized"] == expected[1]
+
+def test_decode_block():
+    """测试根据余额变化把交易解码为买入/卖出/转账"""
+    def token_balance(index, owner, mint, amount):
+        return {"accountIndex": index, "owner": owner, "mint": mint, "uiTokenAmount": {"uiAmount": amount}}
+
+    block = {"blockTime": 1700000000, "transactions": [
+        {   # KOL 用 2 SOL 买入 PEPE
+            "transaction": {"message": {"accountKeys": [KOL, "PepeAta", "Pool"]}},
+            "meta": {"err": None, "preBalances": [5_000_000_000, 0, 0], "postBalances": [3_000_000_000, 0, 0],
+                     "preTokenBalances": [], "postTokenBalances": [token_balance(1, KOL, PEPE, 1000.0)]}
+        },
+        {   # OTHER 通过 Wrapped SOL 卖出 WIF，KOL 支付手续费转出 PEPE 给 OTHER
+            "transaction": {"message": {"accountKeys": [OTHER, KOL]}},
+            "meta": {"err": None, "preBalances": [1_000_000_000, 1_000_000_000],
+                     "postBalances": [999_995_000, 999_995_000],
+                     "preTokenBalances": [token_balance(2, OTHER, WIF, 10.0), token_balance(3, OTHER, WSOL_MINT, 0.0),
+                                          token_balance(4, KOL, PEPE, 1000.0)],
+                     "postTokenBalances": [token_balance(2, OTHER, WIF, 0.0), token_balance(3, OTHER, WSOL_MINT, 0.5),
+                                           token_balance(4, KOL, PEPE, 900.0), token_balance(5, OTHER, PEPE, 100.0)]}
+        },
+        {   # 失败的交易不计入
+            "transaction": {"message": {"accountKeys": [KOL]}},
+            "meta": {"err": {"InstructionError": [0, "Custom"]}, "preBalances": [0], "postBalances": [0],
+                     "preTokenBalances": [], "postTokenBalances": [token_balance(1, KOL, WIF, 1.0)]}
+        },
+    ]}
+    events = decode_block(42, block)
+    summary = sorted((e["wallet"], e["mint"], e["kind"], round(e["token_amount"], 6)) for e in events)
+    logger.info(f"解码结果: {summary}")
+    assert summary == sorted([
+        (KOL, PEPE, "buy", 1000.0),
+        (OTHER, WIF, "sell", 10.0),
+        (KOL, PEPE, "transfer_out", 100.0),
+        (OTHER, PEPE, "transfer_in", 100.0),
+    ])
+    assert abs(next(e for e in events if e["kind"] == "sell")["sol_amount"] - 0.499995) < 1e-9
+
+if __name__ == "__main__":
+    for test in (test_wallet_queries_across_segments, test_rescan_is_idempotent):
+        with tempfile.TemporaryDirectory() as tmp:
+            test(Path(tmp))
+    test_decode_block()
@@ -0,0 +1,302 @@
+import os
+import threading
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+"""
+WalletIndexer 类设计说明：
+
+钱包活动索引（KOL 钱包跟踪），消费解码后的交易事件：
+1. 地址和代币 mint 字符串映射为整数 ID（Interner，追加写入文本文件）
+2. 事件按列存储为 NumPy 数组，攒满 segment_rows 行后写成一个只追加的段（.npy，按 mmap 读取）
+3. 每个段内按 (钱包, slot) 排序，并保存钱包 ID -> 行区间 的偏移表（CSR），
+   查询某个钱包时每段只需一次二分查找和一次连续切片，不扫描全部历史
+4. 在此基础上回答：最近的买卖、当前持仓、按平均成本计算的盈亏
+5. 以 slot 为单位去重：已写入过的 slot 再次出现时（重新扫描同一区间）整块跳过，
+   持仓和盈亏不会重复累计；缓冲区只在 slot 边界写成段，段内不会只有半个 slot
+"""
+
+BUY, SELL, TRANSFER_IN, TRANSFER_OUT = range(4)
+KIND_NAMES = ["buy", "sell", "transfer_in", "transfer_out"]
+SWAP_KINDS = (BUY, SELL)
+
+# Wrapped SOL，作为计价资产而不是持仓代币
+WSOL_MINT = "So11111111111111111111111111111111111111112"
+LAMPORTS_PER_SOL = 1_000_000_000
+
+COLUMNS = {
+    "slot": np.int64,
+    "block_time": np.int64,
+    "wallet": np.uint32,
+    "mint": np.uint32,
+    "kind": np.uint8,
+    # 钱包代币数量变化（买入/转入为正）
+    "token_amount": np.float64,
+    # 钱包 SOL 变化（买入为负，卖出为正）
+    "sol_amount": np.float64,
+}
+
+
+class Interner:
+    """字符串 <-> 整数 ID，ID 按首次出现顺序分配并追加写入文件"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._ids: Dict[str, int] = {}
+        self._values: List[str] = []
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    self._add(line.rstrip("\n"))
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _add(self, value: str) -> int:
+        self._ids[value] = len(self._values)
+        self._values.append(value)
+        return self._ids[value]
+
+    def intern(self, value: str) -> int:
+        if value not in self._ids:
+            self._file.write(value + "\n")
+            return self._add(value)
+        return self._ids[value]
+
+    def get(self, value: str) -> Optional[int]:
+        return self._ids.get(value)
+
+    def lookup(self, value_id: int) -> str:
+        return self._values[value_id]
+
+    def flush(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+
+class Segment:
+    """一个只读段：各列数组 + 钱包偏移表"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in COLUMNS}
+        self.wallets = np.load(os.path.join(path, "wallets.npy"))
+        self.offsets = np.load(os.path.join(path, "offsets.npy"))
+
+    def rows_for(self, wallet_id: int) -> Optional[slice]:
+        i = np.searchsorted(self.wallets, wallet_id)
+        if i == len(self.wallets) or self.wallets[i] != wallet_id:
+            return None
+        return slice(int(self.offsets[i]), int(self.offsets[i + 1]))
+
+    @staticmethod
+    def write(path: str, columns: Dict[str, np.ndarray]) -> "Segment":
+        """按 (钱包, slot) 排序后写入各列和偏移表"""
+        order = np.lexsort((columns["slot"], columns["wallet"]))
+        tmp_path = path + ".tmp"
+        os.makedirs(tmp_path, exist_ok=True)
+        for name, values in columns.items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), values[order])
+        wallets, starts = np.unique(columns["wallet"][order], return_index=True)
+        np.save(os.path.join(tmp_path, "wallets.npy"), wallets)
+        np.save(os.path.join(tmp_path, "offsets.npy"), np.append(starts, len(order)).astype(np.int64))
+        # 整个段写完后再改名，读取方不会看到写了一半的段
+        os.replace(tmp_path, path)
+        return Segment(path)
+
+
+class WalletIndexer:
+    def __init__(self, index_dir: str = "cryptobot/data/wallet_index", segment_rows: int = 100_000):
+        self.index_dir = index_dir
+        self.segment_rows = segment_rows
+        self._lock = threading.RLock()
+        os.makedirs(index_dir, exist_ok=True)
+        self.addresses = Interner(os.path.join(index_dir, "addresses.txt"))
+        self.mints = Interner(os.path.join(index_dir, "mints.txt"))
+        self.segments = [
+            Segment(os.path.join(index_dir, name))
+            for name in sorted(os.listdir(index_dir))
+            if name.startswith("segment_") and not name.endswith(".tmp")
+        ]
+        self._buffer: Dict[str, list] = {name: [] for name in COLUMNS}
+        # 已写入段的 slot（有序）和缓冲区中的 slot
+        self._slots = np.unique(np.concatenate([segment.columns["slot"] for segment in self.segments])) \
+            if self.segments else np.array([], dtype=np.int64)
+        self._buffered_slots = set()
+        logger.info(f"钱包索引已加载：{len(self.segments)} 个段，{len(self.addresses._values)} 个地址")
+
+    def has_slot(self, slot: int) -> bool:
+        """该 slot 的事件是否已经写入过"""
+        i = np.searchsorted(self._slots, slot)
+        return bool(i < len(self._slots) and self._slots[i] == slot) or slot in self._buffered_slots
+
+    def add(self, events: Iterable[dict]) -> int:
+        """追加交易事件，返回新增的行数（已写入过的 slot 整块跳过）
+
+        每个事件包含 slot、block_time、wallet、mint、kind（buy/sell/transfer_in/transfer_out）、
+        token_amount（数量，正数）和 sol_amount（SOL 金额，正数）；同一个 slot 的事件需在一次调用中传入
+        """
+        events = list(events)
+        count = 0
+        with self._lock:
+            fresh = {slot for slot in {event["slot"] for event in events} if not self.has_slot(slot)}
+            for event in events:
+                if event["slot"] not in fresh:
+                    continue
+                # 缓冲区满时只在 slot 边界写段
+                if len(self._buffer["slot"]) >= self.segment_rows and self._buffer["slot"][-1] != event["slot"]:
+                    self.flush()
+                kind = KIND_NAMES.index(event["kind"])
+                token_sign = 1 if kind in (BUY, TRANSFER_IN) else -1
+                sol_sign = -1 if kind == BUY else 1 if kind == SELL else 0
+                self._buffer["slot"].append(event["slot"])
+                self._buffer["block_time"].append(event.get("block_time") or 0)
+                self._buffer["wallet"].append(self.addresses.intern(event["wallet"]))
+                self._buffer["mint"].append(self.mints.intern(event["mint"]))
+                self._buffer["kind"].append(kind)
+                self._buffer["token_amount"].append(token_sign * abs(event["token_amount"]))
+                self._buffer["sol_amount"].append(sol_sign * abs(event.get("sol_amount") or 0))
+                self._buffered_slots.add(event["slot"])
+                count += 1
+            if count < len(events):
+                logger.info(f"跳过已写入钱包索引的 {len(events) - count} 个事件")
+            if len(self._buffer["slot"]) >= self.segment_rows:
+                self.flush()
+        return count
+
+    def flush(self) -> None:
+        """把缓冲区写成一个新段"""
+        with self._lock:
+            if not self._buffer["slot"]:
+                return
+            columns = {name: np.asarray(values, dtype=COLUMNS[name]) for name, values in self._buffer.items()}
+            self.addresses.flush()
+            self.mints.flush()
+            path = os.path.join(self.index_dir, f"segment_{len(self.segments):06d}")
+            self.segments.append(Segment.write(path, columns))
+            self._slots = np.union1d(self._slots, columns["slot"])
+            self._buffer = {name: [] for name in COLUMNS}
+            self._buffered_slots = set()
+            logger.info(f"写入钱包索引段 {os.path.basename(path)}：{len(columns['slot'])} 行")
+
+    def wallet_rows(self, wallet: str) -> Dict[str, np.ndarray]:
+        """取出某个钱包的全部行（按 slot 升序）"""
+        wallet_id = self.addresses.get(wallet)
+        parts = {name: [] for name in COLUMNS}
+        if wallet_id is None:
+            return {name: np.array([], dtype=dtype) for name, dtype in COLUMNS.items()}
+        with self._lock:
+            for segment in self.segments:
+                rows = segment.rows_for(wallet_id)
+                if rows is not None:
+                    for name in COLUMNS:
+                        parts[name].append(np.asarray(segment.columns[name][rows]))
+            buffered = [i for i, w in enumerate(self._buffer["wallet"]) if w == wallet_id]
+            if buffered:
+                for name, dtype in COLUMNS.items():
+                    parts[name].append(np.asarray([self._buffer[name][i] for i in buffered], dtype=dtype))
+        merged = {name: np.concatenate(parts[name]) if parts[name] else np.array([], dtype=COLUMNS[name])
+                  for name in COLUMNS}
+        order = np.argsort(merged["slot"], kind="stable")
+        return {name: values[order] for name, values in merged.items()}
+
+    def recent_swaps(self, wallet: str, limit: int = 20) -> List[dict]:
+        """最近的买卖记录（最新的在前）"""
+        rows = self.wallet_rows(wallet)
+        swap_idx = np.flatnonzero(np.isin(rows["kind"], SWAP_KINDS))[::-1][:limit]
+        return [{
+            "slot": int(rows["slot"][i]),
+            "block_time": int(rows["block_time"][i]),
+            "mint": self.mints.lookup(int(rows["mint"][i])),
+            "side": KIND_NAMES[rows["kind"][i]],
+            "token_amount": abs(float(rows["token_amount"][i])),
+            "sol_amount": abs(float(rows["sol_amount"][i]))
+        } for i in swap_idx]
+
+    def holdings(self, wallet: str, min_amount: float = 1e-9) -> Dict[str, float]:
+        """当前持仓：{mint: 数量}"""
+        rows = self.wallet_rows(wallet)
+        if not len(rows["mint"]):
+            return {}
+        mints, inverse = np.unique(rows["mint"], return_inverse=True)
+        totals = np.bincount(inverse, weights=rows["token_amount"])
+        return {self.mints.lookup(int(m)): float(t) for m, t in zip(mints, totals) if t > min_amount}
+
+    def pnl(self, wallet: str) -> Dict[str, dict]:
+        """按平均成本法计算每个代币的已实现盈亏（SOL）
+
+        Returns:
+            {mint: {"realized": 已实现盈亏, "position": 持仓数量, "cost_basis": 持仓成本}}
+            以及 "total": {"realized": 合计}
+        """
+        rows = self.wallet_rows(wallet)
+        state = defaultdict(lambda: {"realized": 0.0, "position": 0.0, "cost_basis": 0.0})
+        for mint_id, kind, tokens, sol in zip(rows["mint"], rows["kind"], rows["token_amount"], rows["sol_amount"]):
+            entry = state[self.mints.lookup(int(mint_id))]
+            if kind == BUY:
+                entry["cost_basis"] += -sol
+                entry["position"] += tokens
+            elif kind == SELL and entry["position"] > 0:
+                sold = min(-tokens, entry["position"])
+                cost = entry["cost_basis"] * sold / entry["position"]
+                entry["realized"] += sol * (sold / -tokens) - cost
+                entry["cost_basis"] -= cost
+                entry["position"] -= sold
+            elif kind == TRANSFER_IN:
+                # 转入的代币没有成本
+                entry["position"] += tokens
+            elif kind == TRANSFER_OUT and entry["position"] > 0:
+                moved = min(-tokens, entry["position"])
+                entry["cost_basis"] -= entry["cost_basis"] * moved / entry["position"]
+                entry["position"] -= moved
+        result = dict(state)
+        result["total"] = {"realized": sum(entry["realized"] for entry in state.values())}
+        return result
+
+
+def decode_block(slot: int, block: dict) -> List[dict]:
+    """从 getBlock（json 编码）结果中按余额变化解码出钱包事件
+
+    代币余额增加且 SOL 减少视为买入，代币减少且 SOL 增加视为卖出，
+    其余的代币余额变化视为转入/转出。SOL 变化包含原生 SOL 和 Wrapped SOL。
+    """
+    events = []
+    for tx in block.get("transactions") or []:
+        meta = tx.get("meta") or {}
+        if meta.get("err") is not None:
+            continue
+        account_keys = [key if isinstance(key, str) else key.get("pubkey")
+                        for key in tx["transaction"]["message"]["accountKeys"]]
+        lamports = {account_keys[i]: post - pre for i, (pre, post)
+                    in enumerate(zip(meta.get("preBalances", []), meta.get("postBalances", [])))}
+
+        # (owner, mint) -> 代币数量变化
+        token_deltas: Dict[tuple, float] = defaultdict(float)
+        for sign, balances in ((-1, meta.get("preTokenBalances")), (1, meta.get("postTokenBalances"))):
+            for balance in balances or []:
+                owner = balance.get("owner")
+                if owner:
+                    amount = balance["uiTokenAmount"].get("uiAmount") or 0.0
+                    token_deltas[(owner, balance["mint"])] += sign * amount
+
+        for (owner, mint), delta in token_deltas.items():
+            if mint == WSOL_MINT or abs(delta) < 1e-12:
+                continue
+            sol_delta = lamports.get(owner, 0) / LAMPORTS_PER_SOL + token_deltas.get((owner, WSOL_MINT), 0.0)
+            if delta > 0:
+                kind = "buy" if sol_delta < 0 else "transfer_in"
+            else:
+                kind = "sell" if sol_delta > 0 else "transfer_out"
+            events.append({
+                "slot": slot,
+                "block_time": block.get("blockTime"),
+                "wallet": owner,
+                "mint": mint,
+                "kind": kind,
+                "token_amount": abs(delta),
+                "sol_amount": abs(sol_delta) if kind in ("buy", "sell") else 0.0
+            })
+    return events
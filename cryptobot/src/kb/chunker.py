@@ -0,0 +1,177 @@
+import math
+import re
+import logging
+from typing import List, Tuple, Iterable, Iterator
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+"""
+TextChunker 类设计说明：
+
+把整篇 PDF/文章切成适合检索的小段落，再交给 KnowledgeBase.add_texts：
+1. 按 token 计数（有 tiktoken 时精确计数，否则按中日韩字符/英文单词估算）
+2. 优先在段落边界切分，段落过长时按中英文句末标点切分，仍过长时按字符硬切
+3. 分块不跨页，相邻分块之间保留 chunk_overlap 个 token 的重叠
+4. 每个分块的元数据记录页码、页内字符偏移和分块序号
+"""
+
+# 段落：空行分隔
+_PARAGRAPH = re.compile(r"\n\s*\n")
+# 句子：中文句末标点后直接切分，英文句末标点后需跟空白
+_SENTENCE_END = re.compile(r"(?<=[。！？；])|(?<=[.!?;])\s+")
+_CJK = re.compile("[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]")
+_WORD = re.compile("[A-Za-z0-9]+|[^\\sA-Za-z0-9\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]")
+
+
+def count_tokens(text: str, encoding: str = "cl100k_base") -> int:
+    """计算文本的 token 数"""
+    tokenizer = _get_encoding(encoding)
+    if tokenizer is not None:
+        return len(tokenizer.encode(text))
+    # 估算：每个中日韩字符约 1 个 token，英文单词/数字按 4 个字符 1 个 token
+    cjk = len(_CJK.findall(text))
+    other = sum(max(1, math.ceil(len(w) / 4)) for w in _WORD.findall(text))
+    return cjk + other
+
+
+_ENCODINGS = {}
+
+
+def _get_encoding(name: str):
+    """获取 tiktoken 编码器，不可用（未安装或无法下载词表）时返回 None"""
+    if name not in _ENCODINGS:
+        try:
+            _ENCODINGS[name] = tiktoken.get_encoding(name) if tiktoken is not None else None
+        except Exception as e:
+            logger.warning(f"无法加载 tiktoken 编码 {name}，改用估算: {str(e)}")
+            _ENCODINGS[name] = None
+    return _ENCODINGS[name]
+
+
+class TextChunker:
+    def __init__(self, chunk_size: int = 500, chunk_overlap: int = 50, encoding: str = "cl100k_base"):
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap 必须小于 chunk_size")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.encoding = encoding
+
+    def split_text(self, text: str, metadata: dict = None) -> Tuple[List[str], List[dict]]:
+        """切分单篇文本（如网页文章），返回 (分块列表, 元数据列表)"""
+        return self.split_pages([(None, text)], metadata)
+
+    def split_pages(self, pages: Iterable[Tuple[int, str]], metadata: dict = None) -> Tuple[List[str], List[dict]]:
+        """按页切分文本
+
+        Args:
+            pages: (页码, 页面文本) 列表，页码为 None 表示不分页
+            metadata: 所有分块共享的元数据（如 source、type）
+
+        Returns:
+            (分块列表, 元数据列表)，元数据附带 page、offset、chunk_index
+        """
+        texts, metadatas = [], []
+        for text, chunk_metadata in self.iter_split_pages(pages, metadata):
+            texts.append(text)
+            metadatas.append(chunk_metadata)
+        return texts, metadatas
+
+    def iter_split_pages(self, pages: Iterable[Tuple[int, str]], metadata: dict = None) -> Iterator[Tuple[str, dict]]:
+        """逐页切分，按需产出 (分块, 元数据)，适合配合逐页读取的生成器使用"""
+        chunk_index = 0
+        for page, page_text in pages:
+            for start, end in self._chunk_spans(page_text):
+                chunk_metadata = dict(metadata or {})
+                if page is not None:
+                    chunk_metadata["page"] = page
+                chunk_metadata["offset"] = start
+                chunk_metadata["chunk_index"] = chunk_index
+                chunk_index += 1
+                yield page_text[start:end].strip(), chunk_metadata
+
+    def _chunk_spans(self, text: str) -> List[Tuple[int, int]]:
+        """把文本切成若干 (起始, 结束) 字符区间，每段不超过 chunk_size 个 token"""
+        units = [(s, e, self._count(text[s:e])) for s, e in self._unit_spans(text)]
+        spans = []
+        current = []  # 当前分块中的单元
+        current_tokens = 0
+        for unit in units:
+            if current and current_tokens + unit[2] > self.chunk_size:
+                spans.append((current[0][0], current[-1][1]))
+                # 保留末尾若干单元作为重叠
+                overlap = []
+                overlap_tokens = 0
+                for prev in reversed(current):
+                    if overlap_tokens + prev[2] > self.chunk_overlap:
+                        break
+                    overlap.insert(0, prev)
+                    overlap_tokens += prev[2]
+                # 重叠部分加上新单元仍超限时放弃重叠
+                while overlap and overlap_tokens + unit[2] > self.chunk_size:
+                    overlap_tokens -= overlap.pop(0)[2]
+                current, current_tokens = overlap, overlap_tokens
+            current.append(unit)
+            current_tokens += unit[2]
+        if current:
+            spans.append((current[0][0], current[-1][1]))
+        return spans
+
+    def _unit_spans(self, text: str) -> List[Tuple[int, int]]:
+        """按段落 -> 句子 -> 字符的顺序拆出不超过 chunk_size 的最小单元"""
+        units = []
+        for start, end in _split_spans(_PARAGRAPH, text, 0, len(text)):
+            if self._count(text[start:end]) <= self.chunk_size:
+                units.append((start, end))
+                continue
+            for s_start, s_end in _split_spans(_SENTENCE_END, text, start, end):
+                tokens = self._count(text[s_start:s_end])
+                if tokens <= self.chunk_size:
+                    units.append((s_start, s_end))
+                    continue
+                # 句子仍然过长，按字符平均硬切
+                pieces = math.ceil(tokens / self.chunk_size)
+                step = math.ceil((s_end - s_start) / pieces)
+                for p_start in range(s_start, s_end, step):
+                    units.append((p_start, min(p_start + step, s_end)))
+        return units
+
+    def _count(self, text: str) -> int:
+        return count_tokens(text, self.encoding)
+
+
+def iter_batches(chunks: Iterable[Tuple[str, dict]], batch_size: int) -> Iterator[Tuple[List[str], List[dict]]]:
+    """把 (分块, 元数据) 流按 batch_size 分组为 (分块列表, 元数据列表)"""
+    texts, metadatas = [], []
+    for text, metadata in chunks:
+        texts.append(text)
+        metadatas.append(metadata)
+        if len(texts) >= batch_size:
+            yield texts, metadatas
+            texts, metadatas = [], []
+    if texts:
+        yield texts, metadatas
+
+
+def _split_spans(pattern: re.Pattern, text: str, start: int, end: int) -> List[Tuple[int, int]]:
+    """按分隔正则切分 text[start:end]，返回去除首尾空白后的非空区间"""
+    spans = []
+    pos = start
+    for match in pattern.finditer(text, start, end):
+        spans.append((pos, match.start()))
+        pos = match.end()
+    spans.append((pos, end))
+
+    result = []
+    for s, e in spans:
+        while s < e and text[s].isspace():
+            s += 1
+        while e > s and text[e - 1].isspace():
+            e -= 1
+        if s < e:
+            result.append((s, e))
+    return result
@@ -1,52 +1,46 @@
 from cryptobot.src.kb.knowledge_base import KnowledgeBase
-import shutil
-import os
 import logging
-import time
-import gc
 
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 logger = logging.getLogger(__name__)
 
-def clear_knowledge_base():
-    """完全清空知识库"""
+def clear_knowledge_base(in_place: bool = False):
+    """完全清空知识库
+
+    默认把指针切换到一个新的空索引目录：不需要加载 Chroma，正在运行的聊天继续使用旧索引，
+    下一次提问时检测到切换；本进程已打开的知识库立即切换。
+    in_place=True 时直接删除本进程已打开的向量集合和登记记录（其他进程持有的集合句柄会失效，
+    只适合没有其他进程在使用知识库时）。
+    """
     try:
-        # 1. 先获取数据库路径
-        kb = KnowledgeBase()
-        chroma_dir = kb.persist_dir
         logger.info(f"\n=== 开始清空知识库 ===")
-        logger.info(f"知识库路径: {chroma_dir}")
-        
-        # 2. 清理连接
-        kb.vectorstore = None
-        del kb
-        gc.collect()  # 强制垃圾回收
-        time.sleep(2)  # 给系统时间清理
-        
-        # 3. 删除数据库目录
-        if os.path.exists(chroma_dir):
-            shutil.rmtree(chroma_dir)
-            logger.info(f"已删除知识库目录")
-            time.sleep(1)  # 确保文件系统操作完成
-        else:
-            logger.info(f"知识库目录不存在")
-        
-        # 4. 创建新的空知识库
-        logger.info("\n=== 初始化新知识库 ===")
-        kb = KnowledgeBase()
-        
-        # 5. 验证是否为空
-        results = kb.vectorstore.get()
-        count = len(results['ids'])
-        if count == 0:
-            logger.info("验证成功：知识库为空")
-        else:
-            logger.error(f"警告：知识库仍包含 {count} 条记录")
-            
+
+        if in_place and KnowledgeBase.is_open():
+            kb = KnowledgeBase()
+            logger.info(f"知识库路径: {kb.persist_dir}")
+            kb.clear()
+
+            # 验证是否为空
+            count = kb.vectorstore._collection.count()
+            if count == 0:
+                logger.info("验证成功：知识库为空")
+            else:
+                logger.error(f"警告：知识库仍包含 {count} 条记录")
+            return
+
+        pointer = KnowledgeBase.pointer
+        empty_dir = pointer.new_version()
+        previous = pointer.swap(empty_dir)
+        # 保留上一个版本，正在运行的聊天可能还在读取
+        pointer.prune(keep=previous)
+        logger.info(f"已切换到空知识库: {empty_dir}")
+        if KnowledgeBase.is_open():
+            KnowledgeBase().refresh()
+
     except Exception as e:
         logger.error(f"清空知识库时出错: {str(e)}")
         logger.error(f"错误类型: {type(e)}")
         logger.error(f"错误详情: {str(e)}")
 
 if __name__ == "__main__":
-    clear_knowledge_base() 
\ No newline at end of file
+    clear_knowledge_base()
@@ -0,0 +1,74 @@
+import hashlib
+from collections import Counter
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from cryptobot.src.kb.text_utils import normalize_text, content_hash
+
+"""
+廉价去重层：规范化文本的 SHA-256（完全重复）+ 64 位 SimHash（近似重复）。
+
+SimHash 拆成 4 个 16 位的分段存入索引：汉明距离不超过 3 的两个签名
+至少有一个分段完全相同，因此只需按分段等值查询候选再精确比较。
+只有这一层无法判定时才需要调用 Embedding 接口做向量去重。
+"""
+
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 4
+# 汉明距离不超过此值视为近似重复（必须小于分段数，才能保证分段查询不漏）
+MAX_HAMMING_DISTANCE = 3
+# 文本过短时 SimHash 不可靠，只做完全重复判断
+MIN_SIMHASH_FEATURES = 16
+_BAND_BITS = SIMHASH_BITS // SIMHASH_BANDS
+_MASK = (1 << SIMHASH_BITS) - 1
+
+
+def simhash(text: str, ngram: int = 3) -> Optional[int]:
+    """计算文本的 64 位 SimHash（基于字符 n-gram，适用于中英文混排）
+
+    Returns:
+        SimHash 值；文本过短时返回 None
+    """
+    normalized = normalize_text(text).lower()
+    features = Counter(normalized[i:i + ngram] for i in range(len(normalized) - ngram + 1))
+    if sum(features.values()) < MIN_SIMHASH_FEATURES:
+        return None
+
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest(), "big") for f in features],
+        dtype=np.uint64
+    )
+    counts = np.array(list(features.values()), dtype=np.int64)
+    # 每个特征的每一位：1 记 +count，0 记 -count，按位求和后取符号
+    bits = (hashes[:, None] >> np.arange(SIMHASH_BITS, dtype=np.uint64)) & np.uint64(1)
+    weights = counts @ (bits.astype(np.int64) * 2 - 1)
+
+    value = 0
+    for bit in np.flatnonzero(weights > 0):
+        value |= 1 << int(bit)
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin((a ^ b) & _MASK).count("1")
+
+
+def simhash_bands(value: int) -> List[int]:
+    """把 SimHash 拆成若干分段，用于索引查询"""
+    mask = (1 << _BAND_BITS) - 1
+    return [(value >> (i * _BAND_BITS)) & mask for i in range(SIMHASH_BANDS)]
+
+
+def to_signed(value: int) -> int:
+    """无符号 64 位整数转为 SQLite 可存储的有符号整数"""
+    return value - (1 << SIMHASH_BITS) if value >= 1 << (SIMHASH_BITS - 1) else value
+
+
+def to_unsigned(value: int) -> int:
+    return value & _MASK
+
+
+def text_signature(text: str) -> Tuple[str, Optional[int]]:
+    """返回文本的 (内容哈希, SimHash)"""
+    return content_hash(text), simhash(text)
@@ -0,0 +1,169 @@
+import os
+import sqlite3
+import threading
+import time
+import logging
+from typing import Callable, List, Dict, Optional, Union
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from cryptobot.src.kb.text_utils import content_hash
+
+logger = logging.getLogger(__name__)
+
+"""
+CachedEmbeddings 类设计说明：
+
+以 (模型名, 规范化文本) 的哈希为键，把向量以 float32 存入本地 SQLite。
+重复导入同一份 PDF/文章、重复去重检查、重复的聊天问题都直接命中缓存，
+不再调用远程 Embedding 接口。超过 max_entries 时按最近访问时间淘汰。
+"""
+
+
+class CachedEmbeddings(Embeddings):
+    # 每次 SQL 查询的最大参数数量（SQLite 默认上限为 999）
+    _SQL_BATCH = 500
+
+    def __init__(self, embeddings: Union[Embeddings, Callable[[], Embeddings]],
+                 cache_dir: str = "cryptobot/data/embedding_cache",
+                 max_entries: int = 200_000, model_name: Optional[str] = None):
+        """
+        Args:
+            embeddings: 底层 Embeddings，或创建它的函数（首次未命中缓存时才创建，
+                        只读缓存的进程不需要 API 密钥；此时需指定 model_name）
+        """
+        if isinstance(embeddings, Embeddings):
+            self._embeddings, self._factory = embeddings, None
+        else:
+            self._embeddings, self._factory = None, embeddings
+        self.model_name = model_name or getattr(embeddings, "model", None) or type(embeddings).__name__
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_path = os.path.join(cache_dir, "embeddings.sqlite3")
+        self._conn = sqlite3.connect(self.cache_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON embeddings(last_access)")
+        self._conn.commit()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        if self._embeddings is None:
+            with self._lock:
+                if self._embeddings is None:
+                    self._embeddings = self._factory()
+        return self._embeddings
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """批量生成向量，仅对未命中缓存的文本调用底层接口"""
+        keys = [self._key(text) for text in texts]
+        cached = self._lookup(keys)
+
+        # 未命中的文本按键去重后一次性请求
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        miss_count = sum(1 for key in keys if key not in cached)
+        with self._lock:
+            self.hits += len(keys) - miss_count
+            self.misses += miss_count
+
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            self._store(fresh)
+            cached.update(fresh)
+
+        return [list(cached[key]) for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """生成查询向量（与文档向量分开缓存）"""
+        key = self._key(text, kind="query")
+        cached = self._lookup([key])
+        if key in cached:
+            with self._lock:
+                self.hits += 1
+            return list(cached[key])
+
+        with self._lock:
+            self.misses += 1
+        vector = self.embeddings.embed_query(text)
+        self._store({key: vector})
+        return vector
+
+    def close(self) -> None:
+        """关闭底层后端的线程池和进程池（如本地模型），缓存连接保留，之后仍可继续使用"""
+        close = getattr(self._embeddings, "close", None)
+        if close is not None:
+            close()
+
+    def stats(self) -> Dict[str, float]:
+        """返回缓存命中统计"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": entries
+            }
+
+    def _key(self, text: str, kind: str = "doc") -> str:
+        return content_hash(text, namespace=f"{self.model_name}#{kind}")
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        """批量读取缓存并刷新访问时间"""
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self._lock:
+            for i in range(0, len(unique_keys), self._SQL_BATCH):
+                batch = unique_keys[i:i + self._SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+        return found
+
+    def _store(self, vectors: Dict[str, List[float]]) -> None:
+        """写入新向量，超出容量时淘汰最久未访问的条目"""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes(), now)
+                 for key, vector in vectors.items()]
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            excess = count - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    """DELETE FROM embeddings WHERE key IN (
+                        SELECT key FROM embeddings ORDER BY last_access LIMIT ?
+                    )""",
+                    (excess,)
+                )
+                logger.info(f"向量缓存已满，淘汰 {excess} 条最久未使用的记录")
+            self._conn.commit()
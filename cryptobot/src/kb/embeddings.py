@@ -0,0 +1,109 @@
+import os
+import json
+import logging
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+"""
+Embedding 后端设计说明：
+
+1. openai：远程接口（原来的默认实现），batch_size 对应每次请求的文本数
+2. local：sentence-transformers 本地模型（CPU 推理，可离线使用），见 local_embeddings.py
+3. 不同模型的向量不能混在同一个集合中：索引目录下的 embedding.json 记录生成向量的
+   "后端:模型"，打开已有索引时按记录选择 Embedding，导入时配置与记录不一致则拒绝写入
+"""
+
+# 原来的知识库只用过这个模型，没有 embedding.json 的旧索引按它处理
+OPENAI_EMBEDDING_MODEL = "text-embedding-ada-002"
+LOCAL_EMBEDDING_MODEL = "paraphrase-multilingual-MiniLM-L12-v2"
+
+DEFAULT_EMBEDDING = {
+    "provider": "openai",
+    "model": None,           # 不填时使用各后端的默认模型
+    "batch_size": None,      # 每批文本数，不填时 local 为 64，openai 沿用接口客户端的默认值
+    "workers": 1,
+    "pool": "thread",
+    "device": "cpu",
+    "query_prefix": "",      # 部分模型（如 e5）要求查询和文档加前缀
+    "document_prefix": ""
+}
+
+DEFAULT_MODELS = {
+    "openai": OPENAI_EMBEDDING_MODEL,
+    "local": LOCAL_EMBEDDING_MODEL
+}
+
+TAG_FILE = "embedding.json"
+
+
+def resolve_embedding_config(config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """合并默认配置并补全模型名"""
+    merged = dict(DEFAULT_EMBEDDING)
+    merged.update({key: value for key, value in (config or {}).items() if value is not None})
+    if merged["provider"] not in DEFAULT_MODELS:
+        raise ValueError(f"不支持的 Embedding 后端: {merged['provider']}（可选 {', '.join(DEFAULT_MODELS)}）")
+    merged["model"] = merged["model"] or DEFAULT_MODELS[merged["provider"]]
+    return merged
+
+
+def embedding_tag(config: Dict[str, Any]) -> str:
+    """向量的来源标记（后端:模型），如 openai:text-embedding-ada-002"""
+    return f"{config['provider']}:{config['model']}"
+
+
+def config_from_tag(tag: str, config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """按索引记录的标记还原配置；与 config 是同一模型时沿用其中的批大小、线程数等运行参数"""
+    provider, _, model = tag.partition(":")
+    if config and embedding_tag(config) == tag:
+        return dict(config)
+    return resolve_embedding_config({"provider": provider, "model": model})
+
+
+def cache_model_name(config: Dict[str, Any]) -> str:
+    """向量缓存的命名空间：OpenAI 沿用原来的模型名，已有缓存继续有效"""
+    if config["provider"] == "openai":
+        return config["model"]
+    return embedding_tag(config)
+
+
+def read_index_tag(persist_dir: str) -> Optional[str]:
+    """读取索引目录记录的向量标记，没有记录时返回 None"""
+    try:
+        with open(os.path.join(persist_dir, TAG_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f).get("embedding")
+    except FileNotFoundError:
+        return None
+
+
+def write_index_tag(persist_dir: str, tag: str) -> None:
+    """记录索引目录使用的向量标记"""
+    os.makedirs(persist_dir, exist_ok=True)
+    with open(os.path.join(persist_dir, TAG_FILE), 'w', encoding='utf-8') as f:
+        json.dump({"embedding": tag}, f, ensure_ascii=False)
+
+
+def create_embeddings(config: Dict[str, Any]):
+    """按配置创建 Embedding 后端（第一次真正需要生成向量时才调用）"""
+    if config["provider"] == "local":
+        from cryptobot.src.kb.local_embeddings import LocalEmbeddings
+        return LocalEmbeddings(
+            config["model"],
+            batch_size=config["batch_size"] or 64,
+            workers=config["workers"],
+            pool=config["pool"],
+            device=config["device"],
+            query_prefix=config["query_prefix"],
+            document_prefix=config["document_prefix"]
+        )
+
+    # 第一次真正需要调用接口时才检查 API 密钥
+    load_dotenv()
+    if not os.getenv("OPENAI_API_KEY"):
+        raise ValueError("请在.env文件中设置OPENAI_API_KEY")
+    from langchain_openai import OpenAIEmbeddings
+    if config["batch_size"]:
+        return OpenAIEmbeddings(model=config["model"], chunk_size=config["batch_size"])
+    return OpenAIEmbeddings(model=config["model"])
@@ -0,0 +1,85 @@
+import os
+import shutil
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+"""
+IndexPointer 类设计说明：
+
+知识库的蓝绿切换：
+1. 指针文件（knowledge_base.current）记录当前使用的索引目录；没有指针文件时
+   使用原来的 cryptobot/data/knowledge_base（兼容已有的知识库）
+2. 重建时在 knowledge_base_versions/ 下新建一个目录完整导入，完成后用 os.replace
+   原子地改写指针文件；正在运行的聊天继续读旧目录，下一次提问时检测到指针变化再切换
+3. 切换后只保留当前和上一个版本（其他进程可能还在读上一个版本），更早的版本删除；
+   原来的 cryptobot/data/knowledge_base 目录不自动删除
+"""
+
+
+class IndexPointer:
+    def __init__(self, pointer_path: str = "cryptobot/data/knowledge_base.current",
+                 versions_dir: str = "cryptobot/data/knowledge_base_versions",
+                 default_dir: str = "cryptobot/data/knowledge_base"):
+        self.pointer_path = pointer_path
+        self.versions_dir = versions_dir
+        self.default_dir = default_dir
+
+    def current(self) -> str:
+        """当前使用的索引目录"""
+        try:
+            with open(self.pointer_path, 'r', encoding='utf-8') as f:
+                path = f.read().strip()
+            return path or self.default_dir
+        except FileNotFoundError:
+            return self.default_dir
+
+    def version(self) -> Optional[int]:
+        """指针文件的修改时间，用于廉价地判断是否发生了切换"""
+        try:
+            return os.stat(self.pointer_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def new_version(self) -> str:
+        """创建一个新的空索引目录"""
+        os.makedirs(self.versions_dir, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        path = os.path.join(self.versions_dir, stamp)
+        os.makedirs(path)
+        return path
+
+    def swap(self, new_dir: str) -> str:
+        """原子地把指针切换到 new_dir，返回切换前的目录"""
+        previous = self.current()
+        os.makedirs(os.path.dirname(self.pointer_path) or ".", exist_ok=True)
+        tmp_path = self.pointer_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(new_dir)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.pointer_path)
+        logger.info(f"知识库已切换: {previous} -> {new_dir}")
+        return previous
+
+    def versions(self) -> List[str]:
+        """所有版本目录，从旧到新"""
+        if not os.path.isdir(self.versions_dir):
+            return []
+        return [os.path.join(self.versions_dir, name) for name in sorted(os.listdir(self.versions_dir))]
+
+    def prune(self, keep: Optional[str] = None) -> List[str]:
+        """删除当前版本和 keep（通常是上一个版本）以外的版本目录，返回删除的目录"""
+        current = os.path.normpath(self.current())
+        retained = {current, os.path.normpath(keep)} if keep else {current}
+        removed = []
+        for path in self.versions():
+            if os.path.normpath(path) in retained:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            removed.append(path)
+        if removed:
+            logger.info(f"已删除 {len(removed)} 个旧版本索引")
+        return removed
@@ -1,25 +1,20 @@
 import os
-from typing import List, Dict
-from dotenv import load_dotenv
+import uuid
+from typing import Any, Callable, List, Dict, Optional, Set, Tuple
 import sys
-import sqlite3
-try:
-    import pysqlite3
-    sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
-except ImportError:
-    pass
-from langchain_community.vectorstores import Chroma
-from langchain_openai import OpenAIEmbeddings
+import numpy as np
+from cryptobot.src.kb.index_pointer import IndexPointer
+from cryptobot.src.kb.embeddings import (resolve_embedding_config, embedding_tag, config_from_tag,
+                                         cache_model_name, create_embeddings, read_index_tag,
+                                         write_index_tag, OPENAI_EMBEDDING_MODEL)
+from cryptobot.src.kb.source_registry import SourceRegistry
+from cryptobot.src.kb.lexical_index import LexicalIndex
+from cryptobot.src.kb.dedup import text_signature, hamming_distance, MAX_HAMMING_DISTANCE
+import threading
+import time
 import warnings
 import logging
 
-# 加载环境变量
-load_dotenv()
-
-# 确保有API密钥
-if not os.getenv("OPENAI_API_KEY"):
-    raise ValueError("请在.env文件中设置OPENAI_API_KEY")
-
 # 过滤 LangChain 废弃警告
 warnings.filterwarnings('ignore', category=DeprecationWarning, module='langchain.*')
 
@@ -50,16 +45,37 @@ KnowledgeBase 类设计说明：
 class KnowledgeBase:
     _instance = None
     _initialized = False
+    _lock = threading.Lock()
+    # 指针文件决定当前使用的索引目录（蓝绿重建时原子切换）
+    pointer = IndexPointer()
+    # 导入时使用的 Embedding 配置（configure 设置）；为 None 时新索引使用默认的 OpenAI 模型
+    embedding_config: Optional[Dict[str, Any]] = None
     
     def __new__(cls):
-        if cls._instance is None:
-            print("=== 创建新的 KnowledgeBase 实例 ===")
-            cls._instance = super(KnowledgeBase, cls).__new__(cls)
+        with cls._lock:
+            if cls._instance is None:
+                print("=== 创建新的 KnowledgeBase 实例 ===")
+                cls._instance = super(KnowledgeBase, cls).__new__(cls)
         return cls._instance
     
     def __init__(self):
-        self.persist_dir = "cryptobot/data/knowledge_base"
-        
+        # 单例只初始化一次：后续的 KnowledgeBase() 不再重新打开 Chroma 和 Embedding 客户端
+        if self._initialized:
+            return
+        with self._lock:
+            if self._initialized:
+                return
+            start = time.perf_counter()
+            # 变更监听器（如回答缓存），写入或删除内容后通知
+            self._listeners = []
+            self._pointer_version = self.pointer.version()
+            self.persist_dir = self.pointer.current()
+            self._open()
+            self._initialized = True
+            logger.info(f"知识库初始化耗时 {time.perf_counter() - start:.2f}s")
+
+    def _open(self) -> None:
+        """打开向量库和来源登记表"""
         # 检查知识库是否已存在
         if os.path.exists(self.persist_dir) and os.listdir(self.persist_dir):
             logger.info("=== 加载已存在的知识库 ===")
@@ -67,21 +83,265 @@ class KnowledgeBase:
             logger.info("=== 首次初始化知识库 ===")
             os.makedirs(self.persist_dir, exist_ok=True)
             
-        # 初始化向量存储
-        self.vectorstore = Chroma(
-            persist_directory=self.persist_dir,
-            embedding_function=OpenAIEmbeddings()
-        )
+        # 初始化向量存储；Chroma、LangChain 等较重的依赖在第一次打开知识库时才导入
+        Chroma = _import_chroma()
+        self.vectorstore = Chroma(persist_directory=self.persist_dir)
+        self._select_embeddings()
+        
+        # 来源登记表与向量库放在同一目录
+        self.registry = SourceRegistry(os.path.join(self.persist_dir, "sources.sqlite3"))
+        self._backfill_registry()
+        # BM25 关键词索引，与向量检索融合
+        self.lexical = LexicalIndex(os.path.join(self.persist_dir, "lexical"))
+        self._backfill_lexical()
+
+    def _select_embeddings(self) -> None:
+        """按索引记录的向量标记选择 Embedding，保证查询和写入与已有向量一致
+
+        没有记录的新索引使用导入配置并写入记录；有数据但没有记录的旧索引按原来的 OpenAI 模型处理。
+        """
+        desired = resolve_embedding_config(self.embedding_config)
+        tag = read_index_tag(self.persist_dir)
+        if tag is None:
+            if self.vectorstore._collection.count() > 0:
+                tag = f"openai:{OPENAI_EMBEDDING_MODEL}"
+            else:
+                tag = embedding_tag(desired)
+                write_index_tag(self.persist_dir, tag)
+        
+        # 同一模型时复用已有的客户端和缓存
+        if getattr(self, "embeddings", None) is None or tag != self.embedding_tag:
+            from cryptobot.src.kb.embedding_cache import CachedEmbeddings
+            config = config_from_tag(tag, desired)
+            # Embedding 结果缓存在本地，重复内容不再生成向量；底层后端第一次未命中缓存时才创建
+            self.embeddings = CachedEmbeddings(lambda: create_embeddings(config),
+                                               model_name=cache_model_name(config))
+            logger.info(f"Embedding: {tag}")
+        self.embedding_tag = tag
+        self.vectorstore._embedding_function = self.embeddings
+
+    @classmethod
+    def configure(cls, embedding: Optional[Dict[str, Any]] = None) -> None:
+        """设置导入使用的 Embedding 配置，如 {"provider": "local", "model": ..., "batch_size": 64}"""
+        cls.embedding_config = resolve_embedding_config(embedding)
+
+    def _check_embedding(self) -> None:
+        """导入配置与索引已有向量的模型不一致时拒绝写入，避免集合中混入不兼容的向量"""
+        if self.embedding_config is None:
+            return
+        desired = embedding_tag(resolve_embedding_config(self.embedding_config))
+        if desired != self.embedding_tag:
+            raise ValueError(f"知识库的向量由 {self.embedding_tag} 生成，当前配置为 {desired}，"
+                             f"请使用 --rebuild 用新模型重建知识库")
+
+    @classmethod
+    def open_at(cls, persist_dir: str) -> "KnowledgeBase":
+        """在指定目录打开一个独立的知识库实例（不是单例），用于重建时写入新索引"""
+        kb = object.__new__(cls)
+        kb._listeners = []
+        kb._pointer_version = None
+        kb.persist_dir = persist_dir
+        kb._open()
+        kb._initialized = True
+        return kb
+
+    @classmethod
+    def is_open(cls) -> bool:
+        """当前进程是否已经打开知识库"""
+        return cls._instance is not None and cls._instance._initialized
+
+    def close(self) -> None:
+        """关闭向量库和登记表的连接以及 Embedding 的推理池（删除数据目录前调用）"""
+        self.vectorstore = None
+        self.registry.close()
+        self.lexical.close()
+        self.embeddings.close()
+        # Chroma 按目录缓存客户端，不清除的话重新打开时会复用已关闭的连接
+        from chromadb.api.client import SharedSystemClient
+        SharedSystemClient.clear_system_cache()
+
+    def reload(self) -> None:
+        """重新打开知识库（数据目录被删除或替换后调用），监听器保留"""
+        with self._lock:
+            self._open()
+        self._notify(None)
+
+    def refresh(self) -> bool:
+        """指针切换到新索引时改用新目录，返回是否发生了切换
+
+        只比较指针文件的修改时间，每次检索前调用的开销很小。
+        """
+        version = self.pointer.version()
+        if version == self._pointer_version:
+            return False
+        with self._lock:
+            if version == self._pointer_version:
+                return False
+            self._pointer_version = version
+            current = self.pointer.current()
+            if current == self.persist_dir:
+                return False
+            logger.info(f"检测到知识库切换: {self.persist_dir} -> {current}")
+            # 旧目录可能很快被删除，先释放连接
+            self.registry.close()
+            self.lexical.close()
+            self.persist_dir = current
+            self._open()
+        self._notify(None)
+        return True
+
+    def _backfill_registry(self, page_size: int = 1000) -> None:
+        """登记表为空但向量库已有数据时（旧版本知识库），从元数据补建一次登记表"""
+        collection = self.vectorstore._collection
+        total = collection.count()
+        if total == 0 or not self.registry.is_empty():
+            return
+        
+        logger.info(f"=== 从 {total} 条记录补建来源登记表 ===")
+        sources = {}
+        for offset in range(0, total, page_size):
+            results = collection.get(limit=page_size, offset=offset, include=["metadatas", "documents"])
+            for chunk_id, metadata, document in zip(results["ids"], results["metadatas"], results["documents"]):
+                if metadata and "source" in metadata:
+                    info = sources.setdefault(metadata["source"], {
+                        "type": metadata.get("type"),
+                        "content_hash": metadata.get("content_hash"),
+                        "chunk_ids": [],
+                        "signatures": []
+                    })
+                    info["chunk_ids"].append(chunk_id)
+                    info["signatures"].append(text_signature(document or ""))
+        self.registry.record(sources)
+        logger.info(f"已登记 {len(sources)} 个来源")
+
+    def _backfill_lexical(self, page_size: int = 1000) -> None:
+        """关键词索引为空但向量库已有数据时（旧版本知识库），从向量库补建一次"""
+        collection = self.vectorstore._collection
+        total = collection.count()
+        if total == 0 or self.lexical.count() > 0:
+            return
+        
+        logger.info(f"=== 从 {total} 条记录补建关键词索引 ===")
+        for offset in range(0, total, page_size):
+            results = collection.get(limit=page_size, offset=offset, include=["documents"])
+            self.lexical.add(results["ids"], [document or "" for document in results["documents"]])
+        if len(self.lexical.segments) > 1:
+            self.lexical.merge()
+
+    def has_source(self, source: str) -> bool:
+        """判断来源是否已导入（只查询登记表）"""
+        return self.registry.has_source(source)
+
+    def delete_source(self, source: str) -> int:
+        """删除某个来源的全部分块及其登记，返回删除的分块数"""
+        info = self.registry.get_source(source)
+        if info is None:
+            return 0
+        if info["chunk_ids"]:
+            self.vectorstore._collection.delete(ids=info["chunk_ids"])
+            self._sync_lexical(lambda: self.lexical.delete(info["chunk_ids"]))
+        self.registry.remove_source(source)
+        self._notify({source})
+        logger.info(f"已删除来源 {source} 的 {len(info['chunk_ids'])} 个分块")
+        return len(info["chunk_ids"])
+
+    def add_listener(self, listener: Callable[[Optional[Set[str]]], None]) -> None:
+        """注册知识库变更监听器，参数为受影响的来源集合（None 表示全部）"""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def _notify(self, sources: Optional[Set[str]]) -> None:
+        for listener in self._listeners:
+            try:
+                listener(sources)
+            except Exception as e:
+                logger.error(f"通知知识库变更时出错: {str(e)}")
+
+    def _sync_lexical(self, update: Callable[[], None]) -> None:
+        """更新关键词索引；失败时只记录日志，向量检索不受影响（可用 --rebuild 重建）"""
+        try:
+            update()
+        except Exception as e:
+            logger.error(f"更新关键词索引时出错: {str(e)}")
 
     def search(self, query: str, k: int = 3) -> List[Dict[str, str]]:
-        """搜索相关文本"""
+        """搜索相关文本（向量与关键词混合检索）"""
         try:
-            results = self.vectorstore.similarity_search_with_score(query, k=k)
-            return [{"content": doc.page_content, "score": score} 
-                   for doc, score in results]
+            return self.hybrid_search(query, k=k)
         except Exception as e:
             print(f"搜索时出错: {str(e)}")
             return []
+
+    def embed_query(self, query: str) -> List[float]:
+        """生成查询向量（经过本地缓存），可供检索和回答缓存复用"""
+        return self.embeddings.embed_query(query)
+
+    def hybrid_search(self, query: str, vector: List[float] = None, k: int = 3,
+                      rrf_k: int = 60) -> List[Dict[str, str]]:
+        """向量检索与 BM25 关键词检索各取 k 条，按倒数排名融合（RRF）后返回前 k 条
+
+        结果在 search_by_vector 的基础上增加 rrf（融合分数），关键词命中的结果还有
+        bm25 和 coverage（命中的查询词占比，按 IDF 加权）；score 仍是向量距离，
+        只被关键词检索到的结果也按查询向量计算距离。
+        """
+        if vector is None:
+            vector = self.embed_query(query)
+        dense = self.search_by_vector(vector, k=k)
+        try:
+            lexical = self.lexical.search(query, k=k)
+        except Exception as e:
+            logger.error(f"关键词检索出错: {str(e)}")
+            return dense
+        
+        fused = {}
+        for rank, r in enumerate(dense):
+            r["rrf"] = 1 / (rrf_k + rank + 1)
+            fused[r["id"]] = r
+        missing = [chunk_id for chunk_id, _, _ in lexical if chunk_id not in fused]
+        fused.update(self._fetch_by_ids(missing, vector))
+        for rank, (chunk_id, bm25, coverage) in enumerate(lexical):
+            r = fused.get(chunk_id)
+            if r is None:
+                continue
+            r["rrf"] += 1 / (rrf_k + rank + 1)
+            r["bm25"] = bm25
+            r["coverage"] = coverage
+        return sorted(fused.values(), key=lambda r: r["rrf"], reverse=True)[:k]
+
+    def _fetch_by_ids(self, ids: List[str], vector: List[float]) -> Dict[str, Dict]:
+        """按分块 ID 读取内容，并按集合的距离度量计算与查询向量的距离"""
+        if not ids:
+            return {}
+        collection = self.vectorstore._collection
+        results = collection.get(ids=ids, include=["documents", "metadatas", "embeddings"])
+        query = np.asarray(vector, dtype=np.float32)
+        space = (collection.metadata or {}).get("hnsw:space", "l2")
+        fetched = {}
+        for chunk_id, document, metadata, embedding in zip(
+                results["ids"], results["documents"], results["metadatas"], results["embeddings"]):
+            embedding = np.asarray(embedding, dtype=np.float32)
+            if space == "cosine":
+                distance = 1 - float(_normalize(embedding[None])[0] @ _normalize(query[None])[0])
+            elif space == "ip":
+                distance = 1 - float(embedding @ query)
+            else:
+                distance = float(np.sum((embedding - query) ** 2))
+            fetched[chunk_id] = {"content": document, "score": distance, "id": chunk_id, "rrf": 0.0,
+                                 "source": (metadata or {}).get("source"), "metadata": metadata or {}}
+        return fetched
+
+    def search_by_vector(self, vector: List[float], k: int = 3) -> List[Dict[str, str]]:
+        """用已有的查询向量检索，结果包含分块 ID、来源和元数据"""
+        results = self.vectorstore._collection.query(
+            query_embeddings=[vector],
+            n_results=k,
+            include=["documents", "metadatas", "distances"]
+        )
+        return [{"content": document, "score": distance, "id": chunk_id,
+                 "source": (metadata or {}).get("source"), "metadata": metadata or {}}
+                for chunk_id, document, metadata, distance in zip(
+                    results["ids"][0], results["documents"][0],
+                    results["metadatas"][0], results["distances"][0])]
     
     def is_content_duplicate(self, content: str, threshold: float = 0.95) -> bool:
         """检查内容是否重复（基于向量相似度）
@@ -93,46 +353,135 @@ class KnowledgeBase:
         Returns:
             bool: True 表示内容重复，False 表示内容不重复
         """
+        return self.find_duplicates([content], threshold)[0]
+
+    def find_duplicates(self, texts: List[str], threshold: float = 0.95) -> List[bool]:
+        """批量检查内容是否重复（与知识库及批次内部比较）
+        
+        Args:
+            texts: 要检查的内容列表
+            threshold: 余弦相似度阈值，大于等于此值视为重复
+        
+        Returns:
+            List[bool]: 与 texts 一一对应，True 表示重复
+        """
+        flags, _, _ = self._dedup_batch(texts, threshold)
+        return flags
+
+    def _dedup_batch(self, texts: List[str], threshold: float = 0.95,
+                     exact_only: bool = False) -> Tuple[List[bool], Dict[int, np.ndarray], List[tuple]]:
+        """两级去重：先用哈希/SimHash 判定，无法判定的文本再做批量向量去重
+        
+        exact_only=True 时只判断完全重复（模板化文本彼此相似度很高，不能按近似去重）
+        
+        Returns:
+            (重复标记列表, {序号: 归一化向量}（仅非重复文本，可直接用于写入）, 签名列表)
+        """
+        signatures = [text_signature(text) for text in texts]
+        flags = self._signature_dedup(signatures, exact_only)
+        pending = [i for i, is_duplicate in enumerate(flags) if not is_duplicate]
+        vectors = self._vector_dedup(texts, pending, flags, None if exact_only else threshold)
+        return flags, vectors, signatures
+
+    def _signature_dedup(self, signatures: List[tuple], exact_only: bool = False) -> List[bool]:
+        """廉价层：规范化文本哈希完全相同，或 SimHash 距离足够小，即视为重复（不调用 Embedding 接口）"""
+        flags = [False] * len(signatures)
         try:
-            # 1. 如果知识库为空，直接返回 False
-            collection = self.vectorstore.get()
-            if len(collection['ids']) == 0:
-                return False
-            
-            # 2. 搜索最相似的内容
-            results = self.vectorstore.similarity_search_with_score(content, k=1)
-            
-            # 3. 如果找到结果，检查相似度
-            if results:
-                doc, score = results[0]
-                similarity = 1 - score  # 转换距离为相似度
-                logger.info(f"内容相似度: {similarity:.4f}")  # 显示更精确的相似度
-                
-                # 4. 判断是否重复
-                is_duplicate = similarity >= threshold  # 修改为大于等于
-                if is_duplicate:
-                    logger.info(f"内容重复 (相似度 {similarity:.4f} >= 阈值 {threshold})")
-                else:
-                    logger.info(f"内容不重复 (相似度 {similarity:.4f} < 阈值 {threshold})")
-                
-                return is_duplicate
-            
-            return False
-            
+            existing = self.registry.find_exact(h for h, _ in signatures)
+        except Exception as e:
+            logger.error(f"查询内容哈希时出错: {str(e)}")
+            return flags
+        
+        kept_hashes = set()
+        kept_simhashes = []
+        for i, (content_hash, simhash) in enumerate(signatures):
+            if content_hash in existing or content_hash in kept_hashes:
+                logger.info("内容完全重复（哈希命中）")
+                flags[i] = True
+                continue
+            if simhash is not None and not exact_only:
+                distance = self.registry.find_near(simhash)
+                if distance is None:
+                    distance = min((d for d in (hamming_distance(simhash, other) for other in kept_simhashes)
+                                    if d <= MAX_HAMMING_DISTANCE), default=None)
+                if distance is not None:
+                    logger.info(f"内容近似重复（SimHash 距离 {distance}）")
+                    flags[i] = True
+                    continue
+                kept_simhashes.append(simhash)
+            kept_hashes.add(content_hash)
+        return flags
+
+    def _vector_dedup(self, texts: List[str], indices: List[int], flags: List[bool],
+                      threshold: Optional[float]) -> Dict[int, np.ndarray]:
+        """向量层：一次生成向量、一次查询近邻，再用相似度矩阵做批内去重
+        
+        直接修改 flags 中对应位置，返回非重复文本的向量；threshold 为 None 时只生成向量
+        """
+        if not indices:
+            return {}
+        
+        # 1. 整批一次生成向量
+        vectors = np.asarray(self.embeddings.embed_documents([texts[i] for i in indices]), dtype=np.float32)
+        vectors = _normalize(vectors)
+        if threshold is None:
+            return {i: vectors[j] for j, i in enumerate(indices)}
+        batch_flags = [False] * len(indices)
+        
+        # 2. 一次查询所有文本在知识库中的最近邻
+        try:
+            collection = self.vectorstore._collection
+            if collection.count() > 0:
+                results = collection.query(
+                    query_embeddings=vectors.tolist(),
+                    n_results=1,
+                    include=["embeddings"]
+                )
+                for j, neighbours in enumerate(results["embeddings"]):
+                    if len(neighbours) == 0:
+                        continue
+                    neighbour = _normalize(np.asarray(neighbours, dtype=np.float32))[0]
+                    similarity = float(vectors[j] @ neighbour)
+                    logger.info(f"内容相似度: {similarity:.4f}")
+                    if similarity >= threshold:
+                        logger.info(f"内容重复 (相似度 {similarity:.4f} >= 阈值 {threshold})")
+                        batch_flags[j] = True
         except Exception as e:
             logger.error(f"检查内容重复时出错: {str(e)}")
             logger.error(f"错误类型: {type(e)}")
-            return False
+        
+        # 3. 批内去重：只与前面已保留的文本比较
+        similarities = vectors @ vectors.T
+        kept = np.zeros(len(indices), dtype=bool)
+        for j in range(len(indices)):
+            if not batch_flags[j] and np.any(similarities[j, :j][kept[:j]] >= threshold):
+                logger.info("内容与本批次中的其他内容重复")
+                batch_flags[j] = True
+            kept[j] = not batch_flags[j]
+        
+        result = {}
+        for j, i in enumerate(indices):
+            flags[i] = batch_flags[j]
+            if not batch_flags[j]:
+                result[i] = vectors[j]
+        return result
 
-    def add_texts(self, texts: List[str], metadatas: List[dict] = None):
-        """添加文本到知识库（带内容去重）"""
+    def add_texts(self, texts: List[str], metadatas: List[dict] = None, exact_only: bool = False):
+        """添加文本到知识库（带批量内容去重，exact_only=True 时只跳过完全相同的内容）"""
         try:
+            self._check_embedding()
+            flags, vectors, signatures = self._dedup_batch(texts, exact_only=exact_only)
+            
             # 过滤重复内容
             new_texts = []
             new_metadatas = []
+            new_vectors = []
+            new_signatures = []
             for i, text in enumerate(texts):
-                if not self.is_content_duplicate(text):
+                if not flags[i]:
                     new_texts.append(text)
+                    new_vectors.append(vectors[i].tolist())
+                    new_signatures.append(signatures[i])
                     if metadatas:
                         new_metadatas.append(metadatas[i])
                     logger.info(f"添加新内容: {text[:100]}...")
@@ -140,10 +489,27 @@ class KnowledgeBase:
                     logger.info(f"跳过重复内容: {metadatas[i]['source'] if metadatas else '未知来源'}")
             
             if new_texts:
-                self.vectorstore.add_texts(new_texts, metadatas=new_metadatas)
+                # 复用去重时生成的向量，避免再次调用 Embedding 接口
+                ids = [str(uuid.uuid4()) for _ in new_texts]
+                self.vectorstore._collection.add(
+                    ids=ids,
+                    embeddings=new_vectors,
+                    metadatas=new_metadatas or None,
+                    documents=new_texts
+                )
+                # 登记表写入失败时撤销本次写入，保持两边一致
+                try:
+                    self.registry.record(_group_by_source(metadatas, flags, ids, new_signatures))
+                except Exception:
+                    self.vectorstore._collection.delete(ids=ids)
+                    raise
+                self._sync_lexical(lambda: self.lexical.add(ids, new_texts))
                 self.vectorstore.persist()
+                self._notify({m["source"] for m in new_metadatas if m and "source" in m} or None)
                 logger.info(f"成功添加 {len(new_texts)} 条新内容到知识库")
             else:
+                # 内容全部重复时也登记来源，避免下次重复抓取
+                self.registry.record(_group_by_source(metadatas, flags, [], []))
                 logger.info("没有新的内容需要添加")
             
         except Exception as e:
@@ -151,12 +517,17 @@ class KnowledgeBase:
             raise
 
     def clear(self) -> None:
-        """清空知识库"""
+        """清空知识库：删除向量集合和全部登记记录（不删除目录，无需重新打开）"""
         try:
-            self.vectorstore = Chroma(
-                persist_directory=self.persist_dir,
-                embedding_function=OpenAIEmbeddings()
-            )
+            with self._lock:
+                self.vectorstore.delete_collection()
+                self.vectorstore = _import_chroma()(persist_directory=self.persist_dir)
+                # 清空后按当前配置重新记录向量标记
+                write_index_tag(self.persist_dir, embedding_tag(resolve_embedding_config(self.embedding_config)))
+                self._select_embeddings()
+                self.registry.clear()
+                self.lexical.clear()
+            self._notify(None)
             logger.info("知识库已清空")
         except Exception as e:
             logger.error(f"清空知识库时出错: {str(e)}")
@@ -164,25 +535,8 @@ class KnowledgeBase:
     def get_existing_urls(self) -> set:
         """获取知识库中已存在的URL"""
         try:
-            # 直接从 Chroma 获取所有数据
-            results = self.vectorstore.get()
-            
-            # 调试日志
-            logger.info(f"从数据库获取到 {len(results['ids'])} 条记录")
-            logger.info(f"元数据列表: {results['metadatas']}")
-            
-            # 提取所有URL
-            urls = set()
-            for metadata in results['metadatas']:
-                if metadata and 'source' in metadata:
-                    source = metadata['source']
-                    if source.startswith('http'):
-                        urls.add(source)
-            
+            urls = {source for source in self.registry.get_sources() if source.startswith('http')}
             logger.info(f"从知识库中找到 {len(urls)} 个已存在的URL")
-            for url in urls:
-                logger.info(f"- {url}")
-            
             return urls
             
         except Exception as e:
@@ -193,26 +547,56 @@ class KnowledgeBase:
     def get_existing_pdfs(self) -> set:
         """获取知识库中已存在的PDF文件名"""
         try:
-            # 直接从 Chroma 获取所有数据
-            results = self.vectorstore.get()
-            
-            # 调试日志
-            logger.info(f"从数据库获取到 {len(results['ids'])} 条记录")
-            logger.info(f"元数据列表: {results['metadatas']}")
-            
-            # 提取所有PDF
-            pdfs = set()
-            for metadata in results['metadatas']:
-                if metadata and 'source' in metadata and metadata.get('type') == 'pdf':
-                    pdfs.add(metadata['source'])
-            
+            pdfs = self.registry.get_sources(source_type='pdf')
             logger.info(f"从知识库中找到 {len(pdfs)} 个已存在的PDF")
-            for pdf in pdfs:
-                logger.info(f"- {pdf}")
-            
             return pdfs
             
         except Exception as e:
             logger.error(f"获取已存在PDF时出错: {str(e)}")
             logger.error(f"错误详情: {str(e.__class__.__name__)}")
             return set()
+
+def _import_chroma():
+    """导入 Chroma；系统 sqlite3 版本过低时先换成 pysqlite3"""
+    try:
+        import pysqlite3
+        sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
+    except ImportError:
+        pass
+    from langchain_community.vectorstores import Chroma
+    return Chroma
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """按行做 L2 归一化，便于用点积计算余弦相似度"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _group_by_source(metadatas: List[dict], flags: List[bool], ids: List[str],
+                     signatures: List[tuple]) -> Dict[str, dict]:
+    """按来源汇总一次写入的分块 ID 和去重签名，供登记表使用
+
+    Args:
+        metadatas: 本次所有文本的元数据（含重复内容）
+        flags: 重复标记，与 metadatas 一一对应
+        ids: 实际写入的分块 ID，按非重复文本的顺序排列
+        signatures: 实际写入分块的 (哈希, SimHash)，与 ids 一一对应
+    """
+    sources = {}
+    new_chunks = iter(zip(ids, signatures))
+    for metadata, is_duplicate in zip(metadatas or [], flags):
+        chunk = None if is_duplicate else next(new_chunks, None)
+        if not metadata or "source" not in metadata:
+            continue
+        info = sources.setdefault(metadata["source"], {
+            "type": metadata.get("type"),
+            "content_hash": metadata.get("content_hash"),
+            "chunk_ids": [],
+            "signatures": []
+        })
+        if chunk:
+            info["chunk_ids"].append(chunk[0])
+            info["signatures"].append(chunk[1])
+    return sources
@@ -1,16 +1,12 @@
 from cryptobot.src.kb.knowledge_base import KnowledgeBase
-from cryptobot.src.kb.loaders.pdf_loader import PDFLoader
-from cryptobot.src.kb.loaders.url_loader import URLLoader
-from typing import List, Dict
+from cryptobot.src.kb.loaders.rate_limiter import DomainRateLimiter
+from cryptobot.src.kb.chunker import TextChunker, iter_batches
+from cryptobot.src.kb.text_utils import content_hash
+from typing import List, Dict, Iterable, Tuple
 import os
+import shutil
 import logging
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import trafilatura
 import time
-from datetime import datetime
 
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 logger = logging.getLogger(__name__)
@@ -39,10 +35,63 @@ Scraper（抓取） -> Loader（处理） -> KnowledgeBase（存储）
 """
 
 class KnowledgeManager:
-    def __init__(self):
-        self.kb = KnowledgeBase()
-        self.pdf_loader = PDFLoader()
-        self.url_loader = URLLoader()
+    def __init__(self, chunking: dict = None, pdf_workers: int = 1,
+                 batch_size: int = 64, stream_threshold_mb: float = 20, fetch: dict = None,
+                 chain: dict = None, kb: KnowledgeBase = None, embedding: dict = None):
+        # Embedding 配置，如 {"provider": "local", "model": ..., "batch_size": 64}，需在打开知识库之前设置
+        if embedding:
+            KnowledgeBase.configure(embedding)
+        self.kb = kb or KnowledgeBase()
+        # PDF 解析（PyPDF2、进程池）在第一次导入 PDF 时才创建
+        self._pdf_loader = None
+        # 抓取配置，如 {"concurrency": 8, "extract_workers": 2, "browsers": 2, "rate_limits": {"odaily.news": 0.5}}
+        fetch = fetch or {}
+        self.rate_limiter = DomainRateLimiter(fetch.get("rate_limits"))
+        self.fetch = fetch
+        # 网页抓取组件（Selenium、trafilatura、aiohttp）在第一次抓取 URL 时才创建
+        self._url_loader = None
+        self._url_fetcher = None
+        # 分块配置，如 {"chunk_size": 500, "chunk_overlap": 50}
+        self.chunker = TextChunker(**(chunking or {}))
+        # PDF 提取进程数，1 表示在当前进程中串行（逐页流式）提取
+        self.pdf_workers = pdf_workers
+        # 每次写入知识库的最大分块数
+        self.batch_size = batch_size
+        # 超过此大小的PDF不进入进程池，在主进程中逐页流式入库
+        self.stream_threshold_mb = stream_threshold_mb
+        # 链上扫描配置，如 {"rpc_url": ..., "batch_size": 20, "large_trade_sol": 50}
+        self.chain = chain or {}
+    
+    @property
+    def pdf_loader(self):
+        if self._pdf_loader is None:
+            from cryptobot.src.kb.loaders.pdf_loader import PDFLoader
+            self._pdf_loader = PDFLoader()
+        return self._pdf_loader
+    
+    @property
+    def url_loader(self):
+        if self._url_loader is None:
+            from cryptobot.src.kb.loaders.driver_pool import get_driver_pool
+            from cryptobot.src.kb.loaders.page_cache import PageCache
+            from cryptobot.src.kb.loaders.url_loader import URLLoader
+            driver_pool = get_driver_pool(size=self.fetch.get("browsers", 2),
+                                          max_pages=self.fetch.get("max_pages_per_browser", 50))
+            self._url_loader = URLLoader(rate_limiter=self.rate_limiter, driver_pool=driver_pool,
+                                         page_cache=PageCache(**self.fetch.get("cache", {})))
+        return self._url_loader
+    
+    @property
+    def url_fetcher(self):
+        if self._url_fetcher is None:
+            from cryptobot.src.kb.loaders.async_fetcher import AsyncURLFetcher
+            self._url_fetcher = AsyncURLFetcher(
+                self.url_loader,
+                self.rate_limiter,
+                concurrency=self.fetch.get("concurrency", 8),
+                extract_workers=self.fetch.get("extract_workers", 2)
+            )
+        return self._url_fetcher
     
     def load_pdfs(self, pdf_dir: str) -> int:
         """加载目录下的所有PDF文件，跳过已存在的"""
@@ -68,18 +117,161 @@ class KnowledgeManager:
             logger.info("\n没有新的PDF文件需要加载")
             return 0
         
-        # 加载新文件
-        logger.info(f"\n开始加载 {len(new_pdfs)} 个新PDF文件:")
-        success_count = 0
-        for pdf_file in new_pdfs:
-            pdf_path = os.path.join(pdf_dir, pdf_file)
-            content, metadata = self.pdf_loader.load_pdf(pdf_path)
-            if content and metadata:
-                self.kb.add_texts([content], [metadata])
-                success_count += 1
-                logger.info(f"成功加载: {pdf_file}")
+        pdf_paths = [os.path.join(pdf_dir, pdf_file) for pdf_file in new_pdfs]
+        return len(self._ingest_pdfs(pdf_paths))
+    
+    def sync_pdfs(self, pdf_dir: str) -> Dict[str, int]:
+        """增量同步PDF目录：未变化的文件不打开，修改的文件替换分块，删除的文件移除分块
         
-        return success_count
+        以 (路径, 大小, 修改时间, 内容哈希) 判断文件是否变化：
+        大小和修改时间都未变时直接跳过；否则计算哈希，哈希相同只更新状态。
+        """
+        from cryptobot.src.kb.loaders.pdf_loader import file_hash
+        logger.info(f"\n=== 开始增量同步PDF目录 ===")
+        start = time.perf_counter()
+        registry = self.kb.registry
+        pdf_dir = os.path.abspath(pdf_dir)
+        results = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        
+        on_disk = {os.path.join(pdf_dir, f) for f in os.listdir(pdf_dir) if f.endswith('.pdf')}
+        
+        # 1. 已删除的文件：移除其分块
+        for record in registry.get_files(pdf_dir):
+            if record["path"] in on_disk:
+                continue
+            self.kb.delete_source(record["source"])
+            registry.remove_file(record["path"])
+            # 内容相同的其他文件之前被当作副本跳过，清除其状态以便本次重新导入
+            for other in registry.find_files_by_hash(record["content_hash"]):
+                if not self.kb.has_source(other["source"]):
+                    registry.remove_file(other["path"])
+            results["removed"] += 1
+            logger.info(f"文件已删除: {os.path.basename(record['path'])}")
+        
+        # 2. 新增或修改的文件
+        to_ingest = {}
+        for pdf_path in sorted(on_disk):
+            pdf_file = os.path.basename(pdf_path)
+            stat = os.stat(pdf_path)
+            record = registry.get_file(pdf_path)
+            if record and record["size"] == stat.st_size and record["mtime_ns"] == stat.st_mtime_ns:
+                results["unchanged"] += 1
+                continue
+            
+            digest = file_hash(pdf_path)
+            state = (pdf_path, pdf_file, stat.st_size, stat.st_mtime_ns, digest)
+            if record and record["content_hash"] == digest:
+                registry.record_file(*state)
+                results["unchanged"] += 1
+                continue
+            
+            existing = registry.get_source(pdf_file)
+            if existing and existing["content_hash"] == digest:
+                # 旧版本按文件名导入过且内容相同，只补记状态
+                registry.record_file(*state)
+                results["unchanged"] += 1
+                continue
+            
+            copies = [f for f in registry.find_files_by_hash(digest)
+                      if f["path"] in on_disk and self.kb.has_source(f["source"])]
+            if copies and not existing:
+                logger.info(f"跳过 {pdf_file}：内容与 {os.path.basename(copies[0]['path'])} 相同")
+                registry.record_file(*state)
+                results["unchanged"] += 1
+                continue
+            
+            if existing:
+                # 修改过的文件：先删除旧分块再导入新内容
+                self.kb.delete_source(pdf_file)
+                results["updated"] += 1
+                logger.info(f"文件已修改: {pdf_file}")
+            else:
+                results["added"] += 1
+                logger.info(f"新文件: {pdf_file}")
+            to_ingest[pdf_path] = state
+        
+        for pdf_path in self._ingest_pdfs(list(to_ingest)):
+            registry.record_file(*to_ingest[pdf_path])
+        
+        logger.info(f"同步完成：新增 {results['added']}，更新 {results['updated']}，删除 {results['removed']}，"
+                    f"未变化 {results['unchanged']}，耗时 {time.perf_counter() - start:.2f}s")
+        return results
+    
+    def _ingest_pdfs(self, pdf_paths: List[str]) -> List[str]:
+        """提取、切分并写入PDF，返回成功导入的路径
+        
+        小文件在进程池中并行提取，先完成的先入库；
+        大文件（或串行模式下的所有文件）逐页读取、分批入库，内存占用与文件大小无关。
+        某个文件中途失败时删除它已写入的批次，不计入成功导入的文件。
+        """
+        if not pdf_paths:
+            return []
+        from cryptobot.src.kb.loaders.pdf_loader import file_hash
+        
+        threshold = self.stream_threshold_mb * 1024 * 1024
+        pooled = [p for p in pdf_paths if self.pdf_workers > 1 and os.path.getsize(p) <= threshold]
+        streamed = [p for p in pdf_paths if p not in pooled]
+        logger.info(f"\n开始加载 {len(pdf_paths)} 个新PDF文件（进程池 {len(pooled)} 个，"
+                    f"{self.pdf_workers} 个提取进程；流式 {len(streamed)} 个）:")
+        
+        start = time.perf_counter()
+        succeeded = []
+        done = 0
+        for pdf_path, pages, metadata, extract_time in self.pdf_loader.iter_extracted(pooled, self.pdf_workers):
+            done += 1
+            pdf_file = os.path.basename(pdf_path)
+            if not (pages and metadata):
+                logger.error(f"[{done}/{len(pdf_paths)}] 加载失败: {pdf_file}")
+                continue
+            
+            insert_start = time.perf_counter()
+            try:
+                metadata["content_hash"] = file_hash(pdf_path)
+                chunk_count = self._add_batches(
+                    iter_batches(self.chunker.iter_split_pages(pages, metadata), self.batch_size)
+                )
+            except Exception as e:
+                # 单个文件入库失败不中断其他文件（也不关闭进程池），先回滚它已写入的批次
+                logger.error(f"[{done}/{len(pdf_paths)}] 加载失败: {pdf_file}: {str(e)}")
+                self._rollback_pdf(pdf_file)
+                continue
+            succeeded.append(pdf_path)
+            logger.info(f"[{done}/{len(pdf_paths)}] 成功加载: {pdf_file}（{chunk_count} 个分块，"
+                        f"提取 {extract_time:.2f}s，入库 {time.perf_counter() - insert_start:.2f}s）")
+        
+        for pdf_path in streamed:
+            done += 1
+            pdf_file = os.path.basename(pdf_path)
+            file_start = time.perf_counter()
+            try:
+                chunk_count = self._add_batches(self.pdf_loader.iter_chunks(pdf_path, self.chunker, self.batch_size))
+            except Exception as e:
+                logger.error(f"[{done}/{len(pdf_paths)}] 加载失败: {pdf_file}: {str(e)}")
+                self._rollback_pdf(pdf_file)
+                continue
+            succeeded.append(pdf_path)
+            logger.info(f"[{done}/{len(pdf_paths)}] 成功加载: {pdf_file}（{chunk_count} 个分块，"
+                        f"流式提取+入库 {time.perf_counter() - file_start:.2f}s）")
+        
+        logger.info(f"PDF加载完成：{len(succeeded)}/{len(pdf_paths)} 个，总耗时 {time.perf_counter() - start:.2f}s")
+        return succeeded
+    
+    def _rollback_pdf(self, pdf_file: str) -> None:
+        """删除入库中途失败的文件已写入的分块和登记，否则之后会被当作已完整导入而跳过"""
+        try:
+            removed = self.kb.delete_source(pdf_file)
+            if removed:
+                logger.info(f"已回滚 {pdf_file} 的 {removed} 个分块，下次导入时重试")
+        except Exception as e:
+            logger.error(f"回滚 {pdf_file} 时出错: {str(e)}")
+    
+    def _add_batches(self, batches: Iterable[Tuple[List[str], List[dict]]]) -> int:
+        """逐批写入知识库，返回分块总数"""
+        chunk_count = 0
+        for texts, metadatas in batches:
+            self.kb.add_texts(texts, metadatas)
+            chunk_count += len(texts)
+        return chunk_count
     
     def load_urls(self, urls: List[str]) -> int:
         """加载URL列表，跳过已存在的"""
@@ -102,19 +294,25 @@ class KnowledgeManager:
             logger.info("\n没有新的URL需要加载")
             return 0
         
-        # 加载新URL
+        # 并发抓取新URL，每抓完一个立即切分入库
         logger.info(f"\n开始加载 {len(new_urls)} 个新URL:")
         success_count = 0
-        for url in new_urls:
-            content = self.url_loader.load_url(url)
-            if content:
-                try:
-                    self.kb.add_texts([content], [{"source": url, "type": "url"}])
-                    success_count += 1
-                    logger.info(f"成功加载: {url}")
-                except Exception as e:
-                    logger.error(f"添加URL内容时出错 {url}: {str(e)}")
         
+        def store(url: str, content: str) -> None:
+            nonlocal success_count
+            if not content:
+                return
+            try:
+                chunks, chunk_metadatas = self.chunker.split_text(
+                    content, {"source": url, "type": "url", "content_hash": content_hash(content)}
+                )
+                self.kb.add_texts(chunks, chunk_metadatas)
+                success_count += 1
+                logger.info(f"成功加载: {url}（{len(chunks)} 个分块）")
+            except Exception as e:
+                logger.error(f"添加URL内容时出错 {url}: {str(e)}")
+        
+        self.url_fetcher.fetch_all(new_urls, store)
         return success_count
     
     def load_texts(self, texts: List[str]) -> int:
@@ -128,8 +326,9 @@ class KnowledgeManager:
                 logger.info(f"文本长度: {len(text)} 字符")
                 logger.info(f"文本预览: {text[:100]}...")
                 
-                metadata = {"source": f"text_{i+1}", "type": "text"}
-                self.kb.add_texts([text], [metadata])
+                metadata = {"source": f"text_{i+1}", "type": "text", "content_hash": content_hash(text)}
+                chunks, chunk_metadatas = self.chunker.split_text(text, metadata)
+                self.kb.add_texts(chunks, chunk_metadatas)
                 success_count += 1
                 logger.info("成功添加文本")
                 
@@ -138,8 +337,48 @@ class KnowledgeManager:
         
         return success_count
     
-    def load_all(self, pdf_dir: str = None, urls: List[str] = None, texts: List[str] = None) -> Dict[str, int]:
-        """加载所有资源"""
+    def scan_chain(self, start_slot: int, end_slot: int) -> Dict[str, int]:
+        """扫描 [start_slot, end_slot) 的区块：钱包事件写入钱包索引，新币和大额交易写入知识库"""
+        from cryptobot.src.kb.chain.scanner import BlockScanner
+        from cryptobot.src.kb.chain.wallet import WalletIndexer, decode_block
+        from cryptobot.src.kb.loaders.chain_loader import ChainLoader, events_from_block
+        
+        logger.info(f"\n=== 开始扫描链上数据 [{start_slot}, {end_slot}) ===")
+        config = self.chain
+        scanner = BlockScanner(
+            config.get("rpc_url", "https://api.mainnet-beta.solana.com"),
+            batch_size=config.get("batch_size", 20),
+            concurrency=config.get("concurrency", 4),
+            checkpoint_path=config.get("checkpoint", "cryptobot/data/chain/scanner.json"),
+            checkpoint_every=config.get("checkpoint_every", 50)
+        )
+        wallets = WalletIndexer(config.get("wallet_index", "cryptobot/data/wallet_index"))
+        chain_loader = ChainLoader(self.kb, max_items=config.get("max_items", 64),
+                                   max_delay=config.get("max_delay", 5.0))
+        large_trade_sol = config.get("large_trade_sol", 50.0)
+        
+        def handle(blocks) -> None:
+            for slot, block in blocks:
+                trades = decode_block(slot, block)
+                wallets.add(trades)
+                chain_loader.add_events(events_from_block(slot, block, large_trade_sol, trades))
+        
+        def before_checkpoint() -> None:
+            # 检查点之前的数据必须已经落盘，否则中断后续扫会跳过它们；写入失败时不保存检查点
+            wallets.flush()
+            chain_loader.flush()
+        
+        try:
+            stats = scanner.run(start_slot, end_slot, handle, on_checkpoint=before_checkpoint)
+        finally:
+            # 检查点之后的部分也尽量写入，续扫时重复的 slot 和事件会被跳过
+            wallets.flush()
+            chain_loader.close()
+        return {"blocks": stats["blocks"], "events": chain_loader.loaded}
+    
+    def load_all(self, pdf_dir: str = None, urls: List[str] = None, texts: List[str] = None,
+                 sync: bool = False) -> Dict[str, int]:
+        """加载所有资源，sync=True 时对PDF目录做增量同步"""
         results = {
             "pdfs_loaded": 0,
             "urls_loaded": 0,
@@ -147,7 +386,11 @@ class KnowledgeManager:
         }
         
         if pdf_dir and os.path.exists(pdf_dir):
-            results["pdfs_loaded"] = self.load_pdfs(pdf_dir)
+            if sync:
+                sync_results = self.sync_pdfs(pdf_dir)
+                results["pdfs_loaded"] = sync_results["added"] + sync_results["updated"]
+            else:
+                results["pdfs_loaded"] = self.load_pdfs(pdf_dir)
             
         if urls:
             results["urls_loaded"] = self.load_urls(urls)
@@ -156,81 +399,45 @@ class KnowledgeManager:
             results["texts_loaded"] = self.load_texts(texts)
         
         return results
-
-class URLLoader:
-    def __init__(self):
-        # 初始化 Selenium
-        self.options = webdriver.ChromeOptions()
-        self.options.add_argument('--headless')
-        self.options.add_argument('--no-sandbox')
-        self.options.add_argument('--disable-dev-shm-usage')
-        self.driver = None
-
-    def load_url(self, url: str) -> str:
-        content = None
+    
+    def rebuild(self, pdf_dir: str = None, urls: List[str] = None, texts: List[str] = None) -> Dict[str, int]:
+        """蓝绿重建：在新目录中完整导入，完成后原子切换指针
+        
+        导入期间正在运行的聊天继续使用旧索引；Embedding 有本地缓存，网页有页面缓存，
+        重新导入已有内容基本不调用远程接口。
+        有资源导入失败时放弃新索引、不切换指针，避免把不完整的索引换上线。
+        """
+        logger.info("\n=== 开始重建知识库 ===")
+        start = time.perf_counter()
+        expected = {
+            "pdfs_loaded": len([f for f in os.listdir(pdf_dir) if f.endswith('.pdf')])
+                           if pdf_dir and os.path.exists(pdf_dir) else 0,
+            "urls_loaded": len(dict.fromkeys(urls or [])),
+            "texts_loaded": len(texts or [])
+        }
+        pointer = KnowledgeBase.pointer
+        side_dir = pointer.new_version()
+        live_kb = self.kb
+        self.kb = KnowledgeBase.open_at(side_dir)
         try:
-            logger.info(f"\n=== 开始加载URL: {url} ===")
-            
-            # BlockBeats 使用 trafilatura
-            if "theblockbeats.info" in url:
-                logger.info("使用 trafilatura 加载 BlockBeats")
-                downloaded = trafilatura.fetch_url(url)
-                if downloaded:
-                    content = trafilatura.extract(downloaded, 
-                                               include_comments=False,
-                                               include_tables=False,
-                                               no_fallback=True)
-                
-            # 其他网站使用 Selenium
-            else:
-                if not self.driver:
-                    self.driver = webdriver.Chrome(options=self.options)
-                
-                self.driver.get(url)
-                wait = WebDriverWait(self.driver, 10)
-                
-                if "odaily.news" in url:
-                    logger.info("使用 Selenium 加载 Odaily")
-                    article = wait.until(
-                        EC.presence_of_element_located((By.CLASS_NAME, "_3739r7Mk"))
-                    )
-                elif "foresightnews.pro" in url:
-                    logger.info("使用 Selenium 加载 Foresight")
-                    article = wait.until(
-                        EC.presence_of_element_located((By.CLASS_NAME, "ql-editor"))
-                    )
-                else:
-                    logger.error(f"不支持的网站: {url}")
-                    return None
-                
-                # 获取内容
-                paragraphs = article.find_elements(By.TAG_NAME, "p")
-                headings = article.find_elements(By.TAG_NAME, "h2")
-                content_elements = []
-                for element in paragraphs + headings:
-                    text = element.text.strip()
-                    if text:
-                        content_elements.append(text)
-                content = "\n".join(content_elements)
-            
-            if content:
-                logger.info(f"成功获取内容，长度: {len(content)} 字符")
-                logger.info("内容预览:")
-                logger.info(f"{content[:200]}...\n")
-            else:
-                logger.error("未能获取内容")
-            
-            time.sleep(2)  # 避免请求过于频繁
-            
-        except Exception as e:
-            logger.error(f"加载URL时出错: {str(e)}")
-            return None
-            
-        return content
-
-    def __del__(self):
-        if self.driver:
-            self.driver.quit()
+            results = self.load_all(pdf_dir=pdf_dir, urls=urls, texts=texts)
+            missing = {key: expected[key] - results[key] for key in expected if results[key] < expected[key]}
+            if missing:
+                raise RuntimeError(f"重建不完整，保留旧索引: {missing} 个资源导入失败")
+            self.kb.close()
+        except Exception:
+            self.kb.close()
+            shutil.rmtree(side_dir, ignore_errors=True)
+            raise
+        finally:
+            self.kb = live_kb
+        
+        previous = pointer.swap(side_dir)
+        # 保留上一个版本，其他进程可能还没切换过来
+        pointer.prune(keep=previous)
+        self.kb.refresh()
+        logger.info(f"重建完成，耗时 {time.perf_counter() - start:.2f}s，新索引: {side_dir}")
+        return results
 
 def main():
     manager = KnowledgeManager()
@@ -0,0 +1,379 @@
+import os
+import re
+import json
+import math
+import shutil
+import threading
+import logging
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from cryptobot.src.kb.text_utils import normalize_text
+
+logger = logging.getLogger(__name__)
+
+"""
+LexicalIndex 类设计说明：
+
+与向量库并列的 BM25 倒排索引，弥补 Embedding 对专有名词（GMGN、pumpfun、0xSun、代币符号）
+区分不清的问题：
+1. 分词：英文/数字按单词（小写），中文按相邻两字（bigram），不依赖分词词典
+2. 按段（segment）存储：每次写入生成一个新段并直接追加到内存中的段列表，已打开的段不再重新解析；
+   词典（词 -> 偏移、文档数）常驻内存，倒排表（文档序号、词频）和文档长度是 .npy 文件，以内存映射方式读取
+3. 删除只记录墓碑（tombstones.json，按段记录文档序号），检索时过滤；同一分块 ID 再次写入时
+   以最新的段为准，旧位置视为删除
+4. 分层合并：段按未删除文档数分层（每 merge_factor 倍一层），末尾凑满 merge_factor 个同层的小段时
+   只合并这几段，同时真正去掉已删除的文档；总写入代价为 O(N log N)，不会每次重写整个索引
+5. segments.json 和 tombstones.json 用临时文件 + os.replace 原子替换；其他进程写入后，
+   检索前比较文件修改时间即可发现并重新加载（只打开新出现的段）
+"""
+
+_WORD = re.compile(r"[a-z0-9]+|[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """英文和数字按单词切分，中文切成相邻两字"""
+    tokens = []
+    for run in _WORD.findall(normalize_text(text).lower()):
+        if run.isascii() or len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+class _Segment:
+    """一个只读的索引段"""
+
+    def __init__(self, path: str, ids: Optional[List[str]] = None, terms: Optional[Dict[str, List[int]]] = None):
+        """刚写入的段直接传入 ids 和词典，不再读取 json"""
+        self.path = path
+        self.name = os.path.basename(path)
+        if ids is None:
+            with open(os.path.join(path, "ids.json"), 'r', encoding='utf-8') as f:
+                ids = json.load(f)
+        if terms is None:
+            with open(os.path.join(path, "terms.json"), 'r', encoding='utf-8') as f:
+                # 按偏移顺序写入，json 读取后保持顺序
+                terms = json.load(f)
+        self.ids: List[str] = ids
+        self.terms: Dict[str, List[int]] = terms
+        self.lengths = np.load(os.path.join(path, "lengths.npy"), mmap_mode="r")
+        self.docs = np.load(os.path.join(path, "docs.npy"), mmap_mode="r")
+        self.tfs = np.load(os.path.join(path, "tfs.npy"), mmap_mode="r")
+        self.deleted = np.zeros(len(self.ids), dtype=bool)
+
+    def live_count(self) -> int:
+        return len(self.ids) - int(self.deleted.sum())
+
+    def postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        offset, df = self.terms[term]
+        return self.docs[offset:offset + df], self.tfs[offset:offset + df]
+
+    @staticmethod
+    def write(path: str, ids: List[str], lengths, terms: List[str], dfs, docs, tfs) -> "_Segment":
+        """写入新段：先写临时目录，再整体改名（docs/tfs 按 terms 的顺序排列）"""
+        tmp_path = path + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        dfs = np.asarray(dfs, dtype=np.int64)
+        offsets = np.cumsum(dfs) - dfs
+        dictionary = {term: [offset, df] for term, offset, df in zip(terms, offsets.tolist(), dfs.tolist())}
+        # json.dumps 走 C 编码器，json.dump 逐块写入要慢一个数量级
+        with open(os.path.join(tmp_path, "ids.json"), 'w', encoding='utf-8') as f:
+            f.write(json.dumps(ids))
+        with open(os.path.join(tmp_path, "terms.json"), 'w', encoding='utf-8') as f:
+            f.write(json.dumps(dictionary, ensure_ascii=False))
+        np.save(os.path.join(tmp_path, "lengths.npy"), np.asarray(lengths, dtype=np.int32))
+        np.save(os.path.join(tmp_path, "docs.npy"), np.asarray(docs, dtype=np.int32))
+        np.save(os.path.join(tmp_path, "tfs.npy"), np.asarray(tfs, dtype=np.float32))
+        os.replace(tmp_path, path)
+        return _Segment(path, ids, dictionary)
+
+
+class LexicalIndex:
+    def __init__(self, index_dir: str, k1: float = 1.5, b: float = 0.75, merge_factor: int = 8):
+        """
+        Args:
+            index_dir: 索引目录（放在知识库目录下）
+            k1, b: BM25 参数
+            merge_factor: 分层合并的倍数，末尾有这么多个同层的段时合并
+        """
+        self.index_dir = index_dir
+        self.k1 = k1
+        self.b = b
+        self.merge_factor = merge_factor
+        self.segments: List[_Segment] = []
+        self._lock = threading.RLock()
+        os.makedirs(index_dir, exist_ok=True)
+        self._manifest_path = os.path.join(index_dir, "segments.json")
+        self._tombstones_path = os.path.join(index_dir, "tombstones.json")
+        self._load()
+
+    def _version(self) -> Tuple[Optional[int], Optional[int]]:
+        return tuple(os.stat(path).st_mtime_ns if os.path.exists(path) else None
+                     for path in (self._manifest_path, self._tombstones_path))
+
+    def _load(self) -> None:
+        """读取段列表和墓碑，重建文档 ID 映射和统计（已打开的段直接复用）"""
+        self._loaded_version = self._version()
+        manifest = _read_json(self._manifest_path, {"segments": [], "next": 1})
+        self._next = manifest["next"]
+        opened = {segment.name: segment for segment in self.segments}
+        self.segments = [opened.get(name) or _Segment(os.path.join(self.index_dir, name))
+                         for name in manifest["segments"]]
+        # 墓碑：{段名: [文档序号]}
+        self.tombstones: Dict[str, Set[int]] = {
+            name: set(docs) for name, docs in _read_json(self._tombstones_path, {}).items()
+        }
+
+        # 未删除的分块 ID -> (段, 文档序号)
+        self._locations: Dict[str, Tuple[_Segment, int]] = {}
+        self._doc_count = 0
+        self._total_length = 0
+        for segment in self.segments:
+            segment.deleted[:] = False
+            for doc in self.tombstones.get(segment.name, ()):
+                segment.deleted[doc] = True
+            self._append(segment)
+
+    def _append(self, segment: _Segment) -> None:
+        """把段加入 ID 映射和统计；同一分块重新写入过时，旧位置作废"""
+        lengths = np.asarray(segment.lengths)
+        for doc, chunk_id in enumerate(segment.ids):
+            if segment.deleted[doc]:
+                continue
+            previous = self._locations.get(chunk_id)
+            if previous is not None:
+                self._discard(*previous)
+            self._locations[chunk_id] = (segment, doc)
+            self._doc_count += 1
+            self._total_length += int(lengths[doc])
+
+    def _discard(self, segment: _Segment, doc: int) -> None:
+        segment.deleted[doc] = True
+        self._doc_count -= 1
+        self._total_length -= int(segment.lengths[doc])
+
+    def _reload_if_changed(self) -> None:
+        """其他进程写入后重新加载（只比较两个文件的修改时间）"""
+        if self._version() != self._loaded_version:
+            with self._lock:
+                if self._version() != self._loaded_version:
+                    self._load()
+
+    def count(self) -> int:
+        """未删除的文档数"""
+        return self._doc_count
+
+    def add(self, ids: List[str], texts: List[str]) -> None:
+        """把一批分块写成一个新段（没有任何词的分块也登记，文档数与向量库保持一致）"""
+        if not ids:
+            return
+        lengths = []
+        postings: Dict[str, Tuple[list, list]] = {}
+        for doc, text in enumerate(texts):
+            tokens = tokenize(text)
+            lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                term_docs, term_tfs = postings.setdefault(term, ([], []))
+                term_docs.append(doc)
+                term_tfs.append(tf)
+        terms = sorted(postings)
+        dfs = [len(postings[term][0]) for term in terms]
+        docs = [doc for term in terms for doc in postings[term][0]]
+        tfs = [tf for term in terms for tf in postings[term][1]]
+
+        with self._lock:
+            self._reload_if_changed()
+            segment = self._write_segment(list(ids), lengths, terms, dfs, docs, tfs)
+            self.segments.append(segment)
+            self._write_manifest()
+            self._append(segment)
+            self._merge_tail()
+
+    def delete(self, ids: Iterable[str]) -> None:
+        """记录墓碑，检索时过滤"""
+        with self._lock:
+            self._reload_if_changed()
+            locations = [self._locations.pop(chunk_id) for chunk_id in set(ids) if chunk_id in self._locations]
+            if not locations:
+                return
+            for segment, doc in locations:
+                self.tombstones.setdefault(segment.name, set()).add(doc)
+                self._discard(segment, doc)
+            self._write_tombstones()
+
+    def merge(self) -> None:
+        """把所有段合并成一段，去掉已删除的文档"""
+        with self._lock:
+            self._reload_if_changed()
+            if self.segments:
+                self._merge_range(0, len(self.segments))
+
+    def _tier(self, segment: _Segment) -> int:
+        tier, size = 0, segment.live_count()
+        while size >= self.merge_factor:
+            size //= self.merge_factor
+            tier += 1
+        return tier
+
+    def _merge_tail(self) -> None:
+        """末尾 merge_factor 个段中最旧的一段不比最新的一段高层时，合并这几段"""
+        while len(self.segments) >= self.merge_factor:
+            start = len(self.segments) - self.merge_factor
+            if self._tier(self.segments[start]) > self._tier(self.segments[-1]):
+                break
+            self._merge_range(start, len(self.segments))
+
+    def _merge_range(self, start: int, end: int) -> None:
+        """把相邻的若干段合并成一段并放回原位置，保持段的先后顺序"""
+        merging = self.segments[start:end]
+        doc_ids, lengths = [], []
+        term_parts, doc_parts, tf_parts = [], [], []
+        vocabulary: Dict[str, int] = {}
+        base = 0
+        for segment in merging:
+            live = ~segment.deleted
+            remap = np.full(len(segment.ids), -1, dtype=np.int64)
+            remap[live] = np.arange(base, base + int(live.sum()))
+            base += int(live.sum())
+            doc_ids.extend(chunk_id for chunk_id, keep in zip(segment.ids, live) if keep)
+            lengths.append(np.asarray(segment.lengths)[live])
+            if not segment.terms:
+                continue
+            # 倒排表按词典顺序连续存放，按文档数展开即得每条记录所属的词
+            term_ids = np.fromiter((vocabulary.setdefault(term, len(vocabulary)) for term in segment.terms),
+                                   dtype=np.int64, count=len(segment.terms))
+            dfs = np.fromiter((df for _, df in segment.terms.values()), dtype=np.int64, count=len(segment.terms))
+            mapped = remap[np.asarray(segment.docs)]
+            keep = mapped >= 0
+            term_parts.append(np.repeat(term_ids, dfs)[keep])
+            doc_parts.append(mapped[keep])
+            tf_parts.append(np.asarray(segment.tfs)[keep])
+
+        term_all = np.concatenate(term_parts) if term_parts else np.zeros(0, dtype=np.int64)
+        order = np.argsort(term_all, kind="stable")
+        counts = np.bincount(term_all, minlength=len(vocabulary))
+        terms = [term for term, count in zip(vocabulary, counts) if count]
+
+        merged = []
+        if doc_ids:
+            merged.append(self._write_segment(
+                doc_ids, np.concatenate(lengths), terms, counts[counts > 0],
+                np.concatenate(doc_parts)[order], np.concatenate(tf_parts)[order]
+            ))
+        self.segments[start:end] = merged
+        self._write_manifest()
+        # 合并后的段已不含被删除的文档
+        if any(segment.name in self.tombstones for segment in merging):
+            for segment in merging:
+                self.tombstones.pop(segment.name, None)
+            self._write_tombstones()
+        for segment in merged:
+            for doc, chunk_id in enumerate(segment.ids):
+                self._locations[chunk_id] = (segment, doc)
+        for segment in merging:
+            shutil.rmtree(segment.path, ignore_errors=True)
+        logger.info(f"关键词索引已合并 {len(merging)} 个段，共 {len(doc_ids)} 个分块")
+
+    def clear(self) -> None:
+        """删除全部段和墓碑"""
+        with self._lock:
+            old_paths = [s.path for s in self.segments]
+            self.segments = []
+            self.tombstones = {}
+            self._write_manifest()
+            self._write_tombstones()
+            for path in old_paths:
+                shutil.rmtree(path, ignore_errors=True)
+            self._load()
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[str, float, float]]:
+        """BM25 检索
+
+        Returns:
+            [(分块 ID, BM25 分数, 覆盖率)]，按分数从高到低；覆盖率是文档命中的查询词
+            占全部查询词的比例（按 IDF 加权），查询中的稀有词没命中时覆盖率低
+        """
+        self._reload_if_changed()
+        terms = set(tokenize(query))
+        segments = self.segments
+        if not terms or self._doc_count == 0:
+            return []
+
+        n = self._doc_count
+        avgdl = self._total_length / n
+        idfs = {}
+        for term in terms:
+            df = sum(s.terms[term][1] for s in segments if term in s.terms)
+            # 语料中没有的词也计入覆盖率的分母
+            idfs[term] = (math.log(1 + (n - df + 0.5) / (df + 0.5)), df)
+        total_idf = sum(idf for idf, _ in idfs.values())
+
+        candidates = []
+        for seg_index, segment in enumerate(segments):
+            docs_parts, score_parts, idf_parts = [], [], []
+            for term, (idf, df) in idfs.items():
+                if df == 0 or term not in segment.terms:
+                    continue
+                docs, tfs = segment.postings(term)
+                lengths = segment.lengths[docs]
+                norm = self.k1 * (1 - self.b + self.b * lengths / avgdl)
+                docs_parts.append(docs)
+                score_parts.append(idf * tfs * (self.k1 + 1) / (tfs + norm))
+                idf_parts.append(np.full(len(docs), idf))
+            if not docs_parts:
+                continue
+            docs, inverse = np.unique(np.concatenate(docs_parts), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+            matched = np.bincount(inverse, weights=np.concatenate(idf_parts))
+            live = ~segment.deleted[docs]
+            docs, scores, matched = docs[live], scores[live], matched[live]
+            # 每段先取前 k 个，只对少量候选排序
+            if len(docs) > k:
+                top = np.argpartition(-scores, k)[:k]
+                docs, scores, matched = docs[top], scores[top], matched[top]
+            candidates.extend(zip(scores, matched, [seg_index] * len(docs), docs))
+
+        candidates.sort(key=lambda c: c[0], reverse=True)
+        return [(segments[seg_index].ids[doc], float(score), float(matched / total_idf))
+                for score, matched, seg_index, doc in candidates[:k]]
+
+    def close(self) -> None:
+        """释放内存映射（删除索引目录前调用）"""
+        self.segments = []
+        self._locations = {}
+        self._doc_count = 0
+        self._total_length = 0
+
+    def _write_segment(self, ids: List[str], lengths, terms: List[str], dfs, docs, tfs) -> _Segment:
+        path = os.path.join(self.index_dir, f"seg-{self._next:06d}")
+        self._next += 1
+        return _Segment.write(path, ids, lengths, terms, dfs, docs, tfs)
+
+    def _write_manifest(self) -> None:
+        _write_json(self._manifest_path, {"segments": [s.name for s in self.segments], "next": self._next})
+        self._loaded_version = self._version()
+
+    def _write_tombstones(self) -> None:
+        _write_json(self._tombstones_path, {name: sorted(docs) for name, docs in self.tombstones.items()})
+        self._loaded_version = self._version()
+
+
+def _read_json(path: str, default):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+
+def _write_json(path: str, data) -> None:
+    """原子地写入 JSON 文件"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(data, ensure_ascii=False))
+    os.replace(tmp_path, path)
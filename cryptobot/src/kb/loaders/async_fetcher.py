@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+import aiohttp
+
+from cryptobot.src.kb.loaders.rate_limiter import DomainRateLimiter
+from cryptobot.src.kb.loaders.url_loader import URLLoader
+from cryptobot.src.kb.loaders.site_adapters import DEFAULT_HEADERS, get_adapter, parse_with_adapter
+
+logger = logging.getLogger(__name__)
+
+"""
+AsyncURLFetcher 类设计说明：
+
+基于 asyncio 的并发抓取阶段：
+1. 全局并发上限（Semaphore）+ 按域名令牌桶限流，不同网站并行抓取
+2. 所有网站先用 aiohttp 下载 HTML（经过 URLLoader 的页面缓存），由站点适配器在进程池中解析正文
+3. 快速路径失败时交给 URLLoader（Selenium）在线程池中渲染，线程数等于浏览器池大小
+4. 每个 URL 完成后立即回调入库（在单独的线程中执行，不阻塞事件循环）
+"""
+
+
+class AsyncURLFetcher:
+    def __init__(self, url_loader: URLLoader, rate_limiter: DomainRateLimiter,
+                 concurrency: int = 8, extract_workers: int = 2, timeout: float = 30):
+        self.url_loader = url_loader
+        self.rate_limiter = rate_limiter
+        self.concurrency = concurrency
+        self.extract_workers = extract_workers
+        self.timeout = timeout
+
+    def fetch_all(self, urls: List[str], on_result: Callable[[str, Optional[str]], None]) -> None:
+        """并发抓取所有 URL，每完成一个就调用 on_result(url, content)"""
+        asyncio.run(self._fetch_all(urls, on_result))
+
+    async def _fetch_all(self, urls: List[str], on_result: Callable[[str, Optional[str]], None]) -> None:
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        start = time.perf_counter()
+
+        with ProcessPoolExecutor(max_workers=self.extract_workers) as extract_pool, \
+                ThreadPoolExecutor(max_workers=self.url_loader.driver_pool.size) as browser_pool, \
+                ThreadPoolExecutor(max_workers=1) as store_pool:
+            connector = aiohttp.TCPConnector(limit=self.concurrency)
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                             headers=DEFAULT_HEADERS) as session:
+
+                async def handle(url: str) -> None:
+                    async with semaphore:
+                        url_start = time.perf_counter()
+                        try:
+                            content = await self._fetch_one(session, url, extract_pool, browser_pool)
+                        except Exception as e:
+                            logger.error(f"加载URL时出错 {url}: {str(e)}")
+                            content = None
+                        logger.info(f"抓取完成 {url}（{time.perf_counter() - url_start:.2f}s）")
+                    await loop.run_in_executor(store_pool, on_result, url, content)
+
+                await asyncio.gather(*(handle(url) for url in urls))
+
+        logger.info(f"共抓取 {len(urls)} 个URL，耗时 {time.perf_counter() - start:.2f}s"
+                    f"（{self.url_loader.stats.summary()}）")
+
+    async def _fetch_one(self, session: aiohttp.ClientSession, url: str,
+                         extract_pool: ProcessPoolExecutor, browser_pool: ThreadPoolExecutor) -> Optional[str]:
+        loop = asyncio.get_running_loop()
+        adapter = get_adapter(url)
+        if adapter is None:
+            logger.error(f"不支持的网站: {url}")
+            return None
+
+        content = None
+        html = await self._download(session, url)
+        if html:
+            content = await loop.run_in_executor(extract_pool, parse_with_adapter, adapter.name, html)
+        if content:
+            self.url_loader.stats.record(url, "http")
+            return content
+
+        # 快速路径失败：需要浏览器渲染的网站交给 Selenium（URLLoader 内部自行限流）
+        if adapter.needs_browser_fallback:
+            return await loop.run_in_executor(browser_pool, self.url_loader.load_with_browser, url)
+        self.url_loader.stats.record(url, "failed")
+        return None
+
+    async def _download(self, session: aiohttp.ClientSession, url: str) -> Optional[str]:
+        """下载原始 HTML：新鲜的缓存直接返回，过期的用条件请求重新验证"""
+        cache = self.url_loader.page_cache
+        cached, fetch = cache.lookup(url)
+        if not fetch:
+            return cached.html if cached else None
+
+        await self.rate_limiter.acquire_async(url)
+        try:
+            async with session.get(url, headers=cache.validators(cached)) as response:
+                if response.status != 304:
+                    response.raise_for_status()
+                body = await response.text()
+                return cache.revalidate(url, cached, response.status, response.headers, body)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.info(f"HTTP 请求失败 {url}: {str(e)}")
+            return None
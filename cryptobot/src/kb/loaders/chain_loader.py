@@ -0,0 +1,214 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from cryptobot.src.kb.chain.wallet import decode_block
+
+logger = logging.getLogger(__name__)
+
+"""
+ChainLoader 类设计说明：
+
+把扫描到的链上事件写入知识库：
+1. 每个事件（新币发行、内盘迁移到外盘、大额交易）生成一段简短的中文描述 + 结构化元数据
+2. 事件先进入 MicroBatcher，攒够 max_items 条或最早的事件等待超过 max_delay 秒时
+   一次性调用 KnowledgeBase.add_texts，避免每个事件单独请求向量和落盘；
+   写入失败的批次放回队首，后台线程稍后重试，调用方的 flush/close 会抛出异常而不是丢弃
+3. 聊天时可以直接检索到"今天发了哪些币""哪些币迁移到了外盘"之类的信息
+"""
+
+TOKEN_LAUNCH = "token_launch"
+POOL_MIGRATION = "pool_migration"
+LARGE_TRADE = "large_trade"
+
+
+class MicroBatcher:
+    """按数量或时间窗口批量处理，后台线程负责超时刷新"""
+
+    def __init__(self, flush_fn: Callable[[list], None], max_items: int = 64, max_delay: float = 5.0):
+        self.flush_fn = flush_fn
+        self.max_items = max_items
+        self.max_delay = max_delay
+        self.flushes = 0
+        self._items = []
+        self._oldest: Optional[float] = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._closed = False
+        self._timer = threading.Thread(target=self._run, daemon=True)
+        self._timer.start()
+
+    def add(self, items: list) -> None:
+        with self._lock:
+            if not self._items and items:
+                self._oldest = time.monotonic()
+                self._wakeup.notify()
+            self._items.extend(items)
+            full = len(self._items) >= self.max_items
+        if full:
+            self.flush(partial=False)
+
+    def flush(self, partial: bool = True) -> None:
+        """写入缓冲的条目；partial=False 时只写满批，不足一批的留给时间窗口"""
+        # 保证同一时刻只有一次写入，且按加入顺序写入
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    if not partial and len(self._items) < self.max_items:
+                        return
+                    batch, self._items = self._items[:self.max_items], self._items[self.max_items:]
+                    self._oldest = time.monotonic() if self._items else None
+                if not batch:
+                    return
+                try:
+                    self.flush_fn(batch)
+                except Exception:
+                    # 放回队首，保持顺序，max_delay 秒后由后台线程重试
+                    with self._lock:
+                        self._items[:0] = batch
+                        self._oldest = time.monotonic()
+                    raise
+                self.flushes += 1
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify()
+        self._timer.join()
+        self.flush()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+                if self._oldest is None:
+                    self._wakeup.wait()
+                    continue
+                remaining = self._oldest + self.max_delay - time.monotonic()
+                if remaining > 0:
+                    self._wakeup.wait(remaining)
+                    continue
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"批量写入链上事件时出错，{self.max_delay} 秒后重试: {str(e)}")
+
+
+def _format_time(block_time: Optional[int]) -> str:
+    return datetime.fromtimestamp(block_time).strftime("%Y-%m-%d %H:%M") if block_time else "时间未知"
+
+
+def _token_name(event: dict) -> str:
+    symbol = event.get("symbol")
+    return f"{symbol}（{event['mint']}）" if symbol else event["mint"]
+
+
+def format_event(event: dict) -> Tuple[str, dict]:
+    """把链上事件转成 (文本, 元数据)"""
+    kind = event["type"]
+    when = _format_time(event.get("block_time"))
+    if kind == TOKEN_LAUNCH:
+        text = f"{when} 新代币发行：{_token_name(event)}"
+        if event.get("creator"):
+            text += f"，创建者 {event['creator']}"
+        if event.get("platform"):
+            text += f"，发行平台 {event['platform']}"
+        text += "。"
+    elif kind == POOL_MIGRATION:
+        text = f"{when} 代币 {_token_name(event)} 从内盘迁移到外盘"
+        if event.get("from_market") or event.get("to_market"):
+            text += f"（{event.get('from_market', '内盘')} → {event.get('to_market', '外盘')}）"
+        if event.get("pool"):
+            text += f"，外盘池子地址 {event['pool']}"
+        if event.get("market_cap_sol"):
+            text += f"，迁移时市值约 {event['market_cap_sol']:.0f} SOL"
+        text += "。"
+    elif kind == LARGE_TRADE:
+        side = "买入" if event["side"] == "buy" else "卖出"
+        text = (f"{when} 大额交易：钱包 {event['wallet']} {side} {event['token_amount']:,.0f} 个 "
+                f"{_token_name(event)}，金额 {event['sol_amount']:.2f} SOL。")
+    else:
+        raise ValueError(f"未知的链上事件类型: {kind}")
+
+    metadata = {
+        "source": event.get("source") or f"chain:{kind}:{event.get('signature') or event['mint']}:{event.get('slot', '')}",
+        "type": "chain",
+        "event": kind,
+        "date": when[:10],
+    }
+    for key in ("mint", "symbol", "slot", "block_time", "wallet", "pool", "signature"):
+        # Chroma 的元数据不接受 None
+        if event.get(key) is not None:
+            metadata[key] = event[key]
+    return text, metadata
+
+
+def events_from_block(slot: int, block: dict, large_trade_sol: float = 50.0,
+                      trades: List[dict] = None) -> List[dict]:
+    """从区块中提取可识别的事件：新建的代币 mint 和大额买卖
+
+    trades 为已经用 decode_block 解码的钱包事件，传入可避免重复解码。
+    内盘迁移需要具体平台的程序解析，由调用方直接以 pool_migration 事件传入。
+    """
+    events = []
+    for tx in block.get("transactions") or []:
+        meta = tx.get("meta") or {}
+        if meta.get("err") is not None:
+            continue
+        logs = meta.get("logMessages") or []
+        if not any("Instruction: InitializeMint" in line for line in logs):
+            continue
+        # 第一个账户是付费者，即代币创建者
+        payer = tx["transaction"]["message"]["accountKeys"][0]
+        existing = {b["mint"] for b in meta.get("preTokenBalances") or []}
+        for mint in sorted({b["mint"] for b in meta.get("postTokenBalances") or []} - existing):
+            events.append({"type": TOKEN_LAUNCH, "mint": mint, "slot": slot,
+                           "block_time": block.get("blockTime"),
+                           "signature": (tx["transaction"].get("signatures") or [None])[0],
+                           "creator": payer if isinstance(payer, str) else payer.get("pubkey")})
+
+    for trade in trades if trades is not None else decode_block(slot, block):
+        if trade["kind"] in ("buy", "sell") and trade["sol_amount"] >= large_trade_sol:
+            events.append({"type": LARGE_TRADE, "mint": trade["mint"], "slot": slot,
+                           "block_time": trade["block_time"], "wallet": trade["wallet"],
+                           "side": trade["kind"], "token_amount": trade["token_amount"],
+                           "sol_amount": trade["sol_amount"],
+                           "source": f"chain:{LARGE_TRADE}:{trade['wallet']}:{trade['mint']}:{slot}"})
+    return events
+
+
+class ChainLoader:
+    def __init__(self, kb, max_items: int = 64, max_delay: float = 5.0):
+        """
+        Args:
+            kb: KnowledgeBase 实例
+            max_items: 攒够多少条事件写入一次
+            max_delay: 最早的事件最多等待多少秒
+        """
+        self.kb = kb
+        self.loaded = 0
+        self.batcher = MicroBatcher(self._store, max_items=max_items, max_delay=max_delay)
+
+    def add_events(self, events: List[dict]) -> None:
+        self.batcher.add([format_event(event) for event in events])
+
+    def flush(self) -> None:
+        """立即写入所有缓冲的事件，写入失败时抛出异常（事件保留在队列中）"""
+        self.batcher.flush()
+
+    def close(self) -> None:
+        """写入剩余事件并停止后台刷新线程"""
+        self.batcher.close()
+
+    def _store(self, batch: List[Tuple[str, dict]]) -> None:
+        start = time.perf_counter()
+        texts = [text for text, _ in batch]
+        metadatas = [metadata for _, metadata in batch]
+        # 事件文本是模板生成的，只跳过完全相同的事件
+        self.kb.add_texts(texts, metadatas, exact_only=True)
+        self.loaded += len(batch)
+        logger.info(f"写入 {len(batch)} 条链上事件，耗时 {time.perf_counter() - start:.2f}s")
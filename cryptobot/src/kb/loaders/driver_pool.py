@@ -0,0 +1,125 @@
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+logger = logging.getLogger(__name__)
+
+"""
+WebDriverPool 类设计说明：
+
+所有加载器共享的无头 Chrome 池：
+1. 按需启动浏览器，最多 size 个，用完归还复用
+2. 每个浏览器渲染 max_pages 个页面后，或出现 WebDriverException 时回收重建
+3. 屏蔽图片、字体和样式表请求，只加载正文所需的 HTML/JS
+4. 多个线程可同时各借一个浏览器，渲染吞吐随池大小增长
+"""
+
+# 通过 Chrome DevTools 屏蔽的资源
+BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.css"
+]
+
+
+class _PooledDriver:
+    def __init__(self, driver: webdriver.Chrome):
+        self.driver = driver
+        self.pages = 0
+
+
+class WebDriverPool:
+    def __init__(self, size: int = 2, max_pages: int = 50, page_load_timeout: float = 30):
+        self.size = size
+        self.max_pages = max_pages
+        self.page_load_timeout = page_load_timeout
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @contextmanager
+    def driver(self):
+        """借出一个浏览器，用完自动归还（出错或达到页数上限时回收）"""
+        self._slots.acquire()
+        entry = None
+        broken = False
+        try:
+            entry = self._take_idle() or self._start()
+            yield entry.driver
+        except WebDriverException as e:
+            # 等待元素超时不代表浏览器异常，其余错误则重建浏览器
+            broken = not isinstance(e, TimeoutException)
+            raise
+        finally:
+            if entry is not None:
+                entry.pages += 1
+                if broken or self._closed or entry.pages >= self.max_pages:
+                    reason = "出错" if broken else f"已渲染 {entry.pages} 个页面"
+                    logger.info(f"回收浏览器（{reason}）")
+                    _quit(entry.driver)
+                else:
+                    with self._lock:
+                        self._idle.append(entry)
+            self._slots.release()
+
+    def close(self) -> None:
+        """关闭所有空闲浏览器"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for entry in idle:
+            _quit(entry.driver)
+
+    def _take_idle(self) -> Optional[_PooledDriver]:
+        with self._lock:
+            return self._idle.pop() if self._idle else None
+
+    def _start(self) -> _PooledDriver:
+        logger.info("启动新的无头浏览器")
+        options = webdriver.ChromeOptions()
+        options.add_argument('--headless')
+        options.add_argument('--no-sandbox')
+        options.add_argument('--disable-dev-shm-usage')
+        options.add_argument('--blink-settings=imagesEnabled=false')
+        options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.managed_default_content_settings.stylesheets": 2,
+            "profile.managed_default_content_settings.fonts": 2
+        })
+        # 不等待图片等子资源加载完成
+        options.page_load_strategy = "eager"
+
+        driver = webdriver.Chrome(options=options)
+        driver.set_page_load_timeout(self.page_load_timeout)
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URLS})
+        except WebDriverException as e:
+            logger.warning(f"无法设置资源屏蔽: {str(e)}")
+        return _PooledDriver(driver)
+
+
+def _quit(driver: webdriver.Chrome) -> None:
+    try:
+        driver.quit()
+    except Exception as e:
+        logger.warning(f"关闭浏览器时出错: {str(e)}")
+
+
+_shared_pool: Optional[WebDriverPool] = None
+_shared_lock = threading.Lock()
+
+
+def get_driver_pool(size: int = 2, max_pages: int = 50) -> WebDriverPool:
+    """获取进程内共享的浏览器池（首次调用时按参数创建）"""
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            _shared_pool = WebDriverPool(size=size, max_pages=max_pages)
+            atexit.register(_shared_pool.close)
+        return _shared_pool
@@ -0,0 +1,208 @@
+import os
+import json
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+import logging
+from dataclasses import dataclass
+from typing import Dict, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+"""
+PageCache 类设计说明：
+
+按 URL 缓存抓取到的原始 HTML（zlib 压缩后存入本地 SQLite）：
+1. 同时记录 ETag / Last-Modified，过期后用条件请求重新验证，304 时只刷新时间；
+   lookup / revalidate 封装了查缓存和处理响应的流程，同步和异步抓取共用
+2. 超过 TTL 的条目视为过期；总大小超过上限时按最近访问时间淘汰
+3. HTTP 直取的 HTML 和浏览器渲染的页面源码分开缓存（variant）
+4. 离线回放模式（CRYPTOBOT_OFFLINE=1）：只读缓存、不访问网络，
+   修改解析逻辑后可以直接重新提取
+5. from_fixtures：用提交到仓库的页面样本建立回放缓存，加载器测试不依赖网络
+"""
+
+HTTP = "http"
+BROWSER = "browser"
+
+
+@dataclass
+class CachedPage:
+    url: str
+    html: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+    fresh: bool
+
+
+def offline_mode() -> bool:
+    return os.getenv("CRYPTOBOT_OFFLINE", "").lower() in ("1", "true", "yes")
+
+
+class PageCache:
+    def __init__(self, cache_dir: str = "cryptobot/data/page_cache", ttl_hours: float = 24,
+                 max_mb: float = 200, offline: Optional[bool] = None):
+        self.ttl = ttl_hours * 3600
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.offline = offline_mode() if offline is None else offline
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+        self._temp_dir = None
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_path = os.path.join(cache_dir, "pages.sqlite3")
+        self._conn = sqlite3.connect(self.cache_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS pages (
+                url TEXT NOT NULL,
+                variant TEXT NOT NULL,
+                html BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (url, variant)
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_access ON pages(last_access)")
+        self._conn.commit()
+        if self.offline:
+            logger.info("离线回放模式：只使用已缓存的页面")
+
+    @classmethod
+    def from_fixtures(cls, fixture_dir: str, cache_dir: Optional[str] = None) -> "PageCache":
+        """用页面样本建立离线回放缓存
+
+        fixture_dir/index.json 的格式为 {url: {variant: 文件名}}，默认写入临时目录（close 或进程退出时删除）
+        """
+        temp_dir = None if cache_dir else tempfile.TemporaryDirectory(prefix="page_cache_")
+        cache = cls(cache_dir or temp_dir.name, offline=True)
+        cache._temp_dir = temp_dir
+        with open(os.path.join(fixture_dir, "index.json"), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        for url, variants in index.items():
+            for variant, filename in variants.items():
+                with open(os.path.join(fixture_dir, filename), 'r', encoding='utf-8') as f:
+                    cache.put(url, f.read(), variant=variant)
+        return cache
+
+    def get(self, url: str, variant: str = HTTP) -> Optional[CachedPage]:
+        """读取缓存的页面（过期的也返回，由调用方决定是否重新验证）"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT html, etag, last_modified, fetched_at FROM pages WHERE url = ? AND variant = ?",
+                (url, variant)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE pages SET last_access = ? WHERE url = ? AND variant = ?", (now, url, variant)
+            )
+            self._conn.commit()
+            fresh = now - row[3] < self.ttl
+            if fresh or self.offline:
+                self.hits += 1
+        return CachedPage(url, zlib.decompress(row[0]).decode("utf-8"), row[1], row[2], row[3], fresh)
+
+    def lookup(self, url: str, variant: str = HTTP) -> Tuple[Optional[CachedPage], bool]:
+        """读取缓存，返回 (缓存页面, 是否需要访问网络)
+
+        新鲜的缓存（离线模式下任意缓存）直接使用；离线模式下没有缓存时返回 (None, False)。
+        """
+        cached = self.get(url, variant)
+        if cached and (cached.fresh or self.offline):
+            return cached, False
+        if self.offline:
+            logger.error(f"离线模式下没有缓存: {url}")
+            return None, False
+        return cached, True
+
+    def validators(self, page: Optional[CachedPage]) -> Dict[str, str]:
+        """条件请求头：服务端内容未变时返回 304"""
+        headers = {}
+        if page and page.etag:
+            headers["If-None-Match"] = page.etag
+        if page and page.last_modified:
+            headers["If-Modified-Since"] = page.last_modified
+        return headers
+
+    def put(self, url: str, html: str, etag: str = None, last_modified: str = None,
+            variant: str = HTTP) -> None:
+        """写入页面，总大小超出上限时淘汰最久未访问的条目"""
+        blob = zlib.compress(html.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, variant, html, size, etag, last_modified, fetched_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, variant, blob, len(blob), etag, last_modified, now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def revalidate(self, url: str, cached: Optional[CachedPage], status: int,
+                   headers: Mapping[str, str], body: str) -> Optional[str]:
+        """处理带条件请求头的响应（错误状态由调用方先处理），返回页面 HTML
+
+        304 时刷新缓存时间并返回缓存内容，否则写入新内容和验证器。
+        """
+        if status == 304:
+            if cached is None:
+                return None
+            self.refresh(url)
+            return cached.html
+        self.put(url, body, headers.get("ETag"), headers.get("Last-Modified"))
+        return body
+
+    def refresh(self, url: str, variant: str = HTTP) -> None:
+        """服务端返回 304：内容未变，只刷新抓取时间"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE pages SET fetched_at = ?, last_access = ? WHERE url = ? AND variant = ?",
+                (now, now, url, variant)
+            )
+            self._conn.commit()
+            self.revalidated += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidated": self.revalidated,
+                "entries": entries,
+                "size_mb": size / 1024 / 1024
+            }
+
+    def close(self) -> None:
+        """关闭连接，删除 from_fixtures 创建的临时目录"""
+        with self._lock:
+            self._conn.close()
+        if self._temp_dir is not None:
+            self._temp_dir.cleanup()
+            self._temp_dir = None
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        rows = self._conn.execute("SELECT url, variant, size FROM pages ORDER BY last_access").fetchall()
+        for url, variant, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM pages WHERE url = ? AND variant = ?", (url, variant))
+            total -= size
+            evicted += 1
+        logger.info(f"页面缓存已满，淘汰 {evicted} 个最久未使用的页面")
@@ -1,7 +1,12 @@
 from PyPDF2 import PdfReader
+import hashlib
 import logging
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
+from typing import Iterator, List, Tuple
+from cryptobot.src.kb.chunker import TextChunker, iter_batches
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(message)s')
@@ -13,19 +18,19 @@ class PDFLoader:
     
     def load_pdf(self, pdf_path: str) -> tuple:
         """加载PDF文件内容和元数据"""
+        pages, metadata = self.load_pages(pdf_path)
+        if pages is None:
+            return None, None
+        
+        # 使用分隔符连接所有页面
+        content = "\n\n页面分隔符\n\n".join(text for _, text in pages)
+        return content, metadata
+    
+    def load_pages(self, pdf_path: str) -> tuple:
+        """按页加载PDF，返回 ([(页码, 页面文本), ...], 元数据)"""
         try:
             logger.info(f"\n正在处理PDF: {pdf_path}")
-            reader = PdfReader(pdf_path)
-            
-            # 提取所有页面的文本
-            pages = []
-            for page in reader.pages:
-                text = page.extract_text()
-                if text.strip():  # 确保页面内容不为空
-                    pages.append(text.strip())
-            
-            # 使用分隔符连接所有页面
-            content = "\n\n页面分隔符\n\n".join(pages)
+            pages = list(self.iter_pages(pdf_path))
             
             # 准备元数据
             metadata = {
@@ -36,21 +41,99 @@ class PDFLoader:
             }
             
             logger.info(f"成功提取 {len(pages)} 页内容")
-            return content, metadata
+            return pages, metadata
             
         except Exception as e:
             logger.error(f"处理PDF时出错: {str(e)}")
             return None, None
     
-    def load_directory(self, directory: str) -> int:
-        """加载目录下的所有PDF文件"""
-        success_count = 0
+    def iter_pages(self, pdf_path: str) -> Iterator[Tuple[int, str]]:
+        """逐页产出 (页码, 页面文本)，页码从 1 开始，跳过空白页
+        
+        以文件句柄打开PDF（传路径时 PyPDF2 会把整个文件读入内存），
+        页面文本按需提取，内存占用与PDF大小无关。
+        """
+        with open(pdf_path, "rb") as f:
+            reader = PdfReader(f)
+            for page_number, page in enumerate(reader.pages, 1):
+                text = page.extract_text()
+                if text and text.strip():
+                    yield page_number, text.strip()
+    
+    def iter_chunks(self, pdf_path: str, chunker: TextChunker,
+                    batch_size: int = 64) -> Iterator[Tuple[List[str], List[dict]]]:
+        """逐页读取并切分PDF，每次产出最多 batch_size 个分块 (分块列表, 元数据列表)"""
+        logger.info(f"\n正在流式处理PDF: {pdf_path}")
+        metadata = {
+            "source": os.path.basename(pdf_path),
+            "type": "pdf",
+            "timestamp": datetime.now().isoformat(),
+            "content_hash": file_hash(pdf_path)
+        }
+        chunks = chunker.iter_split_pages(self.iter_pages(pdf_path), metadata)
+        yield from iter_batches(chunks, batch_size)
+    
+    def iter_extracted(self, pdf_paths: List[str], workers: int = 1) -> Iterator[Tuple[str, list, dict, float]]:
+        """提取多个PDF，按完成顺序逐个返回 (路径, 页面列表, 元数据, 提取耗时)
+        
+        workers > 1 时使用进程池并行提取（文本提取是 CPU 密集型），
+        同时在途的任务数限制为 workers * 2，调用方处理慢时不会堆积过多结果。
+        """
+        if workers <= 1:
+            for pdf_path in pdf_paths:
+                yield (pdf_path,) + extract_pdf(pdf_path)
+            return
         
+        pending_paths = iter(pdf_paths)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            in_flight = {}
+            for pdf_path in pending_paths:
+                in_flight[executor.submit(extract_pdf, pdf_path)] = pdf_path
+                if len(in_flight) >= workers * 2:
+                    break
+            
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pdf_path = in_flight.pop(future)
+                    try:
+                        pages, metadata, elapsed = future.result()
+                    except Exception as e:
+                        logger.error(f"提取PDF时出错 {pdf_path}: {str(e)}")
+                        pages, metadata, elapsed = None, None, 0.0
+                    # 补充新任务，保持进程池繁忙
+                    next_path = next(pending_paths, None)
+                    if next_path is not None:
+                        in_flight[executor.submit(extract_pdf, next_path)] = next_path
+                    yield pdf_path, pages, metadata, elapsed
+    
+    def load_directory(self, directory: str, workers: int = 1) -> int:
+        """加载目录下的所有PDF文件"""
+        pdf_paths = []
         for root, _, files in os.walk(directory):
             for file in files:
                 if file.lower().endswith('.pdf'):
-                    pdf_path = os.path.join(root, file)
-                    if self.load_pdf(pdf_path):
-                        success_count += 1
+                    pdf_paths.append(os.path.join(root, file))
         
-        return success_count
\ No newline at end of file
+        success_count = 0
+        for _, pages, _, _ in self.iter_extracted(pdf_paths, workers):
+            if pages is not None:
+                success_count += 1
+        
+        return success_count
+
+
+def extract_pdf(pdf_path: str) -> Tuple[list, dict, float]:
+    """在子进程中提取单个PDF，返回 (页面列表, 元数据, 耗时秒数)"""
+    start = time.perf_counter()
+    pages, metadata = PDFLoader().load_pages(pdf_path)
+    return pages, metadata, time.perf_counter() - start
+
+
+def file_hash(path: str, block_size: int = 1 << 20) -> str:
+    """分块读取文件计算 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
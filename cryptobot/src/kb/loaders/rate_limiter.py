@@ -0,0 +1,77 @@
+import asyncio
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+"""
+按域名限流：每个域名一个令牌桶，取代抓取后固定 sleep(2) 的做法。
+不同网站互不影响，同一网站的请求按配置的速率平滑发出。
+同时提供同步（Selenium 线程）和异步（asyncio 抓取）两种获取方式。
+"""
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float = 1.0):
+        """
+        Args:
+            rate: 每秒补充的令牌数（即平均每秒请求数）
+            capacity: 桶容量（允许的突发请求数）
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """预定一个令牌，返回需要等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self) -> None:
+        """阻塞直到获得令牌"""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self) -> None:
+        """异步等待直到获得令牌"""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class DomainRateLimiter:
+    def __init__(self, rates: Optional[Dict[str, float]] = None, default_rate: float = 1.0, burst: float = 1.0):
+        """
+        Args:
+            rates: {域名: 每秒请求数}，域名按后缀匹配，如 "odaily.news" 匹配 "www.odaily.news"
+            default_rate: 未配置域名的默认速率
+            burst: 每个域名允许的突发请求数
+        """
+        self.rates = dict(rates or {})
+        self.default_rate = self.rates.pop("default", default_rate)
+        self.burst = burst
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket_for(self, url: str) -> TokenBucket:
+        host = urlparse(url).netloc.lower()
+        domain = next((d for d in self.rates if host == d or host.endswith("." + d)), host)
+        with self._lock:
+            if domain not in self._buckets:
+                self._buckets[domain] = TokenBucket(self.rates.get(domain, self.default_rate), self.burst)
+            return self._buckets[domain]
+
+    def acquire(self, url: str) -> None:
+        self.bucket_for(url).acquire()
+
+    async def acquire_async(self, url: str) -> None:
+        await self.bucket_for(url).acquire_async()
@@ -0,0 +1,186 @@
+import json
+import logging
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+
+import requests
+import trafilatura
+from lxml import html as lxml_html
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+"""
+SiteAdapter 类设计说明：
+
+每个网站一个适配器，负责"从 HTML 中拿到正文"：
+1. 快速路径：普通 HTTP 请求（连接池复用）取回服务端渲染的 HTML，
+   依次尝试 文章容器节点 -> __NEXT_DATA__ 中的正文字段 -> trafilatura
+2. 快速路径拿不到足够的正文时，才交给浏览器渲染，
+   渲染后的 page_source 同样用 lxml 按容器类名解析，不再逐个查询元素；
+   没有浏览器路径的网站（如 BlockBeats 的短快讯）不限制正文长度
+3. 解析函数只依赖 HTML 字符串，可在进程池中执行
+"""
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                  "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+}
+
+# 有浏览器路径的网站，快速路径提取的正文少于此长度时改用浏览器（可能只拿到了页面骨架）
+MIN_CONTENT_LENGTH = 200
+
+
+def extract_article(html: str) -> Optional[str]:
+    """用 trafilatura 从 HTML 中提取正文（CPU 密集，可在进程池中调用）"""
+    return trafilatura.extract(html,
+                               include_comments=False,
+                               include_tables=False,
+                               no_fallback=True)
+
+
+class SiteAdapter:
+    name = "generic"
+    domains = ()
+    # 文章容器的 class，浏览器路径等待并解析此节点
+    article_class = None
+
+    def matches(self, url: str) -> bool:
+        return any(domain in url for domain in self.domains)
+
+    @property
+    def needs_browser_fallback(self) -> bool:
+        return self.article_class is not None
+
+    def parse_html(self, html: str) -> Optional[str]:
+        """快速路径：从服务端返回的 HTML 中提取正文"""
+        try:
+            tree = lxml_html.fromstring(html)
+        except Exception:
+            return None
+        for extract in (self._from_article, self._from_next_data):
+            content = extract(tree)
+            if self._enough(content):
+                return content
+        content = extract_article(html)
+        return content if self._enough(content) else None
+
+    def _enough(self, content: Optional[str]) -> bool:
+        """有浏览器路径时正文需达到最小长度，否则非空即可"""
+        if not content:
+            return False
+        return not self.needs_browser_fallback or len(content) >= MIN_CONTENT_LENGTH
+
+    def parse_rendered(self, page_source: str) -> Optional[str]:
+        """浏览器路径：从渲染后的页面源码中提取正文"""
+        try:
+            return self._from_article(lxml_html.fromstring(page_source)) or None
+        except Exception:
+            return None
+
+    def _from_article(self, tree) -> Optional[str]:
+        if not self.article_class:
+            return None
+        nodes = tree.xpath(f'//*[contains(concat(" ", normalize-space(@class), " "), " {self.article_class} ")]')
+        if not nodes:
+            return None
+        return _element_text(nodes[0])
+
+    def _from_next_data(self, tree) -> Optional[str]:
+        """Next.js 页面把服务端数据放在 __NEXT_DATA__ 中，正文通常是其中最长的 HTML 字段"""
+        scripts = tree.xpath('//script[@id="__NEXT_DATA__"]/text()')
+        if not scripts:
+            return None
+        try:
+            data = json.loads(scripts[0])
+        except ValueError:
+            return None
+        candidates = [s for s in _iter_strings(data) if "<p" in s]
+        if not candidates:
+            return None
+        return _element_text(lxml_html.fromstring(max(candidates, key=len)))
+
+
+class BlockBeatsAdapter(SiteAdapter):
+    name = "blockbeats"
+    domains = ("theblockbeats.info",)
+
+
+class OdailyAdapter(SiteAdapter):
+    name = "odaily"
+    domains = ("odaily.news",)
+    article_class = "_3739r7Mk"
+
+
+class ForesightAdapter(SiteAdapter):
+    name = "foresight"
+    domains = ("foresightnews.pro",)
+    article_class = "ql-editor"
+
+
+ADAPTERS: List[SiteAdapter] = [BlockBeatsAdapter(), OdailyAdapter(), ForesightAdapter()]
+_BY_NAME: Dict[str, SiteAdapter] = {adapter.name: adapter for adapter in ADAPTERS}
+
+
+def get_adapter(url: str) -> Optional[SiteAdapter]:
+    return next((adapter for adapter in ADAPTERS if adapter.matches(url)), None)
+
+
+def parse_with_adapter(name: str, html: str) -> Optional[str]:
+    """按适配器名称解析 HTML（供进程池调用，参数均可序列化）"""
+    return _BY_NAME[name].parse_html(html)
+
+
+class ExtractionStats:
+    """统计每个 URL 由哪条路径取得正文：http / browser / failed"""
+
+    def __init__(self):
+        self.paths = Counter()
+        self.served_by: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def record(self, url: str, path: str) -> None:
+        with self._lock:
+            self.paths[path] += 1
+            self.served_by[url] = path
+
+    def summary(self) -> str:
+        return "，".join(f"{path} {count}" for path, count in sorted(self.paths.items())) or "无"
+
+
+_local = threading.local()
+
+
+def get_session(pool_size: int = 8) -> requests.Session:
+    """每个线程一个复用连接的 HTTP 会话"""
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=2)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update(DEFAULT_HEADERS)
+        _local.session = session
+    return session
+
+
+def _element_text(element) -> str:
+    """按文档顺序取出段落和二级标题的文本"""
+    texts = []
+    for node in element.iter("p", "h2"):
+        text = node.text_content().strip()
+        if text:
+            texts.append(text)
+    return "\n".join(texts)
+
+
+def _iter_strings(data):
+    if isinstance(data, str):
+        yield data
+    elif isinstance(data, dict):
+        for value in data.values():
+            yield from _iter_strings(value)
+    elif isinstance(data, list):
+        for value in data:
+            yield from _iter_strings(value)
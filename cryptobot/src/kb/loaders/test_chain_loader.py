@@ -0,0 +1,120 @@
+import logging
+import time
+import pytest
+from cryptobot.src.kb.loaders.chain_loader import (
+    ChainLoader, MicroBatcher, format_event, events_from_block, TOKEN_LAUNCH, POOL_MIGRATION, LARGE_TRADE
+)
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+class FakeKnowledgeBase:
+    """只记录写入批次，不调用 Embedding 接口"""
+
+    def __init__(self):
+        self.batches = []
+
+    def add_texts(self, texts, metadatas=None, exact_only=False):
+        assert exact_only
+        self.batches.append((texts, metadatas))
+
+def test_format_event():
+    """测试事件转文本和元数据"""
+    text, metadata = format_event({
+        "type": POOL_MIGRATION, "mint": "PepeMint", "symbol": "PEPE", "slot": 300,
+        "block_time": 1700000000, "pool": "RaydiumPool", "market_cap_sol": 410.6,
+        "from_market": "pump.fun", "to_market": "Raydium"
+    })
+    logger.info(text)
+    assert "PEPE（PepeMint） 从内盘迁移到外盘（pump.fun → Raydium）" in text
+    assert "411 SOL" in text
+    assert metadata["type"] == "chain" and metadata["event"] == POOL_MIGRATION
+    assert metadata["source"] == "chain:pool_migration:PepeMint:300"
+    assert None not in metadata.values()
+
+def test_micro_batching():
+    """测试按数量和按时间窗口批量写入"""
+    kb = FakeKnowledgeBase()
+    loader = ChainLoader(kb, max_items=3, max_delay=0.2)
+    events = [{"type": TOKEN_LAUNCH, "mint": f"Mint{i}", "slot": i, "block_time": 1700000000 + i}
+              for i in range(7)]
+
+    loader.add_events(events[:4])
+    # 攒够 3 条立即写入，剩余 1 条等待时间窗口
+    assert [len(texts) for texts, _ in kb.batches] == [3]
+    time.sleep(0.5)
+    assert [len(texts) for texts, _ in kb.batches] == [3, 1]
+
+    loader.add_events(events[4:])
+    loader.close()
+    assert [len(texts) for texts, _ in kb.batches] == [3, 1, 3]
+    assert loader.loaded == 7
+    sources = [m["source"] for _, metadatas in kb.batches for m in metadatas]
+    assert sources == [f"chain:token_launch:Mint{i}:{i}" for i in range(7)]
+
+def test_events_from_block():
+    """测试从区块中识别新币发行和大额交易"""
+    block = {"blockTime": 1700000000, "transactions": [{
+        "transaction": {"signatures": ["sig1"], "message": {"accountKeys": ["Creator", "Whale"]}},
+        "meta": {"err": None, "logMessages": ["Program log: Instruction: InitializeMint2"],
+                 "preBalances": [0, 200_000_000_000], "postBalances": [0, 100_000_000_000],
+                 "preTokenBalances": [],
+                 "postTokenBalances": [{"accountIndex": 2, "owner": "Whale", "mint": "NewMint",
+                                        "uiTokenAmount": {"uiAmount": 1e6}}]}
+    }]}
+    events = events_from_block(7, block, large_trade_sol=50)
+    assert [(e["type"], e["mint"]) for e in events] == [(TOKEN_LAUNCH, "NewMint"), (LARGE_TRADE, "NewMint")]
+    assert events[0]["creator"] == "Creator"
+    text, _ = format_event(events[1])
+    assert "钱包 Whale 买入 1,000,000 个 NewMint，金额 100.00 SOL" in text
+
+def test_batcher_flushes_in_order():
+    flushed = []
+    batcher = MicroBatcher(flushed.append, max_items=2, max_delay=60)
+    batcher.add([1, 2, 3, 4, 5])
+    batcher.close()
+    assert flushed == [[1, 2], [3, 4], [5]]
+
+def test_failed_flush_keeps_batch():
+    """写入失败时批次放回队首并抛出异常，之后按原顺序重试"""
+    flushed = []
+    failures = [RuntimeError("embedding error")]
+
+    def flush_fn(batch):
+        if failures:
+            raise failures.pop()
+        flushed.append(batch)
+
+    batcher = MicroBatcher(flush_fn, max_items=2, max_delay=60)
+    batcher.add([1])
+    with pytest.raises(RuntimeError):
+        batcher.add([2, 3])
+    assert flushed == []
+    batcher.flush()
+    assert flushed == [[1, 2], [3]]
+
+    # 后台线程的超时刷新失败时同样保留批次，稍后重试成功
+    kb = FakeKnowledgeBase()
+    original = kb.add_texts
+    calls = []
+
+    def flaky(texts, metadatas=None, exact_only=False):
+        calls.append(len(texts))
+        if len(calls) == 1:
+            raise RuntimeError("embedding error")
+        original(texts, metadatas, exact_only)
+
+    kb.add_texts = flaky
+    loader = ChainLoader(kb, max_items=10, max_delay=0.1)
+    loader.add_events([{"type": TOKEN_LAUNCH, "mint": "Mint0", "slot": 0, "block_time": 1700000000}])
+    time.sleep(0.5)
+    loader.close()
+    assert len(calls) >= 2 and loader.loaded == 1
+    assert [m["source"] for _, metadatas in kb.batches for m in metadatas] == ["chain:token_launch:Mint0:0"]
+
+if __name__ == "__main__":
+    test_format_event()
+    test_micro_batching()
+    test_events_from_block()
+    test_batcher_flushes_in_order()
+    test_failed_flush_keeps_batch()
@@ -0,0 +1,80 @@
+import logging
+import threading
+import time
+from selenium.common.exceptions import WebDriverException
+from cryptobot.src.kb.loaders.driver_pool import WebDriverPool, _PooledDriver
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+class FakeDriver:
+    def __init__(self):
+        self.closed = False
+
+    def quit(self):
+        self.closed = True
+
+class FakePool(WebDriverPool):
+    """不启动真实浏览器，只记录创建了多少个驱动"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.started = []
+
+    def _start(self):
+        driver = FakeDriver()
+        self.started.append(driver)
+        return _PooledDriver(driver)
+
+def test_driver_reuse_and_recycle():
+    """测试浏览器复用、按页数回收和出错回收"""
+    pool = FakePool(size=1, max_pages=3)
+
+    for _ in range(3):
+        with pool.driver():
+            pass
+    # 前 3 个页面复用同一个浏览器，达到上限后被关闭
+    assert len(pool.started) == 1
+    assert pool.started[0].closed
+
+    try:
+        with pool.driver():
+            raise WebDriverException("chrome not reachable")
+    except WebDriverException:
+        pass
+    assert len(pool.started) == 2
+    assert pool.started[1].closed
+
+    with pool.driver() as driver:
+        assert driver is pool.started[2]
+    pool.close()
+    assert pool.started[2].closed
+
+def test_driver_pool_bound():
+    """测试并发借用不超过池大小"""
+    pool = FakePool(size=2, max_pages=100)
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def render():
+        nonlocal active, peak
+        with pool.driver():
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.05)
+            with lock:
+                active -= 1
+
+    threads = [threading.Thread(target=render) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    logger.info(f"最大并发: {peak}，创建浏览器: {len(pool.started)}")
+    assert peak == 2
+    assert len(pool.started) == 2
+
+if __name__ == "__main__":
+    test_driver_reuse_and_recycle()
+    test_driver_pool_bound()
@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import aiohttp
+from cryptobot.src.kb.loaders.async_fetcher import AsyncURLFetcher
+from cryptobot.src.kb.loaders.page_cache import PageCache
+from cryptobot.src.kb.loaders.rate_limiter import DomainRateLimiter
+from cryptobot.src.kb.loaders.url_loader import URLLoader
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+PAGE = "<html><body><p>" + "链上数据显示长期持有者继续增持。" * 20 + "</p></body></html>"
+
+class Handler(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        Handler.requests.append(self.headers.get("If-None-Match"))
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = PAGE.encode("utf-8")
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def test_page_cache_revalidation(tmp_path):
+    """测试缓存命中、过期后的条件请求（304）和离线回放"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/news/1"
+    cache_dir = str(tmp_path)
+
+    try:
+        limiter = DomainRateLimiter(default_rate=1000.0)
+        loader = URLLoader(rate_limiter=limiter, page_cache=PageCache(cache_dir, ttl_hours=1))
+        assert loader.fetch_html(url) == PAGE
+        assert loader.fetch_html(url) == PAGE
+        # 第二次直接命中缓存，不访问网络
+        assert Handler.requests == [None]
+
+        # TTL 为 0：每次都带 ETag 重新验证，服务端返回 304
+        loader.page_cache.ttl = 0
+        assert loader.fetch_html(url) == PAGE
+        assert Handler.requests == [None, '"v1"']
+        assert loader.page_cache.stats()["revalidated"] == 1
+
+        # 异步抓取与同步抓取共用同一套缓存查询和重新验证逻辑
+        fetcher = AsyncURLFetcher(loader, limiter)
+
+        async def download():
+            async with aiohttp.ClientSession() as session:
+                return await fetcher._download(session, url)
+
+        assert asyncio.run(download()) == PAGE
+        assert Handler.requests == [None, '"v1"', '"v1"']
+        assert loader.page_cache.stats()["revalidated"] == 2
+    finally:
+        server.shutdown()
+
+    # 离线回放：服务已关闭，仍能从缓存读取；未缓存的页面直接返回 None
+    offline = URLLoader(rate_limiter=limiter, page_cache=PageCache(cache_dir, ttl_hours=0, offline=True))
+    assert offline.fetch_html(url) == PAGE
+    assert offline.fetch_html(url + "?missing") is None
+
+def test_page_cache_eviction(tmp_path):
+    """测试总大小超出上限时淘汰最久未访问的页面"""
+    cache = PageCache(str(tmp_path), max_mb=0.01)
+    for i in range(10):
+        # 随机性不足的文本压缩率很高，这里用不重复的内容撑大体积
+        cache.put(f"https://example.com/{i}", "".join(chr(0x4e00 + (i * 997 + j) % 20000) for j in range(2000)))
+    stats = cache.stats()
+    logger.info(f"缓存条目: {stats['entries']}，大小: {stats['size_mb'] * 1024:.1f} KB")
+    assert stats["size_mb"] <= 0.01
+    assert cache.get("https://example.com/9") is not None
+    assert cache.get("https://example.com/0") is None
+
+def test_fixture_cache_cleanup():
+    """样本回放缓存默认写入临时目录，关闭时删除"""
+    fixture_dir = Path(__file__).resolve().parents[3] / "tests" / "fixtures" / "pages"
+    cache = PageCache.from_fixtures(str(fixture_dir))
+    cache_dir = Path(cache.cache_path).parent
+    assert cache.get("https://www.odaily.news/post/5198722") is not None
+    cache.close()
+    assert not cache_dir.exists()
+
+if __name__ == "__main__":
+    for test in (test_page_cache_revalidation, test_page_cache_eviction):
+        with tempfile.TemporaryDirectory() as tmp:
+            test(Path(tmp))
+    test_fixture_cache_cleanup()
@@ -1,5 +1,6 @@
 import logging
 from cryptobot.src.kb.loaders.pdf_loader import PDFLoader
+from cryptobot.src.kb.chunker import TextChunker
 import os
 
 logging.basicConfig(level=logging.INFO, format='%(message)s')
@@ -46,5 +47,25 @@ def test_pdf_loader():
         logger.error(f"PDF加载出错: {str(e)}")
         logger.error(f"错误类型: {type(e)}")
 
+def test_pdf_iter_chunks():
+    """测试逐页流式切分PDF"""
+    loader = PDFLoader()
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    test_pdf = os.path.join(current_dir, "test_data", "test.pdf")
+    
+    pages = list(loader.iter_pages(test_pdf))
+    assert pages and pages[0][0] == 1
+    
+    # 每批不超过 batch_size 个分块，元数据带页码和文件哈希
+    batches = list(loader.iter_chunks(test_pdf, TextChunker(chunk_size=100, chunk_overlap=10), batch_size=2))
+    logger.info(f"共 {len(batches)} 批，{sum(len(texts) for texts, _ in batches)} 个分块")
+    for texts, metadatas in batches:
+        assert 0 < len(texts) <= 2
+        for metadata in metadatas:
+            assert metadata["source"] == "test.pdf"
+            assert metadata["page"] in {page for page, _ in pages}
+            assert metadata["content_hash"]
+
 if __name__ == "__main__":
-    test_pdf_loader() 
\ No newline at end of file
+    test_pdf_loader()
+    test_pdf_iter_chunks() 
\ No newline at end of file
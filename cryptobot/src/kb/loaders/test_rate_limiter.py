@@ -0,0 +1,41 @@
+import asyncio
+import logging
+import time
+from cryptobot.src.kb.loaders.rate_limiter import DomainRateLimiter
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+def test_domain_rate_limiter():
+    """测试按域名限流：同一域名按速率排队，不同域名互不影响"""
+    limiter = DomainRateLimiter({"odaily.news": 10.0, "default": 100.0})
+    
+    # 同一域名（含子域名）共用一个令牌桶
+    assert limiter.bucket_for("https://www.odaily.news/post/1") is limiter.bucket_for("https://odaily.news/post/2")
+    
+    start = time.monotonic()
+    for i in range(4):
+        limiter.acquire(f"https://www.odaily.news/post/{i}")
+    elapsed = time.monotonic() - start
+    logger.info(f"同一域名 4 次请求耗时: {elapsed:.2f}s")
+    # 首个请求使用初始令牌，其余 3 个按 10 次/秒 排队
+    assert 0.25 <= elapsed < 0.6
+
+def test_domain_rate_limiter_async():
+    """测试异步获取：不同域名并行"""
+    limiter = DomainRateLimiter({"odaily.news": 5.0, "foresightnews.pro": 5.0})
+    urls = ["https://www.odaily.news/post/1", "https://foresightnews.pro/article/detail/1"] * 2
+    
+    async def run():
+        await asyncio.gather(*(limiter.acquire_async(url) for url in urls))
+    
+    start = time.monotonic()
+    asyncio.run(run())
+    elapsed = time.monotonic() - start
+    logger.info(f"两个域名各 2 次请求耗时: {elapsed:.2f}s")
+    # 每个域名各等待一个间隔（0.2s），两个域名同时进行
+    assert 0.15 <= elapsed < 0.35
+
+if __name__ == "__main__":
+    test_domain_rate_limiter()
+    test_domain_rate_limiter_async()
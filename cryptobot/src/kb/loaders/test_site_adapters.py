@@ -0,0 +1,95 @@
+import json
+import logging
+import tempfile
+from pathlib import Path
+from contextlib import contextmanager
+from cryptobot.src.kb.loaders.site_adapters import get_adapter, parse_with_adapter
+from cryptobot.src.kb.loaders.page_cache import PageCache
+from cryptobot.src.kb.loaders.rate_limiter import DomainRateLimiter
+from cryptobot.src.kb.loaders.url_loader import URLLoader
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+PARAGRAPHS = ["比特币减半后矿工收入下降，算力短期内出现回落。" * 5,
+              "链上数据显示长期持有者继续增持，交易所余额降至新低。" * 5]
+
+def article_html(article_class: str) -> str:
+    body = "".join(f"<p>{p}</p>" for p in PARAGRAPHS)
+    return f'<html><body><div class="header">导航</div><div class="{article_class} other">' \
+           f'<h2>市场观察</h2>{body}</div></body></html>'
+
+def test_parse_server_rendered():
+    """测试快速路径：按文章容器类名和 __NEXT_DATA__ 提取正文"""
+    odaily = get_adapter("https://www.odaily.news/post/5198722")
+    assert odaily.name == "odaily"
+    content = parse_with_adapter("odaily", article_html("_3739r7Mk"))
+    assert content.splitlines()[0] == "市场观察"
+    assert "导航" not in content
+
+    next_data = {"props": {"pageProps": {"article": {
+        "title": "标题", "content": "".join(f"<p>{p}</p>" for p in PARAGRAPHS)
+    }}}}
+    html = f'<html><body><div id="__next"></div><script id="__NEXT_DATA__" type="application/json">' \
+           f'{json.dumps(next_data, ensure_ascii=False)}</script></body></html>'
+    content = parse_with_adapter("foresight", html)
+    assert content == "\n".join(PARAGRAPHS)
+
+    # 只有页面骨架时快速路径失败
+    assert parse_with_adapter("foresight", "<html><body><div id='__next'></div></body></html>") is None
+
+def test_short_content():
+    """有浏览器路径时短正文交给浏览器；没有浏览器路径（BlockBeats 快讯）时短正文直接接受"""
+    short = {"props": {"pageProps": {"flash": {"content": "<p>BTC 突破 7 万美元。</p>"}}}}
+    html = f'<html><body><script id="__NEXT_DATA__" type="application/json">' \
+           f'{json.dumps(short, ensure_ascii=False)}</script></body></html>'
+    assert parse_with_adapter("blockbeats", html) == "BTC 突破 7 万美元。"
+    assert parse_with_adapter("foresight", html) is None
+
+class FakeDriver:
+    def __init__(self, page_source):
+        self.page_source = page_source
+
+    def get(self, url):
+        pass
+
+    def find_element(self, by, value):
+        return object()
+
+class FakeDriverPool:
+    size = 1
+
+    def __init__(self, page_source):
+        self.page_source = page_source
+        self.renders = 0
+
+    @contextmanager
+    def driver(self):
+        self.renders += 1
+        yield FakeDriver(self.page_source)
+
+def test_browser_fallback_stats(tmp_path):
+    """测试快速路径失败时改用浏览器，并记录每个 URL 的来源路径"""
+    pool = FakeDriverPool(article_html("ql-editor"))
+    loader = URLLoader(rate_limiter=DomainRateLimiter(default_rate=1000.0), driver_pool=pool,
+                       page_cache=PageCache(str(tmp_path)))
+    loader._fetch_http = lambda adapter, url: None
+
+    url = "https://foresightnews.pro/article/detail/77220"
+    content = loader.load_url(url)
+    assert content and "市场观察" in content
+    assert pool.renders == 1
+    assert loader.stats.served_by[url] == "browser"
+
+    # BlockBeats 没有浏览器路径，快速路径失败即记为失败
+    url = "https://www.theblockbeats.info/news/56667"
+    assert loader.load_url(url) is None
+    assert loader.stats.served_by[url] == "failed"
+    assert pool.renders == 1
+    logger.info(f"抓取路径统计: {loader.stats.summary()}")
+
+if __name__ == "__main__":
+    test_parse_server_rendered()
+    test_short_content()
+    with tempfile.TemporaryDirectory() as tmp:
+        test_browser_fallback_stats(Path(tmp))
@@ -1,14 +1,24 @@
 import logging
-from cryptobot.src.kb.loaders.url_loader import URLLoader
 import os
+from cryptobot.src.kb.loaders.page_cache import PageCache
+from cryptobot.src.kb.loaders.url_loader import URLLoader
 
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 logger = logging.getLogger(__name__)
 
+# 提交到仓库的页面样本（cryptobot/tests/fixtures/pages）
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           "..", "..", "..", "tests", "fixtures", "pages")
+
 def test_url_loader():
-    """测试URL加载器的基本功能"""
+    """测试URL加载器的基本功能
+    
+    页面从样本回放（离线模式），不访问网络，结果稳定可复现。
+    """
     # 1. 初始化加载器
-    loader = URLLoader()
+    loader = URLLoader(page_cache=PageCache.from_fixtures(FIXTURE_DIR))
+    logger.info(f"离线回放模式: {loader.page_cache.offline}")
+    assert loader.page_cache.offline
     
     # 2. 测试不同网站的URL
     test_urls = [
@@ -21,21 +31,22 @@ def test_url_loader():
     
     for url in test_urls:
         logger.info(f"\n测试URL: {url}")
-        try:
-            content = loader.load_url(url)
-            if content:
-                logger.info(f"成功加载URL")
-                logger.info(f"内容长度: {len(content)}")
-                logger.info("\n内容预览:")
-                logger.info(f"{content[:500]}...")
-                logger.info("\n" + "="*50 + "\n")  # 分隔线
-            else:
-                logger.error("URL加载失败：返回内容为空")
-                
-        except Exception as e:
-            logger.error(f"URL加载出错: {str(e)}")
-            logger.error(f"错误类型: {type(e)}")
-            logger.error("\n" + "="*50 + "\n")  # 分隔线
+        content = loader.load_url(url)
+        assert content, f"URL加载失败：返回内容为空 {url}"
+        logger.info(f"内容长度: {len(content)}")
+        logger.info("\n内容预览:")
+        logger.info(f"{content[:500]}...")
+        logger.info("\n" + "="*50 + "\n")  # 分隔线
+    
+    logger.info(f"抓取路径统计: {loader.stats.summary()}")
+    assert loader.stats.served_by == {
+        "https://www.theblockbeats.info/news/56667": "http",
+        "https://www.odaily.news/post/5198722": "http",
+        "https://foresightnews.pro/article/detail/77220": "cache"
+    }
+    
+    # 3. 没有样本的页面在离线模式下直接失败，不访问网络
+    assert loader.load_url("https://www.odaily.news/post/1") is None
 
 if __name__ == "__main__":
-    test_url_loader() 
\ No newline at end of file
+    test_url_loader() 
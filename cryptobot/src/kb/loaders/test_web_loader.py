@@ -0,0 +1,143 @@
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from cryptobot.src.kb.loaders.rate_limiter import DomainRateLimiter
+from cryptobot.src.kb.loaders.web_loader import BloomFilter, WebLoader, parse_feed
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+RSS = b"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel><title>news</title>
+<item><title>a</title><link>https://www.odaily.news/post/1</link><pubDate>Mon, 01 Jan 2024 08:00:00 +0800</pubDate></item>
+<item><title>b</title><link>https://www.odaily.news/post/2#comments</link><pubDate>Tue, 02 Jan 2024 08:00:00 +0800</pubDate></item>
+<item><title>c</title><link>https://example.com/unsupported</link></item>
+</channel></rss>"""
+
+ATOM = b"""<feed xmlns="http://www.w3.org/2005/Atom"><entry><link rel="alternate" href="https://foresightnews.pro/article/detail/9"/>
+<updated>2024-01-03T00:00:00Z</updated></entry></feed>"""
+
+SITEMAP_INDEX = b"""<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+<sitemap><loc>{base}/sitemap-1.xml</loc></sitemap></sitemapindex>"""
+
+SITEMAP = b"""<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+<url><loc>https://www.theblockbeats.info/news/100</loc><lastmod>2023-12-31</lastmod></url>
+<url><loc>https://www.odaily.news/post/1</loc></url></urlset>"""
+
+def test_bloom_filter(tmp_path):
+    """测试布隆过滤器的误判率和持久化"""
+    path = str(tmp_path / "seen.bloom")
+    bloom = BloomFilter(capacity=10_000, error_rate=0.01, path=path)
+    for i in range(10_000):
+        bloom.add(f"https://www.odaily.news/post/{i}")
+    bloom.save()
+
+    reloaded = BloomFilter(capacity=10_000, error_rate=0.01, path=path)
+    assert all(f"https://www.odaily.news/post/{i}" in reloaded for i in range(10_000))
+    false_positives = sum(f"https://foresightnews.pro/article/detail/{i}" in reloaded for i in range(10_000))
+    logger.info(f"误判率: {false_positives / 10_000:.3%}")
+    assert false_positives < 300
+
+def test_parse_feed():
+    entries, _ = parse_feed(RSS)
+    assert entries[0] == ("https://www.odaily.news/post/1", "2024-01-01T08:00:00+08:00")
+    assert len(entries) == 3
+    entries, _ = parse_feed(ATOM)
+    assert entries == [("https://foresightnews.pro/article/detail/9", "2024-01-03T00:00:00+00:00")]
+    _, sitemaps = parse_feed(SITEMAP_INDEX.replace(b"{base}", b"http://host"))
+    assert sitemaps == ["http://host/sitemap-1.xml"]
+
+class FakeKnowledgeBase:
+    def __init__(self):
+        self.sources = {"https://www.theblockbeats.info/news/100"}
+
+    def has_source(self, source):
+        return source in self.sources
+
+class FakeManager:
+    """抓取时 odaily 成功入库，其余失败"""
+
+    def __init__(self):
+        self.kb = FakeKnowledgeBase()
+        self.rate_limiter = DomainRateLimiter(default_rate=1000.0)
+        self.batches = []
+
+    def load_urls(self, urls):
+        self.batches.append(urls)
+        loaded = [url for url in urls if "odaily" in url]
+        self.kb.sources.update(loaded)
+        return len(loaded)
+
+def test_discover_and_crawl(tmp_path):
+    """测试发现新文章、去重、按发布时间排序抓取和失败重试"""
+    pages = {"/rss": RSS, "/atom": ATOM, "/sitemap.xml": SITEMAP_INDEX, "/sitemap-1.xml": SITEMAP}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = pages[self.path].replace(b"{base}", f"http://127.0.0.1:{server.server_port}".encode())
+            self.send_response(200)
+            self.send_header("Content-Type", "application/xml")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    state_dir = str(tmp_path)
+
+    try:
+        manager = FakeManager()
+        feeds = [f"{base}/rss", f"{base}/atom", f"{base}/sitemap.xml"]
+        loader = WebLoader(manager, feeds, state_dir=state_dir, batch_size=2)
+        # odaily/1、odaily/2（去掉锚点）、foresight/9；不支持的网站和已入库的 BlockBeats 被跳过
+        assert loader.discover() == 3
+        assert loader.crawl() == 2
+        # 按发布时间从新到旧
+        assert manager.batches[0] == ["https://foresightnews.pro/article/detail/9", "https://www.odaily.news/post/2"]
+        # 失败的链接留在队列中重试
+        assert loader.frontier.pending_count() == 1
+
+        # 重新打开后，已见过的链接不再加入队列
+        reopened = WebLoader(manager, feeds, state_dir=state_dir, batch_size=2)
+        assert reopened.discover() == 0
+    finally:
+        server.shutdown()
+
+def test_bloom_false_positive(tmp_path):
+    """布隆过滤器误判为见过的新链接仍要加入队列"""
+    pages = {"/rss": RSS}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/xml")
+            self.end_headers()
+            self.wfile.write(pages[self.path])
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    try:
+        loader = WebLoader(FakeManager(), [f"http://127.0.0.1:{server.server_port}/rss"],
+                           state_dir=str(tmp_path))
+        # 模拟误判：过滤器里有，但从未进入队列
+        loader.seen.add("https://www.odaily.news/post/1")
+        assert loader.discover() == 2
+        assert loader.frontier.contains("https://www.odaily.news/post/1")
+        assert loader.discover() == 0
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    test_parse_feed()
+    for test in (test_bloom_filter, test_discover_and_crawl, test_bloom_false_positive):
+        with tempfile.TemporaryDirectory() as tmp:
+            test(Path(tmp))
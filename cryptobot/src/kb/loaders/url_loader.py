@@ -1,86 +1,110 @@
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-import trafilatura
-import time
-from datetime import datetime
+from typing import Optional
 import logging
+from cryptobot.src.kb.loaders.rate_limiter import DomainRateLimiter
+from cryptobot.src.kb.loaders.driver_pool import WebDriverPool, get_driver_pool
+from cryptobot.src.kb.loaders.page_cache import PageCache, BROWSER
+from cryptobot.src.kb.loaders.site_adapters import (
+    SiteAdapter, ExtractionStats, get_adapter, get_session, extract_article
+)
 
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 logger = logging.getLogger(__name__)
 
+
+def is_supported(url: str) -> bool:
+    return get_adapter(url) is not None
+
+
 class URLLoader:
-    def __init__(self):
-        # 初始化 Selenium
-        self.options = webdriver.ChromeOptions()
-        self.options.add_argument('--headless')
-        self.options.add_argument('--no-sandbox')
-        self.options.add_argument('--disable-dev-shm-usage')
-        self.driver = None
+    def __init__(self, rate_limiter: DomainRateLimiter = None, driver_pool: WebDriverPool = None,
+                 timeout: float = 15, page_cache: PageCache = None):
+        # 按域名限流，替代每次抓取后的固定等待
+        self.rate_limiter = rate_limiter or DomainRateLimiter()
+        # Selenium 浏览器从共享池中借用，只在 HTTP 快速路径失败时使用
+        self.driver_pool = driver_pool or get_driver_pool()
+        # 原始页面缓存（含离线回放模式）
+        self.page_cache = page_cache or PageCache()
+        self.timeout = timeout
+        # 记录每个 URL 由哪条路径取得正文
+        self.stats = ExtractionStats()
 
     def load_url(self, url: str) -> str:
         content = None
         try:
             logger.info(f"\n=== 开始加载URL: {url} ===")
-            
-            # BlockBeats 使用 trafilatura
-            if "theblockbeats.info" in url:
-                logger.info("使用 trafilatura 加载 BlockBeats")
-                downloaded = trafilatura.fetch_url(url)
-                if downloaded:
-                    content = trafilatura.extract(downloaded, 
-                                               include_comments=False,
-                                               include_tables=False,
-                                               no_fallback=True)
-                
-            # 其他网站使用 Selenium
+            adapter = get_adapter(url)
+            if adapter is None:
+                logger.error(f"不支持的网站: {url}")
+                return None
+
+            # 快速路径：普通 HTTP 请求（优先使用缓存）+ lxml/trafilatura 解析
+            content = self._fetch_http(adapter, url)
+            if content:
+                self.stats.record(url, "http")
+            elif adapter.needs_browser_fallback:
+                content = self.load_with_browser(url)
             else:
-                if not self.driver:
-                    self.driver = webdriver.Chrome(options=self.options)
-                
-                self.driver.get(url)
-                wait = WebDriverWait(self.driver, 10)
-                
-                if "odaily.news" in url:
-                    logger.info("使用 Selenium 加载 Odaily")
-                    article = wait.until(
-                        EC.presence_of_element_located((By.CLASS_NAME, "_3739r7Mk"))
-                    )
-                elif "foresightnews.pro" in url:
-                    logger.info("使用 Selenium 加载 Foresight")
-                    article = wait.until(
-                        EC.presence_of_element_located((By.CLASS_NAME, "ql-editor"))
-                    )
-                else:
-                    logger.error(f"不支持的网站: {url}")
-                    return None
-                
-                # 获取内容
-                paragraphs = article.find_elements(By.TAG_NAME, "p")
-                headings = article.find_elements(By.TAG_NAME, "h2")
-                content_elements = []
-                for element in paragraphs + headings:
-                    text = element.text.strip()
-                    if text:
-                        content_elements.append(text)
-                content = "\n".join(content_elements)
-            
+                self.stats.record(url, "failed")
+
             if content:
                 logger.info(f"成功获取内容，长度: {len(content)} 字符")
                 logger.info("内容预览:")
                 logger.info(f"{content[:200]}...\n")
             else:
                 logger.error("未能获取内容")
-            
-            time.sleep(2)  # 避免请求过于频繁
-            
+
         except Exception as e:
             logger.error(f"加载URL时出错: {str(e)}")
             return None
-            
+
         return content
 
-    def __del__(self):
-        if self.driver:
-            self.driver.quit() 
\ No newline at end of file
+    def load_with_browser(self, url: str) -> Optional[str]:
+        """浏览器路径：渲染页面后解析正文（渲染结果同样缓存）"""
+        adapter = get_adapter(url)
+        cached, fetch = self.page_cache.lookup(url, BROWSER)
+        if not fetch:
+            content = adapter.parse_rendered(cached.html) if cached else None
+            self.stats.record(url, "cache" if content else "failed")
+            return content
+
+        logger.info(f"使用 Selenium 加载 {adapter.name}")
+        self.rate_limiter.acquire(url)
+        with self.driver_pool.driver() as driver:
+            page_source = self._render(driver, adapter, url)
+        content = adapter.parse_rendered(page_source)
+        if content:
+            self.page_cache.put(url, page_source, variant=BROWSER)
+        self.stats.record(url, "browser" if content else "failed")
+        return content
+
+    def fetch_html(self, url: str) -> Optional[str]:
+        """获取原始 HTML：新鲜的缓存直接返回，过期的用条件请求重新验证"""
+        cached, fetch = self.page_cache.lookup(url)
+        if not fetch:
+            return cached.html if cached else None
+
+        self.rate_limiter.acquire(url)
+        try:
+            response = get_session().get(url, timeout=self.timeout, headers=self.page_cache.validators(cached))
+            if response.status_code != 304:
+                response.raise_for_status()
+        except Exception as e:
+            logger.info(f"HTTP 请求失败: {str(e)}")
+            return None
+        return self.page_cache.revalidate(url, cached, response.status_code, response.headers, response.text)
+
+    def _fetch_http(self, adapter: SiteAdapter, url: str) -> Optional[str]:
+        html = self.fetch_html(url)
+        return adapter.parse_html(html) if html else None
+
+    def _render(self, driver, adapter: SiteAdapter, url: str) -> str:
+        """用浏览器渲染页面，等待文章容器出现后返回页面源码"""
+        driver.get(url)
+        WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.CLASS_NAME, adapter.article_class))
+        )
+        return driver.page_source
@@ -0,0 +1,279 @@
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import time
+import logging
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Iterable, List, Optional, Tuple
+from urllib.parse import urldefrag
+
+import numpy as np
+from lxml import etree
+
+from cryptobot.src.kb.loaders.site_adapters import get_session
+from cryptobot.src.kb.loaders.url_loader import is_supported
+
+logger = logging.getLogger(__name__)
+
+"""
+WebLoader 类设计说明：
+
+从支持网站的 RSS / Atom / sitemap 中自动发现新文章：
+1. 定期拉取配置的 feeds，解析出文章链接（sitemap 索引会继续展开一层）
+2. 去重分两层：持久化的布隆过滤器（内存小、查询快，可能误判为"已见过"）只作提示，
+   未命中的一定是新链接；命中时再查待抓取队列确认，最终是否已入库以来源登记表为准
+3. 新链接写入 SQLite 待抓取队列（frontier），按发布时间从新到旧分批交给
+   KnowledgeManager.load_urls 的并发抓取阶段；失败的链接有限次重试
+"""
+
+
+class BloomFilter:
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.001, path: str = None):
+        self.path = path
+        self.bits_count = int(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hash_count = max(1, round(self.bits_count / capacity * math.log(2)))
+        if path and os.path.exists(path):
+            self.bits = np.fromfile(path, dtype=np.uint8)
+        else:
+            self.bits = np.zeros((self.bits_count + 7) // 8, dtype=np.uint8)
+        self.bits_count = len(self.bits) * 8
+
+    def _positions(self, item: str) -> np.ndarray:
+        # 双重哈希：h1 + i * h2
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return np.array([(h1 + i * h2) % self.bits_count for i in range(self.hash_count)], dtype=np.int64)
+
+    def add(self, item: str) -> None:
+        positions = self._positions(item)
+        np.bitwise_or.at(self.bits, positions >> 3, (1 << (positions & 7)).astype(np.uint8))
+
+    def __contains__(self, item: str) -> bool:
+        positions = self._positions(item)
+        return bool(np.all(self.bits[positions >> 3] & (1 << (positions & 7)).astype(np.uint8)))
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        tmp_path = self.path + ".tmp"
+        self.bits.tofile(tmp_path)
+        os.replace(tmp_path, self.path)
+
+
+class Frontier:
+    """持久化的待抓取队列"""
+
+    def __init__(self, db_path: str, max_attempts: int = 3):
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS frontier (
+                url TEXT PRIMARY KEY,
+                feed TEXT,
+                published_at TEXT,
+                discovered_at TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_frontier_status ON frontier(status, published_at)")
+        self._conn.commit()
+
+    def push(self, entries: Iterable[Tuple[str, Optional[str]]], feed: str = None) -> int:
+        """加入新链接 (url, 发布时间)，已存在的忽略，返回新增数量"""
+        now = datetime.now().isoformat()
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO frontier (url, feed, published_at, discovered_at) VALUES (?, ?, ?, ?)",
+                [(url, feed, published, now) for url, published in entries]
+            )
+            self._conn.commit()
+            return self._conn.total_changes - before
+
+    def contains(self, url: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM frontier WHERE url = ?", (url,)).fetchone() is not None
+
+    def next_batch(self, size: int) -> List[str]:
+        """取出一批待抓取链接，发布时间新的优先"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url FROM frontier WHERE status = 'pending' "
+                "ORDER BY published_at IS NULL, published_at DESC, discovered_at LIMIT ?", (size,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def mark_done(self, urls: List[str]) -> None:
+        with self._lock:
+            self._conn.executemany("UPDATE frontier SET status = 'done' WHERE url = ?", [(u,) for u in urls])
+            self._conn.commit()
+
+    def mark_failed(self, urls: List[str]) -> None:
+        """记录失败，超过最大次数后不再重试"""
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE frontier SET attempts = attempts + 1, "
+                "status = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'pending' END WHERE url = ?",
+                [(self.max_attempts, u) for u in urls]
+            )
+            self._conn.commit()
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM frontier WHERE status = 'pending'").fetchone()[0]
+
+
+def _normalize_date(value: Optional[str]) -> Optional[str]:
+    """RSS 的 RFC 822 日期和 sitemap/Atom 的 ISO 日期统一转成 ISO 格式，便于排序"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).isoformat()
+    except ValueError:
+        pass
+    try:
+        return parsedate_to_datetime(value).isoformat()
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_feed(content: bytes) -> Tuple[List[Tuple[str, Optional[str]]], List[str]]:
+    """解析 RSS / Atom / sitemap
+
+    Returns:
+        ([(文章链接, 发布时间), ...], [子 sitemap 链接, ...])
+    """
+    parser = etree.XMLParser(recover=True, resolve_entities=False, no_network=True)
+    root = etree.fromstring(content, parser=parser)
+    if root is None:
+        return [], []
+
+    def local(element) -> str:
+        return etree.QName(element).localname if isinstance(element.tag, str) else ""
+
+    def child_text(element, *names) -> Optional[str]:
+        for child in element:
+            if local(child) in names and child.text:
+                return child.text.strip()
+        return None
+
+    entries, sitemaps = [], []
+    kind = local(root)
+    if kind == "sitemapindex":
+        sitemaps = [loc for sitemap in root if (loc := child_text(sitemap, "loc"))]
+    elif kind == "urlset":
+        entries = [(loc, _normalize_date(child_text(url, "lastmod")))
+                   for url in root if (loc := child_text(url, "loc"))]
+    else:
+        for element in root.iter():
+            name = local(element)
+            if name == "item":
+                link = child_text(element, "link") or child_text(element, "guid")
+                published = child_text(element, "pubDate", "date")
+            elif name == "entry":
+                links = [c.get("href") for c in element if local(c) == "link" and c.get("rel", "alternate") == "alternate"]
+                link = links[0] if links else None
+                published = child_text(element, "published", "updated")
+            else:
+                continue
+            if link:
+                entries.append((link, _normalize_date(published)))
+    return entries, sitemaps
+
+
+class WebLoader:
+    def __init__(self, manager, feeds: List[str], state_dir: str = "cryptobot/data/crawler",
+                 batch_size: int = 32, timeout: float = 15, max_sitemaps: int = 3):
+        """
+        Args:
+            manager: KnowledgeManager 实例（提供 load_urls 和知识库）
+            feeds: RSS / Atom / sitemap 地址列表
+            batch_size: 每次交给并发抓取阶段的链接数
+            max_sitemaps: sitemap 索引最多展开的子 sitemap 数
+        """
+        self.manager = manager
+        self.feeds = feeds
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.max_sitemaps = max_sitemaps
+        os.makedirs(state_dir, exist_ok=True)
+        self.seen = BloomFilter(path=os.path.join(state_dir, "seen.bloom"))
+        self.frontier = Frontier(os.path.join(state_dir, "frontier.sqlite3"))
+
+    def discover(self) -> int:
+        """拉取所有 feeds，把新发现的文章链接加入队列"""
+        added = 0
+        for feed in self.feeds:
+            try:
+                entries = self._read_feed(feed)
+            except Exception as e:
+                logger.error(f"读取 feed 出错 {feed}: {str(e)}")
+                continue
+            fresh = []
+            for url, published in entries:
+                url = urldefrag(url.strip())[0]
+                if not is_supported(url):
+                    continue
+                # 布隆过滤器可能误判，命中时以队列为准确认，避免误判丢掉新文章
+                if url in self.seen and self.frontier.contains(url):
+                    continue
+                self.seen.add(url)
+                # 是否已入库以登记表为准
+                if not self.manager.kb.has_source(url):
+                    fresh.append((url, published))
+            count = self.frontier.push(fresh, feed)
+            added += count
+            logger.info(f"{feed}: {len(entries)} 个链接，新增 {count} 个")
+        self.seen.save()
+        return added
+
+    def crawl(self, max_batches: int = None) -> int:
+        """分批抓取队列中的链接，返回成功入库的数量"""
+        loaded = 0
+        batches = 0
+        # 本轮已尝试过的链接，失败的留到下一轮再重试
+        attempted = set()
+        while max_batches is None or batches < max_batches:
+            candidates = self.frontier.next_batch(self.batch_size + len(attempted))
+            urls = [url for url in candidates if url not in attempted][:self.batch_size]
+            if not urls:
+                break
+            attempted.update(urls)
+            batches += 1
+            self.manager.load_urls(urls)
+            done = [url for url in urls if self.manager.kb.has_source(url)]
+            self.frontier.mark_done(done)
+            self.frontier.mark_failed([url for url in urls if url not in done])
+            loaded += len(done)
+        return loaded
+
+    def run(self, interval: float = 600, rounds: int = None) -> None:
+        """持续发现并抓取新文章，每轮间隔 interval 秒"""
+        round_count = 0
+        while rounds is None or round_count < rounds:
+            start = time.perf_counter()
+            added = self.discover()
+            loaded = self.crawl()
+            round_count += 1
+            logger.info(f"第 {round_count} 轮：发现 {added} 个新链接，入库 {loaded} 个，"
+                        f"队列剩余 {self.frontier.pending_count()} 个，耗时 {time.perf_counter() - start:.2f}s")
+            if rounds is None or round_count < rounds:
+                time.sleep(interval)
+
+    def _read_feed(self, feed: str, depth: int = 1) -> List[Tuple[str, Optional[str]]]:
+        self.manager.rate_limiter.acquire(feed)
+        response = get_session().get(feed, timeout=self.timeout)
+        response.raise_for_status()
+        entries, sitemaps = parse_feed(response.content)
+        if depth > 0:
+            # sitemap 索引只展开一层，且只取地址排序最靠后（通常是最新）的几个
+            for sitemap in sorted(sitemaps, reverse=True)[:self.max_sitemaps]:
+                entries.extend(self._read_feed(sitemap, depth - 1))
+        return entries
@@ -0,0 +1,98 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+"""
+LocalEmbeddings 类设计说明：
+
+用 sentence-transformers 在本地 CPU 上生成向量，不需要 API 密钥，可离线导入：
+1. 按 batch_size 分批推理
+2. workers > 1 时多批并行：pool=thread 用线程池（PyTorch 推理时释放 GIL），
+   pool=process 用 sentence-transformers 的多进程池（每个进程加载一份模型）
+3. sentence-transformers 是可选依赖，只有选择 local 后端时才导入
+"""
+
+
+class LocalEmbeddings(Embeddings):
+    """sentence-transformers 本地 Embedding：分批推理，可用线程池或进程池并行"""
+
+    def __init__(self, model: Any, batch_size: int = 64, workers: int = 1, pool: str = "thread",
+                 device: str = "cpu", normalize: bool = True,
+                 query_prefix: str = "", document_prefix: str = ""):
+        """
+        Args:
+            model: 模型名或本地路径，也可以直接传入已加载的模型（需提供 encode 方法）
+            workers: 并行的批次数，1 表示在当前线程中逐批推理
+            pool: "thread"（PyTorch 推理时释放 GIL）或 "process"（每个进程加载一份模型）
+        """
+        if isinstance(model, str):
+            try:
+                from sentence_transformers import SentenceTransformer
+            except ImportError:
+                raise ImportError("使用本地 Embedding 需要先安装 sentence-transformers: "
+                                  "pip install sentence-transformers")
+            logger.info(f"加载本地 Embedding 模型: {model} ({device})")
+            self.model_name = model
+            model = SentenceTransformer(model, device=device)
+        else:
+            self.model_name = type(model).__name__
+        self.model = model
+        self.batch_size = batch_size
+        self.workers = max(1, workers)
+        self.pool = pool
+        self.device = device
+        self.normalize = normalize
+        self.query_prefix = query_prefix
+        self.document_prefix = document_prefix
+        self._executor = None
+        self._process_pool = None
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """批量生成文档向量"""
+        if not texts:
+            return []
+        texts = [self.document_prefix + text for text in texts]
+
+        if self.workers > 1 and self.pool == "process":
+            if self._process_pool is None:
+                self._process_pool = self.model.start_multi_process_pool([self.device] * self.workers)
+            vectors = self.model.encode_multi_process(texts, self._process_pool, batch_size=self.batch_size,
+                                                      normalize_embeddings=self.normalize)
+            return np.asarray(vectors, dtype=np.float32).tolist()
+
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if self.workers > 1 and len(batches) > 1:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers)
+            parts = list(self._executor.map(self._encode, batches))
+        else:
+            parts = [self._encode(batch) for batch in batches]
+        return np.vstack(parts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        """生成查询向量"""
+        return self._encode([self.query_prefix + text])[0].tolist()
+
+    def close(self) -> None:
+        """关闭线程池和进程池"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        if self._process_pool is not None:
+            self.model.stop_multi_process_pool(self._process_pool)
+            self._process_pool = None
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=self.normalize,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        ), dtype=np.float32)
+
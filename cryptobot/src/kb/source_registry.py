@@ -0,0 +1,242 @@
+import os
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Dict, Optional, Set, Iterable
+
+from cryptobot.src.kb.dedup import (
+    SIMHASH_BANDS, MAX_HAMMING_DISTANCE, simhash_bands, to_signed, to_unsigned, hamming_distance
+)
+
+logger = logging.getLogger(__name__)
+
+"""
+SourceRegistry 类设计说明：
+
+与 Chroma 并列存放的轻量级来源登记表（SQLite），记录每个来源的
+类型、内容哈希、分块 ID 和导入时间。判断"某来源是否已导入"只需
+一次主键查询，不再需要把整个向量库读进内存。
+
+每个分块同时记录规范化文本哈希和 SimHash 分段，作为去重的廉价层。
+files 表记录本地文件的 (路径, 大小, 修改时间, 内容哈希)，用于增量同步。
+"""
+
+
+class SourceRegistry:
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sources (
+                source TEXT PRIMARY KEY,
+                type TEXT,
+                content_hash TEXT,
+                ingested_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_sources_type ON sources(type);
+            CREATE TABLE IF NOT EXISTS chunks (
+                chunk_id TEXT PRIMARY KEY,
+                source TEXT NOT NULL REFERENCES sources(source) ON DELETE CASCADE
+            );
+            CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks(source);
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                synced_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_files_hash ON files(content_hash);
+            """
+        )
+        self._migrate_chunk_signatures()
+        self._conn.commit()
+
+    def _migrate_chunk_signatures(self) -> None:
+        """为 chunks 表补充去重签名列（哈希、SimHash 及其分段）"""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(chunks)")}
+        signature_columns = ["content_hash TEXT", "simhash INTEGER"] + \
+            [f"band{i} INTEGER" for i in range(SIMHASH_BANDS)]
+        for column in signature_columns:
+            if column.split()[0] not in columns:
+                self._conn.execute(f"ALTER TABLE chunks ADD COLUMN {column}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_hash ON chunks(content_hash)")
+        for i in range(SIMHASH_BANDS):
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_chunks_band{i} ON chunks(band{i})")
+
+    @contextmanager
+    def transaction(self):
+        """在同一个事务中执行多次写入，出错时整体回滚"""
+        with self._lock:
+            try:
+                yield self._conn
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+
+    def record(self, sources: Dict[str, dict]) -> None:
+        """登记一次导入的来源及其分块
+
+        Args:
+            sources: {来源: {"type": 类型, "content_hash": 内容哈希, "chunk_ids": [分块ID, ...],
+                            "signatures": [(分块哈希, SimHash), ...]}}
+                     signatures 可选，与 chunk_ids 一一对应；同一来源多次登记时分块会累加
+        """
+        now = datetime.now().isoformat()
+        with self.transaction() as conn:
+            for source, info in sources.items():
+                conn.execute(
+                    """INSERT INTO sources (source, type, content_hash, ingested_at) VALUES (?, ?, ?, ?)
+                       ON CONFLICT(source) DO UPDATE SET
+                           type = COALESCE(excluded.type, sources.type),
+                           content_hash = COALESCE(excluded.content_hash, sources.content_hash),
+                           ingested_at = excluded.ingested_at""",
+                    (source, info.get("type"), info.get("content_hash"), now)
+                )
+                chunk_ids = info.get("chunk_ids", [])
+                signatures = info.get("signatures") or [(None, None)] * len(chunk_ids)
+                conn.executemany(
+                    f"""INSERT OR REPLACE INTO chunks (chunk_id, source, content_hash, simhash,
+                            {", ".join(f"band{i}" for i in range(SIMHASH_BANDS))})
+                        VALUES ({", ".join("?" * (4 + SIMHASH_BANDS))})""",
+                    [_chunk_row(chunk_id, source, signature) for chunk_id, signature in zip(chunk_ids, signatures)]
+                )
+
+    def find_exact(self, hashes: Iterable[str]) -> Set[str]:
+        """返回已存在于知识库中的分块哈希"""
+        hashes = list(set(hashes))
+        found = set()
+        with self._lock:
+            for i in range(0, len(hashes), 500):
+                batch = hashes[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT content_hash FROM chunks WHERE content_hash IN ({','.join('?' * len(batch))})", batch
+                )
+                found.update(row[0] for row in rows)
+        return found
+
+    def find_near(self, value: int, max_distance: int = MAX_HAMMING_DISTANCE) -> Optional[int]:
+        """查找 SimHash 汉明距离不超过 max_distance 的分块，返回最小距离（没有则返回 None）"""
+        bands = simhash_bands(value)
+        condition = " OR ".join(f"band{i} = ?" for i in range(SIMHASH_BANDS))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT simhash FROM chunks WHERE simhash IS NOT NULL AND ({condition})", bands
+            ).fetchall()
+        distances = [hamming_distance(value, to_unsigned(row[0])) for row in rows]
+        best = min(distances, default=None)
+        return best if best is not None and best <= max_distance else None
+
+    def has_source(self, source: str) -> bool:
+        """判断来源是否已导入"""
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM sources WHERE source = ?", (source,)).fetchone()
+        return row is not None
+
+    def get_source(self, source: str) -> Optional[dict]:
+        """获取来源的登记信息"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT source, type, content_hash, ingested_at FROM sources WHERE source = ?", (source,)
+            ).fetchone()
+            if row is None:
+                return None
+            chunk_ids = [r[0] for r in self._conn.execute(
+                "SELECT chunk_id FROM chunks WHERE source = ?", (source,)
+            )]
+        return {
+            "source": row[0],
+            "type": row[1],
+            "content_hash": row[2],
+            "ingested_at": row[3],
+            "chunk_ids": chunk_ids
+        }
+
+    def get_sources(self, source_type: str = None) -> Set[str]:
+        """获取所有已导入的来源，可按类型过滤"""
+        with self._lock:
+            if source_type:
+                rows = self._conn.execute("SELECT source FROM sources WHERE type = ?", (source_type,))
+            else:
+                rows = self._conn.execute("SELECT source FROM sources")
+            return {row[0] for row in rows}
+
+    def remove_source(self, source: str) -> List[str]:
+        """删除来源的登记，返回其分块 ID"""
+        with self.transaction() as conn:
+            chunk_ids = [r[0] for r in conn.execute("SELECT chunk_id FROM chunks WHERE source = ?", (source,))]
+            conn.execute("DELETE FROM sources WHERE source = ?", (source,))
+        return chunk_ids
+
+    def get_file(self, path: str) -> Optional[dict]:
+        """获取本地文件的同步状态"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT path, source, size, mtime_ns, content_hash FROM files WHERE path = ?", (path,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("path", "source", "size", "mtime_ns", "content_hash"), row))
+
+    def get_files(self, directory: str) -> List[dict]:
+        """获取某目录下所有已同步的文件"""
+        prefix = os.path.join(directory, "")
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, source, size, mtime_ns, content_hash FROM files WHERE substr(path, 1, ?) = ?",
+                (len(prefix), prefix)
+            ).fetchall()
+        return [dict(zip(("path", "source", "size", "mtime_ns", "content_hash"), row)) for row in rows]
+
+    def find_files_by_hash(self, content_hash: str) -> List[dict]:
+        """查找内容哈希相同的已同步文件"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, source FROM files WHERE content_hash = ?", (content_hash,)
+            ).fetchall()
+        return [{"path": row[0], "source": row[1]} for row in rows]
+
+    def record_file(self, path: str, source: str, size: int, mtime_ns: int, content_hash: str) -> None:
+        """记录本地文件的同步状态"""
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO files (path, source, size, mtime_ns, content_hash, synced_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (path, source, size, mtime_ns, content_hash, datetime.now().isoformat())
+            )
+
+    def remove_file(self, path: str) -> None:
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM sources LIMIT 1").fetchone() is None
+
+    def clear(self) -> None:
+        """删除全部来源、分块和文件记录"""
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM chunks")
+            conn.execute("DELETE FROM sources")
+            conn.execute("DELETE FROM files")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _chunk_row(chunk_id: str, source: str, signature: tuple) -> tuple:
+    """组装 chunks 表的一行：ID、来源、哈希、SimHash 及其分段"""
+    hash_value, simhash_value = signature
+    if simhash_value is None:
+        return (chunk_id, source, hash_value, None) + (None,) * SIMHASH_BANDS
+    return (chunk_id, source, hash_value, to_signed(simhash_value)) + tuple(simhash_bands(simhash_value))
@@ -0,0 +1,37 @@
+import logging
+from cryptobot.src.kb.chunker import TextChunker
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+def test_chunker():
+    """测试分块：不超过 token 上限、不跨页、带页码和偏移"""
+    chunker = TextChunker(chunk_size=40, chunk_overlap=10)
+    
+    page1 = "内盘：在pumpfun内盘寻找标的投资。外盘一段：内盘标的迁移到外盘后的PVP交易。" * 4
+    page2 = "外盘二段：外盘一段PVP结束后，下跌50%甚至80%时的买入机会。\n\n准上所资产：可能在CEX上市的资产。"
+    chunks, metadatas = chunker.split_pages([(1, page1), (2, page2)], {"source": "test.pdf", "type": "pdf"})
+    
+    for chunk, metadata in zip(chunks, metadatas):
+        logger.info(f"{metadata}: {chunk[:30]}...")
+        assert chunker._count(chunk) <= chunker.chunk_size
+        assert metadata["source"] == "test.pdf"
+    
+    # 页码和偏移可以定位回原文
+    pages = {1: page1, 2: page2}
+    for chunk, metadata in zip(chunks, metadatas):
+        assert pages[metadata["page"]][metadata["offset"]:].startswith(chunk)
+    
+    # 第二页的分块从第二页开头开始，且序号连续
+    assert [m["chunk_index"] for m in metadatas] == list(range(len(chunks)))
+    assert any(m["page"] == 2 and m["offset"] == 0 for m in metadatas)
+
+def test_chunker_short_text():
+    """测试短文本保持为单个分块"""
+    chunks, metadatas = TextChunker().split_text("PEPE是2023年最成功的MEME币之一", {"source": "text_1"})
+    assert chunks == ["PEPE是2023年最成功的MEME币之一"]
+    assert "page" not in metadatas[0]
+
+if __name__ == "__main__":
+    test_chunker()
+    test_chunker_short_text()
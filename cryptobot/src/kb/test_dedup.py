@@ -0,0 +1,40 @@
+import logging
+from cryptobot.src.kb.dedup import simhash, hamming_distance, simhash_bands, to_signed, to_unsigned, MAX_HAMMING_DISTANCE
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+def test_simhash():
+    """测试 SimHash 对近似重复与不同内容的区分"""
+    content = """
+    内盘：在pumpfun内盘寻找标的投资。外盘一段：内盘标的迁移到外盘后的PVP交易。
+    外盘二段：外盘一段PVP结束后，下跌50%甚至80%时的买入机会。准上所资产：可能在CEX上市的资产。
+    """ * 3
+    near = content.replace("80%", "70%", 1)
+    different = """
+    以太坊（Ethereum）是一个开源的有智能合约功能的公共区块链平台，
+    通过其专用加密货币以太币提供去中心化的以太虚拟机来处理点对点合约。
+    """
+    
+    # 空白差异不影响签名
+    assert simhash(content) == simhash(" ".join(content.split()))
+    
+    near_distance = hamming_distance(simhash(content), simhash(near))
+    different_distance = hamming_distance(simhash(content), simhash(different))
+    logger.info(f"近似内容距离: {near_distance}, 不同内容距离: {different_distance}")
+    assert near_distance <= MAX_HAMMING_DISTANCE
+    assert different_distance > MAX_HAMMING_DISTANCE
+    
+    # 过短文本不计算 SimHash
+    assert simhash("短文本") is None
+
+def test_simhash_bands():
+    """测试分段与有符号转换"""
+    value = simhash("PEPE是2023年最成功的MEME币之一，它基于青蛙Pepe这个互联网表情包")
+    assert to_unsigned(to_signed(value)) == value
+    bands = simhash_bands(value)
+    assert sum(band << (16 * i) for i, band in enumerate(bands)) == value
+
+if __name__ == "__main__":
+    test_simhash()
+    test_simhash_bands()
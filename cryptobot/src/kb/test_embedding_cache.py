@@ -0,0 +1,50 @@
+import logging
+import tempfile
+from typing import List
+from langchain_core.embeddings import Embeddings
+from cryptobot.src.kb.embedding_cache import CachedEmbeddings
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+class CountingEmbeddings(Embeddings):
+    """记录调用次数的简易向量生成器"""
+    model = "counting"
+    
+    def __init__(self):
+        self.calls = 0
+        self.texts = 0
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        self.texts += len(texts)
+        return [[float(len(t)), 1.0, 0.5] for t in texts]
+    
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+def test_embedding_cache():
+    """测试向量缓存命中与淘汰"""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        base = CountingEmbeddings()
+        cache = CachedEmbeddings(base, cache_dir=cache_dir, max_entries=3)
+        
+        # 1. 首次写入：重复文本只请求一次
+        vectors = cache.embed_documents(["比特币", "以太坊", "比特币"])
+        assert base.calls == 1 and base.texts == 2
+        assert vectors[0] == vectors[2]
+        
+        # 2. 规范化后相同的文本命中缓存
+        cache.embed_documents(["  比特币 ", "以太坊"])
+        assert base.calls == 1
+        
+        stats = cache.stats()
+        logger.info(f"缓存统计: {stats}")
+        assert stats["hits"] == 2 and stats["misses"] == 3
+        
+        # 3. 超出容量后淘汰最久未访问的条目
+        cache.embed_documents(["Solana", "PEPE"])
+        assert cache.stats()["entries"] == 3
+
+if __name__ == "__main__":
+    test_embedding_cache()
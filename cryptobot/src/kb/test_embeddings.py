@@ -0,0 +1,98 @@
+import logging
+import tempfile
+from pathlib import Path
+import numpy as np
+from cryptobot.src.kb.embeddings import (resolve_embedding_config, embedding_tag, config_from_tag,
+                                         cache_model_name, read_index_tag, write_index_tag)
+from cryptobot.src.kb.embedding_cache import CachedEmbeddings
+from cryptobot.src.kb.local_embeddings import LocalEmbeddings
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+class CharModel:
+    """按字符计数的小模型，记录每次推理的批大小"""
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, texts, batch_size=32, normalize_embeddings=False, **kwargs):
+        self.batches.append(len(texts))
+        vectors = np.zeros((len(texts), 16), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for ch in text:
+                vectors[i, ord(ch) % 16] += 1
+        if normalize_embeddings:
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors
+
+    # 与 sentence-transformers 的多进程接口一致，在当前进程内按 chunk 推理
+    def start_multi_process_pool(self, devices):
+        self.pools = getattr(self, "pools", 0) + 1
+        return {"devices": devices}
+
+    def encode_multi_process(self, texts, pool, batch_size=32, chunk_size=4, normalize_embeddings=False):
+        chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+        return np.vstack([self.encode(chunk, batch_size, normalize_embeddings) for chunk in chunks])
+
+    def stop_multi_process_pool(self, pool):
+        self.pools -= 1
+
+def test_config():
+    """按后端补全默认模型，标记和缓存命名空间互不冲突"""
+    openai = resolve_embedding_config()
+    local = resolve_embedding_config({"provider": "local", "batch_size": 8})
+    assert embedding_tag(openai) == "openai:text-embedding-ada-002"
+    assert embedding_tag(local) == "local:paraphrase-multilingual-MiniLM-L12-v2"
+    assert cache_model_name(openai) == "text-embedding-ada-002"
+    assert cache_model_name(local) == embedding_tag(local)
+
+    # 与索引记录是同一模型时沿用运行参数，否则使用该模型的默认参数
+    assert config_from_tag(embedding_tag(local), local)["batch_size"] == 8
+    assert config_from_tag(embedding_tag(local), openai)["provider"] == "local"
+
+    try:
+        resolve_embedding_config({"provider": "unknown"})
+        assert False, "应拒绝未知后端"
+    except ValueError:
+        pass
+
+def test_index_tag(tmp_path):
+    persist_dir = str(tmp_path)
+    assert read_index_tag(persist_dir) is None
+    write_index_tag(persist_dir, "local:model")
+    assert read_index_tag(persist_dir) == "local:model"
+
+def test_local_batches():
+    """分批推理，线程池并行时结果顺序与输入一致"""
+    texts = [f"文本 {i} " + "abc"[:i % 3] for i in range(10)]
+    serial = LocalEmbeddings(CharModel(), batch_size=3)
+    parallel = LocalEmbeddings(CharModel(), batch_size=3, workers=4)
+    expected = serial.embed_documents(texts)
+    assert parallel.embed_documents(texts) == expected
+    assert serial.model.batches == [3, 3, 3, 1]
+    assert sorted(parallel.model.batches) == [1, 3, 3, 3]
+    assert serial.embed_query(texts[4]) == expected[4]
+    assert serial.embed_documents([]) == []
+    parallel.close()
+
+def test_local_process_pool(tmp_path):
+    """进程池路径与串行路径的归一化方式相同，关闭缓存时停止进程池"""
+    texts = [f"文本 {i} " + "abc"[:i % 3] for i in range(10)]
+    for normalize in (True, False):
+        serial = LocalEmbeddings(CharModel(), batch_size=3, normalize=normalize)
+        pooled = LocalEmbeddings(CharModel(), batch_size=3, workers=2, pool="process", normalize=normalize)
+        assert np.allclose(pooled.embed_documents(texts), serial.embed_documents(texts))
+        assert pooled.model.pools == 1
+
+    cache = CachedEmbeddings(pooled, cache_dir=str(tmp_path))
+    cache.embed_documents(texts[:2])
+    cache.close()
+    assert pooled.model.pools == 0 and pooled._process_pool is None
+
+if __name__ == "__main__":
+    test_config()
+    with tempfile.TemporaryDirectory() as tmp:
+        test_index_tag(Path(tmp))
+    test_local_batches()
+    with tempfile.TemporaryDirectory() as tmp:
+        test_local_process_pool(Path(tmp))
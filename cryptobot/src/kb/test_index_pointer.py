@@ -0,0 +1,48 @@
+import logging
+import os
+import tempfile
+from pathlib import Path
+from cryptobot.src.kb.index_pointer import IndexPointer
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+def make_pointer(root):
+    root = str(root)
+    return IndexPointer(
+        pointer_path=os.path.join(root, "knowledge_base.current"),
+        versions_dir=os.path.join(root, "versions"),
+        default_dir=os.path.join(root, "knowledge_base")
+    )
+
+def test_swap(tmp_path):
+    """没有指针文件时使用默认目录，切换后读取新目录"""
+    pointer = make_pointer(tmp_path)
+    assert pointer.current() == pointer.default_dir
+    assert pointer.version() is None
+
+    new_dir = pointer.new_version()
+    assert os.path.isdir(new_dir)
+    assert pointer.swap(new_dir) == pointer.default_dir
+    assert pointer.current() == new_dir
+    assert pointer.version() is not None
+    assert not os.path.exists(pointer.pointer_path + ".tmp")
+
+def test_prune(tmp_path):
+    """只保留当前和上一个版本，默认目录不删除"""
+    pointer = make_pointer(tmp_path)
+    os.makedirs(pointer.default_dir)
+    versions = [pointer.new_version() for _ in range(4)]
+    assert pointer.versions() == versions
+
+    pointer.swap(versions[2])
+    previous = pointer.swap(versions[3])
+    removed = pointer.prune(keep=previous)
+    assert removed == versions[:2]
+    assert pointer.versions() == versions[2:]
+    assert os.path.isdir(pointer.default_dir)
+
+if __name__ == "__main__":
+    for test in (test_swap, test_prune):
+        with tempfile.TemporaryDirectory() as tmp:
+            test(Path(tmp))
@@ -24,5 +24,22 @@ def test_content_deduplication():
     content3 = "这是完全不同的内容"
     assert not kb.is_content_duplicate(content3)
 
+def test_batch_deduplication():
+    """测试批量去重（批次内部重复）"""
+    kb = KnowledgeBase()
+    
+    texts = [
+        "批量去重测试：PEPE 是一枚基于青蛙表情包的 MEME 币",
+        "批量去重测试：PEPE 是一枚基于青蛙表情包的 MEME 币。",
+        "批量去重测试：Solana 是一条高性能公链"
+    ]
+    flags = kb.find_duplicates(texts)
+    
+    # 第二条与第一条几乎相同，应被识别为批内重复
+    assert len(flags) == len(texts)
+    assert flags[1]
+    assert not flags[2]
+
 if __name__ == "__main__":
-    test_content_deduplication() 
\ No newline at end of file
+    test_content_deduplication()
+    test_batch_deduplication() 
\ No newline at end of file
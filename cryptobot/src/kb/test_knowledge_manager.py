@@ -1,5 +1,13 @@
 import logging
+import shutil
+import tempfile
+from collections import Counter
+from pathlib import Path
+import pytest
+from cryptobot.src.kb.index_pointer import IndexPointer
+from cryptobot.src.kb.knowledge_base import KnowledgeBase
 from cryptobot.src.kb.knowledge_manager import KnowledgeManager
+from cryptobot.src.kb.source_registry import SourceRegistry
 import os
 
 logging.basicConfig(level=logging.INFO, format='%(message)s')
@@ -40,5 +48,127 @@ def test_knowledge_manager():
         logger.error(f"测试出错: {str(e)}")
         logger.error(f"错误类型: {type(e)}")
 
+TEST_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "loaders", "test_data", "test.pdf")
+
+class FailingKnowledgeBase:
+    """写入指定来源的第 fail_batch 批（从 0 开始）时抛出异常（模拟 Embedding 接口或 Chroma 出错）
+    
+    来源和分块登记在真实的登记表中，增量同步和按文件名跳过的逻辑与真实知识库一致。
+    """
+
+    def __init__(self, registry_dir, failing_source, fail_batch=0):
+        self.registry = SourceRegistry(os.path.join(registry_dir, "sources.sqlite3"))
+        self.failing_source = failing_source
+        self.fail_batch = fail_batch
+        self.batches = Counter()
+        self.chunks = {}
+
+    @property
+    def sources(self):
+        return {chunk_id.rsplit("#", 1)[0] for chunk_id in self.chunks}
+
+    def add_texts(self, texts, metadatas=None, exact_only=False):
+        source = metadatas[0]["source"]
+        if source == self.failing_source and self.batches[source] == self.fail_batch:
+            raise RuntimeError("embedding error")
+        self.batches[source] += 1
+        ids = [f"{source}#{len(self.chunks) + i}" for i in range(len(texts))]
+        self.chunks.update(zip(ids, texts))
+        self.registry.record({source: {"type": "pdf", "content_hash": metadatas[0].get("content_hash"),
+                                       "chunk_ids": ids}})
+
+    def has_source(self, source):
+        return self.registry.has_source(source)
+
+    def get_existing_pdfs(self):
+        return self.registry.get_sources(source_type="pdf")
+
+    def delete_source(self, source):
+        info = self.registry.get_source(source)
+        if info is None:
+            return 0
+        for chunk_id in info["chunk_ids"]:
+            self.chunks.pop(chunk_id, None)
+        self.registry.remove_source(source)
+        return len(info["chunk_ids"])
+
+    def close(self):
+        self.registry.close()
+
+    def refresh(self):
+        return False
+
+def copy_pdfs(pdf_dir, names):
+    paths = []
+    for name in names:
+        paths.append(os.path.join(pdf_dir, name))
+        shutil.copy(TEST_PDF, paths[-1])
+    return paths
+
+def test_streamed_ingest_rolls_back(tmp_path):
+    """流式入库第二批失败时回滚已写入的批次，之后的增量同步重新导入该文件"""
+    pdf_dir = tmp_path / "pdfs"
+    pdf_dir.mkdir()
+    path, = copy_pdfs(str(pdf_dir), ["a.pdf"])
+    
+    kb = FailingKnowledgeBase(str(tmp_path), "a.pdf", fail_batch=1)
+    manager = KnowledgeManager(kb=kb, batch_size=1)
+    assert manager.sync_pdfs(str(pdf_dir))["added"] == 1
+    assert kb.batches["a.pdf"] == 1
+    assert kb.chunks == {} and not kb.has_source("a.pdf")
+    assert kb.registry.get_file(path) is None
+    
+    kb.failing_source = None
+    assert manager.sync_pdfs(str(pdf_dir))["added"] == 1
+    assert kb.sources == {"a.pdf"} and len(kb.chunks) == 2
+    assert manager.sync_pdfs(str(pdf_dir))["unchanged"] == 1
+
+def test_pooled_ingest_continues_after_error(tmp_path):
+    """进程池路径中单个文件入库失败时继续处理其他文件，失败文件已写入的批次回滚"""
+    pdf_dir = tmp_path / "pdfs"
+    pdf_dir.mkdir()
+    paths = copy_pdfs(str(pdf_dir), ["a.pdf", "b.pdf"])
+    
+    kb = FailingKnowledgeBase(str(tmp_path), "a.pdf", fail_batch=1)
+    manager = KnowledgeManager(kb=kb, pdf_workers=2, batch_size=1)
+    assert manager._ingest_pdfs(paths) == [paths[1]]
+    assert kb.batches["a.pdf"] == 1
+    assert kb.sources == {"b.pdf"}
+    
+    # 失败的文件没有登记为已导入，下次加载时重试
+    kb.failing_source = None
+    assert manager.load_pdfs(str(pdf_dir)) == 1
+    assert kb.sources == {"a.pdf", "b.pdf"}
+
+def test_rebuild_keeps_live_index_on_failure(tmp_path, monkeypatch):
+    """重建时有文件导入失败则删除新索引、不切换指针；全部成功才切换"""
+    pdf_dir = tmp_path / "pdfs"
+    pdf_dir.mkdir()
+    copy_pdfs(str(pdf_dir), ["a.pdf", "b.pdf"])
+    pointer = IndexPointer(pointer_path=str(tmp_path / "knowledge_base.current"),
+                           versions_dir=str(tmp_path / "versions"),
+                           default_dir=str(tmp_path / "knowledge_base"))
+    monkeypatch.setattr(KnowledgeBase, "pointer", pointer)
+    failing_source = "a.pdf"
+    monkeypatch.setattr(KnowledgeBase, "open_at",
+                        classmethod(lambda cls, path: FailingKnowledgeBase(path, failing_source)))
+    
+    live_kb = FailingKnowledgeBase(str(tmp_path), None)
+    manager = KnowledgeManager(kb=live_kb)
+    with pytest.raises(RuntimeError):
+        manager.rebuild(pdf_dir=str(pdf_dir))
+    assert manager.kb is live_kb
+    assert pointer.current() == pointer.default_dir
+    assert pointer.versions() == []
+    
+    failing_source = None
+    assert manager.rebuild(pdf_dir=str(pdf_dir))["pdfs_loaded"] == 2
+    assert pointer.current() == pointer.versions()[0]
+
 if __name__ == "__main__":
-    test_knowledge_manager() 
\ No newline at end of file
+    test_knowledge_manager()
+    for test in (test_pooled_ingest_continues_after_error, test_streamed_ingest_rolls_back):
+        with tempfile.TemporaryDirectory() as tmp:
+            test(Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp, pytest.MonkeyPatch.context() as monkeypatch:
+        test_rebuild_keeps_live_index_on_failure(Path(tmp), monkeypatch)
@@ -0,0 +1,141 @@
+import logging
+import random
+import tempfile
+from pathlib import Path
+from cryptobot.src.kb.lexical_index import LexicalIndex, tokenize
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+TEXTS = {
+    "c1": "GMGN的四种打法：内盘、外盘一段、外盘二段、准上所资产。",
+    "c2": "内盘：在pumpfun内盘寻找标的投资，关注 0xSun 的地址。",
+    "c3": "外盘二段：外盘一段PVP结束后，下跌50%甚至80%时的买入机会。",
+    "c4": "比特币减半每四年一次，矿工奖励减少一半。",
+}
+
+def make_index(index_dir, **kwargs):
+    index = LexicalIndex(str(index_dir), **kwargs)
+    index.add(list(TEXTS), list(TEXTS.values()))
+    return index
+
+def test_tokenize():
+    """英文按单词（小写），中文按相邻两字"""
+    assert tokenize("GMGN的打法, $SOL") == ["gmgn", "的打", "打法", "sol"]
+    assert tokenize("０ｘＳｕｎ") == ["0xsun"]
+    assert tokenize("，。！") == []
+
+def test_search(tmp_path):
+    index = make_index(tmp_path)
+    assert index.count() == 4
+    assert index.search("pumpfun", k=2)[0][0] == "c2"
+    assert index.search("0xsun 是谁", k=1)[0][0] == "c2"
+    assert index.search("外盘二段的买入机会", k=1)[0][0] == "c3"
+    assert index.search("以太坊", k=3) == []
+
+    # 覆盖率：命中全部查询词为 1，只命中常见词时较低
+    chunk_id, _, coverage = index.search("GMGN", k=1)[0]
+    assert chunk_id == "c1" and abs(coverage - 1.0) < 1e-6
+    results = index.search("比特币 以太坊 合约", k=3)
+    assert [chunk_id for chunk_id, _, _ in results] == ["c4"]
+    assert results[0][2] < 0.5
+
+def test_delete_and_merge(tmp_path):
+    """删除后检索不到，合并段后结果不变并去掉已删除的文档"""
+    index = make_index(tmp_path, merge_factor=2)
+    index.delete(["c2"])
+    assert index.count() == 3
+    assert all(chunk_id != "c2" for chunk_id, _, _ in index.search("pumpfun 内盘", k=4))
+
+    index.add(["c5"], ["Solana 链上的 pumpfun 发射平台。"])
+    index.add(["c6"], ["以太坊的 gas 费。"])
+    assert len(index.segments) == 1
+    assert index.tombstones == {}
+    assert index.count() == 5
+    assert index.search("pumpfun", k=1)[0][0] == "c5"
+
+def test_tiered_merge(tmp_path):
+    """只合并末尾的小段，已合并的大段不再重写；合并后与重新建立的索引命中相同"""
+    index = LexicalIndex(str(tmp_path / "tiered"), merge_factor=4)
+    index.add([f"big{i}" for i in range(20)], [f"GMGN 内盘 第{i}篇" for i in range(20)])
+    big = index.segments[0].name
+    for i in range(3):
+        index.add([f"s{i}"], [f"pumpfun 外盘 {i}"])
+    assert len(index.segments) == 4
+    index.add(["s3"], ["pumpfun 外盘 3"])
+    # 四个单文档的段合并成一段，大段保持不变
+    assert [s.name for s in index.segments][0] == big
+    assert len(index.segments) == 2 and len(index.segments[1].ids) == 4
+
+    rng = random.Random(0)
+    words = ["gmgn", "pumpfun", "raydium", "jupiter", "内盘", "外盘", "比特币", "以太坊"]
+    latest = {}
+    for step in range(60):
+        ids = [f"d{rng.randrange(40)}" for _ in range(rng.randrange(1, 6))]
+        texts = [" ".join(rng.sample(words, 3)) for _ in ids]
+        index.add(ids, texts)
+        latest.update(zip(ids, texts))
+        if step % 7 == 0:
+            removed = [f"d{rng.randrange(40)}" for _ in range(3)]
+            index.delete(removed)
+            for chunk_id in removed:
+                latest.pop(chunk_id, None)
+    assert len(index.segments) < 12
+
+    fresh = LexicalIndex(str(tmp_path / "fresh"))
+    expected = {f"big{i}": f"GMGN 内盘 第{i}篇" for i in range(20)}
+    expected.update({f"s{i}": f"pumpfun 外盘 {i}" for i in range(4)})
+    expected.update(latest)
+    fresh.add(list(expected), list(expected.values()))
+    for other in (index, LexicalIndex(index.index_dir)):
+        assert other.count() == fresh.count()
+        for query in ("gmgn 内盘", "pumpfun", "比特币 以太坊", "raydium jupiter 外盘"):
+            # 文档频率在合并前仍包含已删除的文档，分数可能略有差别，只比较命中的分块
+            got = {chunk_id for chunk_id, _, _ in other.search(query, k=100)}
+            assert got == {chunk_id for chunk_id, _, _ in fresh.search(query, k=100)}
+
+def test_readd(tmp_path):
+    """重复写入同一分块时只保留最新的内容，删除后再写入可以重新检索到"""
+    index = LexicalIndex(str(tmp_path))
+    index.add(["a", "b"], ["GMGN 内盘打法", "比特币减半"])
+    index.add(["a"], ["pumpfun 外盘"])
+    assert index.count() == 2
+    assert index.search("gmgn", k=2) == []
+    assert index.search("pumpfun", k=2)[0][0] == "a"
+
+    # 同一批次中重复的 ID 以最后一次为准
+    index.add(["c", "c"], ["Raydium", "Jupiter"])
+    assert index.count() == 3
+    assert index.search("raydium", k=1) == []
+
+    index.delete(["a"])
+    index.add(["a"], ["GMGN 内盘打法"])
+    assert index.count() == 3
+    assert index.search("gmgn", k=1)[0][0] == "a"
+
+    # 重新加载和合并后结果不变
+    other = LexicalIndex(index.index_dir)
+    assert other.count() == 3
+    other.merge()
+    assert other.count() == 3 and len(other.segments[0].ids) == 3
+    assert other.search("pumpfun", k=1) == []
+
+def test_reload(tmp_path):
+    """另一个实例（如其他进程）写入后，检索前自动重新加载"""
+    index = make_index(tmp_path)
+    other = LexicalIndex(index.index_dir)
+    assert other.count() == 4
+    index.add(["c5"], ["Raydium 是 Solana 上的 DEX。"])
+    index.delete(["c1"])
+    assert other.search("raydium", k=1)[0][0] == "c5"
+    assert other.count() == 4
+
+    other.clear()
+    assert index.search("pumpfun", k=1) == []
+    assert index.count() == 0
+
+if __name__ == "__main__":
+    test_tokenize()
+    for test in (test_search, test_delete_and_merge, test_tiered_merge, test_readd, test_reload):
+        with tempfile.TemporaryDirectory() as tmp:
+            test(Path(tmp))
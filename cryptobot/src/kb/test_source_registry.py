@@ -0,0 +1,35 @@
+import logging
+import os
+import tempfile
+from cryptobot.src.kb.source_registry import SourceRegistry
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+def test_source_registry():
+    """测试来源登记表的登记、查询和删除"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        registry = SourceRegistry(os.path.join(tmp_dir, "sources.sqlite3"))
+        assert registry.is_empty()
+        
+        # 1. 分两批登记同一个 PDF，分块 ID 累加
+        registry.record({"test.pdf": {"type": "pdf", "content_hash": "abc", "chunk_ids": ["c1", "c2"]}})
+        registry.record({"test.pdf": {"type": "pdf", "chunk_ids": ["c3"]}})
+        registry.record({"https://www.odaily.news/post/5198722": {"type": "url", "chunk_ids": []}})
+        
+        assert registry.has_source("test.pdf")
+        assert not registry.has_source("test2.pdf")
+        assert registry.get_sources(source_type="pdf") == {"test.pdf"}
+        
+        info = registry.get_source("test.pdf")
+        logger.info(f"登记信息: {info}")
+        assert info["content_hash"] == "abc"
+        assert sorted(info["chunk_ids"]) == ["c1", "c2", "c3"]
+        
+        # 2. 删除来源时返回其分块 ID
+        assert sorted(registry.remove_source("test.pdf")) == ["c1", "c2", "c3"]
+        assert not registry.has_source("test.pdf")
+        assert registry.get_sources() == {"https://www.odaily.news/post/5198722"}
+
+if __name__ == "__main__":
+    test_source_registry()
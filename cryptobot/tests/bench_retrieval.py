@@ -0,0 +1,96 @@
+import argparse
+import random
+import statistics
+import time
+import yaml
+from cryptobot.src.kb.knowledge_base import KnowledgeBase
+from cryptobot.src.kb.lexical_index import tokenize
+
+"""
+检索基准：在当前知识库上比较纯向量检索、BM25 关键词检索和混合检索（RRF）的 recall@k 与延迟。
+
+查询集：
+- 默认从知识库随机抽取分块，用分块中最稀有的几个词组成查询，目标是该分块本身
+  （模拟 GMGN、pumpfun、代币符号这类精确词查询）
+- --queries 指定 YAML 文件时使用人工标注的查询：[{query: ..., expect: 相关分块应包含的文字}]
+
+查询向量预先生成（经过本地缓存），延迟只统计检索本身。
+
+用法：python cryptobot/tests/bench_retrieval.py [-k 5] [--samples 200] [--queries queries.yaml]
+"""
+
+
+def sample_queries(kb: KnowledgeBase, samples: int, terms: int, seed: int):
+    """随机抽取分块，取其中文档频率最低的几个词作为查询"""
+    collection = kb.vectorstore._collection
+    total = collection.count()
+    rng = random.Random(seed)
+    queries = []
+    for offset in rng.sample(range(total), min(samples, total)):
+        result = collection.get(limit=1, offset=offset, include=["documents"])
+        tokens = set(tokenize(result["documents"][0] or ""))
+        if not tokens:
+            continue
+        rare = sorted(tokens, key=lambda t: (_document_frequency(kb, t), t))[:terms]
+        chunk_id = result["ids"][0]
+        queries.append((" ".join(rare), lambda r, chunk_id=chunk_id: r["id"] == chunk_id))
+    return queries
+
+
+def load_queries(path: str):
+    with open(path, 'r', encoding='utf-8') as f:
+        items = yaml.safe_load(f) or []
+    return [(item["query"], lambda r, expect=item["expect"]: expect in (r["content"] or ""))
+            for item in items]
+
+
+def _document_frequency(kb: KnowledgeBase, term: str) -> int:
+    return sum(s.terms[term][1] for s in kb.lexical.segments if term in s.terms)
+
+
+def _to_results(kb: KnowledgeBase, hits, vector):
+    """关键词检索只返回 ID，补上内容后才能按 expect 判断"""
+    fetched = kb._fetch_by_ids([chunk_id for chunk_id, _, _ in hits], vector)
+    return [fetched[chunk_id] for chunk_id, _, _ in hits if chunk_id in fetched]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="向量 / 关键词 / 混合检索基准")
+    parser.add_argument("-k", type=int, default=5, help="recall@k")
+    parser.add_argument("--samples", type=int, default=200, help="自动生成的查询数")
+    parser.add_argument("--terms", type=int, default=2, help="自动生成的查询包含的词数")
+    parser.add_argument("--queries", type=str, help="人工标注的查询集（YAML）")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    kb = KnowledgeBase()
+    queries = load_queries(args.queries) if args.queries else sample_queries(kb, args.samples, args.terms, args.seed)
+    if not queries:
+        print("知识库为空，没有可用的查询")
+        return
+    vectors = [kb.embed_query(query) for query, _ in queries]
+
+    methods = {
+        "向量检索": lambda query, vector: kb.search_by_vector(vector, k=args.k),
+        "关键词检索 (BM25)": lambda query, vector: kb.lexical.search(query, k=args.k),
+        "混合检索 (RRF)": lambda query, vector: kb.hybrid_search(query, vector, k=args.k),
+    }
+
+    print(f"知识库: {kb.persist_dir}，{kb.vectorstore._collection.count()} 个分块，{len(queries)} 条查询\n")
+    print(f"{'方法':<20}{f'recall@{args.k}':>10}{'中位延迟':>12}{'p95 延迟':>12}")
+    for name, search in methods.items():
+        hits, times = 0, []
+        for (query, is_relevant), vector in zip(queries, vectors):
+            start = time.perf_counter()
+            results = search(query, vector)
+            times.append((time.perf_counter() - start) * 1000)
+            if results and not isinstance(results[0], dict):
+                results = _to_results(kb, results, vector)
+            hits += any(is_relevant(r) for r in results)
+        times.sort()
+        p95 = times[min(len(times) - 1, int(len(times) * 0.95))]
+        print(f"{name:<20}{hits / len(queries):>10.1%}{statistics.median(times):>10.3f}ms{p95:>10.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
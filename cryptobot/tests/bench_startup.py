@@ -0,0 +1,108 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+"""
+启动耗时基准：每项在新的 Python 进程中运行，取多次的中位数。
+
+- 导入各入口模块的耗时，以及导入后已加载了哪些重量级依赖（应为空，依赖在第一次使用时才导入）
+- python -m cryptobot.src.kb.clear_kb 的完整运行耗时（在临时目录中运行，不影响本地知识库）
+- 第一次打开 KnowledgeBase（此时才导入 Chroma / LangChain）
+
+用法：python cryptobot/tests/bench_startup.py [--repeat 5]
+"""
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+HEAVY_MODULES = ["chromadb", "langchain_community", "langchain_openai", "openai",
+                 "selenium", "trafilatura", "aiohttp", "PyPDF2"]
+
+ENTRY_POINTS = [
+    "cryptobot.src.kb.clear_kb",
+    "cryptobot.src.kb.knowledge_base",
+    "cryptobot.src.kb.knowledge_manager",
+    "cryptobot.src.kb.add_knowledge",
+    "cryptobot.src.bot.chat",
+    "streamlit_app",
+]
+
+IMPORT_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed)
+print("heavy:" + ",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+OPEN_SCRIPT = """
+import time
+from cryptobot.src.kb.knowledge_base import KnowledgeBase
+start = time.perf_counter()
+KnowledgeBase()
+print(time.perf_counter() - start)
+"""
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    # 启动过程不应依赖 API 密钥
+    env.pop("OPENAI_API_KEY", None)
+    return env
+
+
+def bench_import(module: str, repeat: int):
+    times, heavy = [], ""
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", IMPORT_SCRIPT.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=ROOT, env=_env(), capture_output=True, text=True, check=True
+        ).stdout.strip().splitlines()
+        times.append(float(output[-2]))
+        heavy = output[-1][len("heavy:"):]
+    return statistics.median(times), heavy
+
+
+def bench_process(args, cwd: str, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=cwd, env=_env(), capture_output=True, check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def bench_open(cwd: str, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", OPEN_SCRIPT], cwd=cwd, env=_env(),
+                                capture_output=True, text=True, check=True).stdout.strip().splitlines()
+        times.append(float(output[-1]))
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="入口模块启动耗时基准")
+    parser.add_argument("--repeat", type=int, default=5, help="每项运行次数")
+    args = parser.parse_args()
+
+    print(f"{'模块':<40}{'导入耗时':>10}  已加载的重量级依赖")
+    for module in ENTRY_POINTS:
+        elapsed, heavy = bench_import(module, args.repeat)
+        print(f"{module:<40}{elapsed:>9.3f}s  {heavy or '-'}")
+
+    # 在临时目录中运行，数据目录都是相对路径
+    with tempfile.TemporaryDirectory() as workdir:
+        elapsed = bench_process(["-m", "cryptobot.src.kb.clear_kb"], workdir, args.repeat)
+        print(f"\n{'python -m cryptobot.src.kb.clear_kb':<40}{elapsed:>9.3f}s  (含解释器启动)")
+        elapsed = bench_open(workdir, args.repeat)
+        print(f"{'KnowledgeBase() 首次打开':<40}{elapsed:>9.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import logging
+import time
+from cryptobot.src.bot.answer_cache import AnswerCache
+from cryptobot.tests.test_chat_stream import make_chat
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+RESULTS = [{"id": "c1", "source": "gmgn.pdf", "content": "内盘...", "score": 0.2},
+           {"id": "c2", "source": "https://www.odaily.news/post/1", "content": "外盘...", "score": 0.3}]
+
+def test_similarity_and_context():
+    cache = AnswerCache(threshold=0.95)
+    cache.put("什么是内盘和外盘？", [1.0, 0.0, 0.0], RESULTS, "内盘是...")
+    # 相似问题、检索结果相同：命中
+    assert cache.get([0.99, 0.05, 0.0], ["c1", "c2"]) == "内盘是..."
+    # 不够相似
+    assert cache.get([0.7, 0.7, 0.0], ["c1", "c2"]) is None
+    # 检索结果变化
+    assert cache.get([1.0, 0.0, 0.0], ["c3", "c1"]) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+def test_ttl_and_lru():
+    cache = AnswerCache(ttl_seconds=0.1, max_entries=2)
+    for i in range(3):
+        cache.put(f"q{i}", [0.0] * i + [1.0] + [0.0] * (2 - i), RESULTS, f"a{i}")
+    # 最早的条目被淘汰
+    assert cache.get([1.0, 0.0, 0.0], ["c1", "c2"]) is None
+    assert cache.get([0.0, 1.0, 0.0], ["c1", "c2"]) == "a1"
+    time.sleep(0.2)
+    assert cache.get([0.0, 1.0, 0.0], ["c1", "c2"]) is None
+    assert cache.stats()["entries"] == 0
+
+def test_invalidate_by_source():
+    cache = AnswerCache()
+    cache.put("q1", [1.0, 0.0], RESULTS, "a1")
+    cache.put("q2", [0.0, 1.0], [RESULTS[0]], "a2")
+    assert cache.invalidate({"https://www.odaily.news/post/1"}) == 1
+    assert cache.get([0.0, 1.0], ["c1"]) == "a2"
+    assert cache.invalidate(None) == 1
+
+def test_chat_uses_cache():
+    """第二次提问直接返回缓存的回答，不再调用模型"""
+    chat = make_chat(RESULTS, ["内盘", "是..."])
+    chat.answer_cache = AnswerCache()
+    assert chat.chat("什么是内盘和外盘？") == "内盘是..."
+    assert list(chat.stream_chat("什么是内盘和外盘？")) == ["内盘是..."]
+    assert len(chat.answer_llm.prompts) == 1
+
+if __name__ == "__main__":
+    test_similarity_and_context()
+    test_ttl_and_lru()
+    test_invalidate_by_source()
+    test_chat_uses_cache()
@@ -0,0 +1,76 @@
+import asyncio
+import logging
+from types import SimpleNamespace
+from cryptobot.src.bot.chat import CryptoChat, NO_RESULT_REPLY, RETRIEVAL_CONFIG
+from cryptobot.src.bot.context_builder import ContextBuilder
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+class FakeKnowledgeBase:
+    def __init__(self, results):
+        self.results = results
+
+    def refresh(self):
+        return False
+
+    def embed_query(self, query):
+        return [1.0, 0.0]
+
+    def search_by_vector(self, vector, k=5):
+        return self.results
+
+    def hybrid_search(self, query, vector=None, k=5, rrf_k=60):
+        return self.results
+
+class FakeLLM:
+    """按 token 返回固定回答，记录收到的 prompt"""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.prompts = []
+
+    def stream(self, prompt):
+        self.prompts.append(prompt)
+        for token in self.tokens:
+            yield SimpleNamespace(content=token)
+
+    async def astream(self, prompt):
+        self.prompts.append(prompt)
+        for token in self.tokens:
+            yield SimpleNamespace(content=token)
+
+def make_chat(results, tokens):
+    # 跳过 __init__，不连接真实的知识库和 OpenAI
+    chat = CryptoChat.__new__(CryptoChat)
+    chat.kb = FakeKnowledgeBase(results)
+    chat.answer_llm = FakeLLM(tokens)
+    chat.answer_cache = None
+    chat.context_builder = ContextBuilder(min_passage_tokens=1)
+    chat.retrieval = dict(RETRIEVAL_CONFIG)
+    return chat
+
+def test_stream_chat():
+    chat = make_chat([{"content": "外盘二段：外盘一段PVP结束后的买入机会", "id": "c1", "source": "gmgn.pdf", "score": 0.2}], ["外盘", "", "二段", "是..."])
+    tokens = list(chat.stream_chat("什么是外盘二段？"))
+    assert tokens == ["外盘", "二段", "是..."]
+    assert "背景信息：\n外盘二段" in chat.answer_llm.prompts[0]
+    assert chat.chat("什么是外盘二段？") == "外盘二段是..."
+
+def test_astream_chat():
+    chat = make_chat([{"content": "内盘", "id": "c2", "source": "gmgn.pdf", "score": 0.2}], ["a", "b"])
+
+    async def collect():
+        return [token async for token in chat.astream_chat("内盘是什么")]
+
+    assert asyncio.run(collect()) == ["a", "b"]
+
+def test_no_results():
+    chat = make_chat([], ["unused"])
+    assert list(chat.stream_chat("你好")) == [NO_RESULT_REPLY]
+    assert chat.answer_llm.prompts == []
+
+if __name__ == "__main__":
+    test_stream_chat()
+    test_astream_chat()
+    test_no_results()
@@ -0,0 +1,80 @@
+import logging
+from cryptobot.src.bot.context_builder import ContextBuilder
+from cryptobot.src.kb.chunker import TextChunker, count_tokens
+from cryptobot.tests.test_chat_stream import make_chat
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+DEFINITION = "外盘二段：外盘一段PVP结束后，下跌50%甚至80%时的买入机会。"
+
+def result(chunk_id, content, score, source="gmgn.pdf", chunk_index=None):
+    metadata = {"source": source}
+    if chunk_index is not None:
+        metadata["chunk_index"] = chunk_index
+    return {"id": chunk_id, "content": content, "score": score, "source": source, "metadata": metadata}
+
+def test_score_cutoff_and_containment():
+    builder = ContextBuilder(max_distance=0.5, min_passage_tokens=1)
+    context = builder.build([
+        result("a", DEFINITION, 0.2),
+        result("b", DEFINITION[:20], 0.3, source="other.pdf"),
+        result("c", "今天天气不错。", 0.9),
+    ])
+    assert context.text == DEFINITION
+    assert context.passages[0].ids == ["a", "b"]
+    assert context.dropped == 1
+
+def test_merge_adjacent_chunks():
+    """同一来源相邻分块按重叠拼接，不重复占用预算"""
+    text = "".join(f"第{i}条：关注持币地址。" for i in range(30))
+    chunks, metadatas = TextChunker(chunk_size=40, chunk_overlap=12).split_text(text, {"source": "gmgn.pdf"})
+    assert len(chunks) >= 3
+    results = [result(f"c{m['chunk_index']}", chunk, 0.1 + 0.01 * i, chunk_index=m["chunk_index"])
+               for i, (chunk, m) in enumerate(zip(chunks[:3], metadatas[:3]))]
+    # 检索顺序与分块顺序不同
+    results = [results[1], results[0], results[2]]
+    context = ContextBuilder(max_distance=None, min_passage_tokens=1).build(results)
+    assert len(context.passages) == 1
+    merged = context.passages[0].content
+    assert merged.startswith(chunks[0]) and merged.endswith(chunks[2])
+    assert count_tokens(merged) < sum(count_tokens(c) for c in chunks[:3])
+
+def test_token_budget():
+    sentences = "".join(f"第{i}条规则：不要追高，设置止损。" for i in range(100))
+    builder = ContextBuilder(max_tokens=200, min_passage_tokens=20, max_distance=None)
+    context = builder.build([result("a", DEFINITION, 0.1), result("b", sentences, 0.2, source="x")])
+    assert context.tokens <= 200
+    # 按句子截断，不从句子中间切开
+    assert context.passages[1].content.endswith("。")
+    assert len(context.passages) == 2
+
+def test_choose_model():
+    builder = ContextBuilder(answer_tokens=1000)
+    assert builder.choose_model(3000) == "gpt-3.5-turbo"
+    assert builder.choose_model(3500) == "gpt-3.5-turbo-16k"
+    assert builder.choose_model(50000) == "gpt-3.5-turbo-16k"
+
+def test_hybrid_results():
+    """融合结果按 rrf 排序；关键词覆盖率高的结果即使向量距离大也保留"""
+    builder = ContextBuilder(max_distance=0.5, min_coverage=0.8, min_passage_tokens=1)
+    fused = [
+        dict(result("a", "内盘：在pumpfun内盘寻找标的投资。", 0.3, source="a.pdf"), rrf=0.016),
+        dict(result("b", "GMGN 是链上交易工具。", 0.7, source="b.pdf"), rrf=0.032, coverage=0.9),
+        dict(result("c", "今天天气不错。", 0.8, source="c.pdf"), rrf=0.015, coverage=0.3),
+    ]
+    context = builder.build(fused)
+    assert [p.ids for p in context.passages] == [["b"], ["a"]]
+    assert ContextBuilder(max_distance=0.5, min_coverage=None, min_passage_tokens=1).build(fused).dropped == 2
+
+def test_irrelevant_results():
+    chat = make_chat([result("c", "今天天气不错。", 1.2)], ["unused"])
+    assert chat.chat("什么是外盘二段？") == "抱歉，我的知识库中没有找到相关信息。请问其他问题。"
+
+if __name__ == "__main__":
+    test_score_cutoff_and_containment()
+    test_merge_adjacent_chunks()
+    test_token_budget()
+    test_choose_model()
+    test_hybrid_results()
+    test_irrelevant_results()
@@ -0,0 +1,75 @@
+import json
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from cryptobot.src.bot.llm import close_clients, get_llm, load_chat_config
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+def start_stub():
+    """本地 OpenAI 兼容接口，记录每个请求所用的连接"""
+    connections = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            connections.append(self.client_address)
+            body = json.dumps({
+                "id": "stub", "object": "chat.completion", "created": 0, "model": request["model"],
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": f"stub:{request['model']}"}}],
+                "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, connections
+
+def test_load_chat_config(tmp_path):
+    path = str(tmp_path / "chat.yaml")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("llm:\n  model: gpt-4o-mini\n  timeout: 5\n  pool:\n    max_connections: 4\n")
+    config = load_chat_config(path)
+    assert config["model"] == "gpt-4o-mini" and config["timeout"] == 5
+    # 未配置的项保留默认值
+    assert config["pool"]["max_connections"] == 4 and config["pool"]["keepalive_expiry"] == 60
+
+def test_shared_client_with_stub(monkeypatch):
+    """同参数共享实例，多次请求复用同一个 keep-alive 连接"""
+    server, connections = start_stub()
+    # 只在本测试内生效，不影响之后依赖真实密钥的测试
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    config = load_chat_config()
+    config["base_url"] = f"http://127.0.0.1:{server.server_port}/v1"
+    try:
+        llm = get_llm(model="gpt-3.5-turbo", config=config)
+        assert get_llm(model="gpt-3.5-turbo", config=config) is llm
+        assert get_llm(model="gpt-3.5-turbo", temperature=0.7, config=config) is not llm
+
+        for _ in range(3):
+            assert llm.invoke("你好").content == "stub:gpt-3.5-turbo"
+        assert len(connections) == 3
+        assert len(set(connections)) == 1
+    finally:
+        close_clients()
+        server.shutdown()
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        test_load_chat_config(Path(tmp))
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_shared_client_with_stub(monkeypatch)
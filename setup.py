@@ -9,6 +9,7 @@ setup(
         "langchain",
         "openai",
         "chromadb",
+        "numpy",
         "python-dotenv",
         "pypdf",
         "requests",
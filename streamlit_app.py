@@ -1,13 +1,28 @@
 import os
+import logging
+import time
 import streamlit as st
 from cryptobot.src.bot.chat import CryptoChat
 
+logger = logging.getLogger(__name__)
+
+@st.cache_resource
+def get_chat_bot() -> CryptoChat:
+    """整个进程共享一个 CryptoChat（知识库、模型客户端、回答缓存），新会话和页面重跑不再重新初始化"""
+    return CryptoChat()
+
 def initialize_chat():
-    if "chat_bot" not in st.session_state:
-        st.session_state.chat_bot = CryptoChat()
     if "messages" not in st.session_state:
         st.session_state.messages = []
 
+def session_chat_bot() -> CryptoChat:
+    """首次提问时才加载知识库和模型客户端，页面本身可以立即显示"""
+    if "chat_bot" not in st.session_state:
+        start = time.perf_counter()
+        st.session_state.chat_bot = get_chat_bot()
+        logger.info(f"会话初始化耗时 {time.perf_counter() - start:.3f}s")
+    return st.session_state.chat_bot
+
 def main():
     st.title("Crypto助手")
     st.write("欢迎使用 Crypto 助手！我是您的加密货币和链上交易专家。")
@@ -27,8 +42,8 @@ def main():
         
         # 显示助手回答
         with st.chat_message("assistant"):
-            response = st.session_state.chat_bot.chat(prompt)
-            st.write(response)
+            # 边生成边显示，write_stream 返回完整回答用于保存历史
+            response = st.write_stream(session_chat_bot().stream_chat(prompt))
         st.session_state.messages.append({"role": "assistant", "content": response})
 
 if __name__ == "__main__":
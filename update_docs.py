@@ -27,7 +27,8 @@ ai_kb/
 - 支持内容搜索和相似度匹配
 
 ### 2.2 去重机制
-- 使用 OpenAI Embeddings 生成文本向量
+- 第一层：规范化文本 SHA-256（完全重复）+ SimHash（近似重复），不调用 Embedding 接口
+- 第二层：第一层无法判定时，使用 OpenAI Embeddings 生成文本向量
 - 相似度阈值设置为 0.95
 - 对所有类型内容（PDF、URL、纯文本）都有效
 